@@ -0,0 +1,114 @@
+# benchmarks/campus.py
+"""
+Seeded synthetic campus: buildings, rooms per floor, sensors and a
+motion event stream that looks like a teaching week.
+
+- rooms are booked in sessions (1-3 hours, 08:00-20:00), more of them on
+  teaching days (Sunday-Thursday) than on Friday/Saturday
+- an occupied room reports motion every few minutes (jittered), so
+  events arrive in bursts, as they do from real sensors
+- sessions that run at `now` leave rooms busy, so availability has both
+  states
+- the same seed always produces the same campus
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+CATEGORIES = ["class", "lab", "library", "hall"]
+TEACHING_DAYS = {6, 0, 1, 2, 3}  # Sunday-Thursday (datetime.weekday())
+
+
+@dataclass
+class CampusSpec:
+    buildings: int = 5
+    floors: int = 3
+    rooms_per_floor: int = 5
+    sensors_per_room: int = 1
+    days: int = 7
+    sessions_per_day: int = 3
+    ping_minutes: float = 5.0
+
+    @property
+    def rooms(self) -> int:
+        return self.buildings * self.floors * self.rooms_per_floor
+
+
+def generate_campus(
+    db,
+    spec: CampusSpec,
+    *,
+    seed: int = 1,
+    now: Optional[datetime] = None,
+    chunk_size: int = 5000,
+) -> Dict[str, int]:
+    """
+    Write a campus into db (any DB backend). Returns row counts per table.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(microsecond=0)
+
+    buildings = [
+        {"building_name": f"Building {b}", "floors": spec.floors, "color": f"#{rng.randrange(0x1000000):06x}"}
+        for b in range(1, spec.buildings + 1)
+    ]
+    building_ids = [db.insert("buildings", row) for row in buildings]
+
+    rooms: List[Dict[str, Any]] = []
+    for bid in building_ids:
+        for floor in range(1, spec.floors + 1):
+            for n in range(1, spec.rooms_per_floor + 1):
+                rooms.append(
+                    {
+                        "id_building": bid,
+                        "floor": floor,
+                        "class_number": floor * 100 + n,
+                        "category": rng.choice(CATEGORIES),
+                    }
+                )
+    room_ids = [db.insert("classrooms", row) for row in rooms]
+
+    # the room's first sensor reports its motion
+    sensor_of_room: Dict[int, int] = {}
+    for rid in room_ids:
+        for s in range(spec.sensors_per_room):
+            sid = db.insert("sensors", {"room_id": rid, "private_key": f"sk-{rid}-{s}", "public_key": f"pk-{rid}-{s}"})
+            sensor_of_room.setdefault(rid, sid)
+
+    events = 0
+    batch: List[Dict[str, Any]] = []
+    for row in motion_stream(sensor_of_room, spec, rng, now):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            events += db.insert_many("classroom_motion_events", batch)
+            batch = []
+    if batch:
+        events += db.insert_many("classroom_motion_events", batch)
+
+    return {
+        "buildings": len(building_ids),
+        "classrooms": len(room_ids),
+        "sensors": len(room_ids) * spec.sensors_per_room,
+        "classroom_motion_events": events,
+    }
+
+
+def motion_stream(sensor_of_room: Dict[int, int], spec: CampusSpec, rng: random.Random, now: datetime) -> Iterator[Dict[str, Any]]:
+    """Motion events of the last spec.days days, per room, ending at now."""
+    first_day = (now - timedelta(days=spec.days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    ping = timedelta(minutes=spec.ping_minutes)
+
+    for rid, sid in sensor_of_room.items():
+        for d in range(spec.days):
+            day = first_day + timedelta(days=d)
+            sessions = spec.sessions_per_day if day.weekday() in TEACHING_DAYS else max(spec.sessions_per_day // 3, 0)
+            for _ in range(sessions):
+                start = day + timedelta(hours=rng.randint(8, 18), minutes=rng.choice((0, 15, 30, 45)))
+                end = start + timedelta(hours=rng.randint(1, 3))
+                t = start
+                while t < end and t <= now:
+                    yield {"classroom_id": rid, "sensor_id": sid, "event_time": t}
+                    t += ping + timedelta(seconds=rng.randint(-60, 60))
@@ -0,0 +1,165 @@
+# benchmarks/run.py
+"""
+Service-level micro-benchmarks on a synthetic campus (see campus.py).
+
+    python -m benchmarks.run                          # all scales, compare to baselines
+    python -m benchmarks.run --scale small --repeat 50
+    python -m benchmarks.run --update-baselines       # store this machine's numbers
+
+Every benchmark runs inside a fresh RequestMemo, like one request, with
+a warm OccupancyEngine (the steady state of a running worker). The
+median per call is compared to benchmarks/baselines.json; a benchmark
+slower than baseline * tolerance (and by more than --min-delta-ms, so
+microsecond-level noise does not count) fails the run (exit code 1).
+Baselines are machine-specific: refresh them on the machine that checks.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+os.environ.setdefault("SENSORE_LOG_ACTIVITY", "900")
+
+from benchmarks.campus import CampusSpec, generate_campus  # noqa: E402
+from core.infrastructure.mock_json_db import MockJSONDB  # noqa: E402
+from core.request_memo import RequestMemo  # noqa: E402
+from models.building_model import BuildingModel  # noqa: E402
+from models.class_rooms_model import ClassRoomsModel  # noqa: E402
+from models.classroom_motion_events_model import ClassroomMotionEventsModel  # noqa: E402
+from models.sensors_model import SensorsModel  # noqa: E402
+from services.building_service import BuildingService  # noqa: E402
+from services.home_service import HomeService  # noqa: E402
+from services.occupancy_engine import OccupancyEngine  # noqa: E402
+from services.rooms_service import RoomsService  # noqa: E402
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+NOW = datetime(2026, 3, 3, 11, 0, 0)  # a Tuesday, mid-morning
+SEED = 1
+
+SCALES: Dict[str, CampusSpec] = {
+    "small": CampusSpec(buildings=5, floors=3, rooms_per_floor=5, days=7),
+    "medium": CampusSpec(buildings=20, floors=4, rooms_per_floor=8, days=3),
+    "large": CampusSpec(buildings=50, floors=5, rooms_per_floor=10, days=2),
+}
+
+
+def build_services(db) -> Dict[str, object]:
+    rooms_model = ClassRoomsModel(db)
+    events_model = ClassroomMotionEventsModel(db)
+    building_model = BuildingModel(db)
+
+    engine = OccupancyEngine(int(os.environ["SENSORE_LOG_ACTIVITY"]), resync_seconds=None, utcnow_fn=lambda: NOW)
+    rooms = RoomsService(db, rooms_model, events_model, SensorsModel(db), engine)
+    rooms.utcnow_fn = lambda: NOW
+    buildings = BuildingService(db, building_model, rooms_model, rooms)
+    home = HomeService(db, buildings, rooms, building_model, rooms_model, events_model)
+    home.utcnow_fn = lambda: NOW
+    return {"rooms": rooms, "buildings": buildings, "home": home}
+
+
+def benchmarks(services) -> Dict[str, Callable[[], object]]:
+    rooms, buildings, home = services["rooms"], services["buildings"], services["home"]
+    return {
+        "RoomsService.getAvailableRoomIds": rooms.getAvailableRoomIds,
+        "BuildingService.get_buildings_with_rooms": buildings.get_buildings_with_rooms,
+        "HomeService.getHomeBuildingsCards": home.getHomeBuildingsCards,
+        "HomeService.getHomeRecentSpaces": lambda: home.getHomeRecentSpaces(10),
+        "HomeService.getHomeAvailableNow": lambda: home.getHomeAvailableNow(6),
+    }
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        memo = RequestMemo()
+        with memo.activate():
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+    return {"median": statistics.median(samples), "min": min(samples)}
+
+
+def run_scale(name: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    db = MockJSONDB()
+    counts = generate_campus(db, SCALES[name], seed=SEED, now=NOW)
+    print(f"[{name}] " + ", ".join(f"{table}={n}" for table, n in counts.items()))
+
+    services = build_services(db)
+    services["rooms"].getAvailableRoomIds()  # load the engine once
+
+    results = {}
+    for label, fn in benchmarks(services).items():
+        fn()  # warm-up
+        results[label] = time_call(fn, repeat)
+    return results
+
+
+def load_baselines() -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, "r", encoding="utf-8") as fh:
+        return json.load(fh).get("results", {})
+
+
+def save_baselines(results: Dict[str, Dict[str, float]]) -> None:
+    payload = {
+        "machine": f"{platform.python_implementation()} {platform.python_version()} / {platform.machine()}",
+        "updated": datetime.utcnow().replace(microsecond=0).isoformat(),
+        "results": {
+            key: {"median_ms": round(r["median"] * 1000, 4)} for key, r in sorted(results.items())
+        },
+    }
+    with open(BASELINES_PATH, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2)
+        fh.write("\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Service micro-benchmarks on a synthetic campus.")
+    parser.add_argument("--scale", nargs="+", choices=sorted(SCALES), default=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1.5, help="fail when median > baseline * tolerance")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for scale in args.scale:
+        for label, r in run_scale(scale, args.repeat).items():
+            results[f"{scale}/{label}"] = r
+
+    baselines = load_baselines()
+    regressions = []
+    print(f"{'benchmark':58} {'median ms':>10} {'min ms':>10} {'baseline':>10}")
+    for key, r in results.items():
+        base = baselines.get(key, {}).get("median_ms")
+        median_ms = r["median"] * 1000
+        mark = ""
+        if base is not None and median_ms > base * args.tolerance and median_ms - base > args.min_delta_ms:
+            mark = "  REGRESSION"
+            regressions.append(key)
+        base_text = f"{base:10.3f}" if base is not None else f"{'-':>10}"
+        print(f"{key:58} {median_ms:10.3f} {r['min'] * 1000:10.3f} {base_text}{mark}")
+
+    if args.update_baselines:
+        merged = {k: {"median": v["median_ms"] / 1000} for k, v in baselines.items()}
+        merged.update(results)
+        save_baselines(merged)
+        print(f"baselines written to {BASELINES_PATH}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline x {args.tolerance}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,50 @@
 # container.py
 from __future__ import annotations
-from typing import Optional
+import atexit
+from contextlib import contextmanager
+from typing import Iterator, Optional
 
 # db
 from core.create_database import db
+from core.config import (
+    SENSORE_LOG_ACTIVITY,
+    OCCUPANCY_RESYNC_SECONDS,
+    HOME_SNAPSHOT_MAX_AGE,
+    SSE_HEARTBEAT_SECONDS,
+    SSE_CLIENT_QUEUE_SIZE,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_SIZE,
+    HEATMAP_WEEKS,
+    HEATMAP_UTC_OFFSET_MINUTES,
+    HEATMAP_RESYNC_SECONDS,
+    HEATMAP_RESYNC_OVERLAP_IDS,
+    RETENTION_DAYS,
+    RETENTION_DELETE_CHUNK,
+    RETENTION_INTERVAL_SECONDS,
+    CASCADE_DELETE_CHUNK,
+    MOTION_EVENTS_WRITE_BEHIND,
+    WRITE_BEHIND_MAX_QUEUE,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_INTERVAL,
+    SENSOR_CACHE_SIZE,
+    SENSOR_CACHE_TTL,
+    SENSOR_CACHE_NEGATIVE_TTL,
+    SENSOR_KEY_BLOOM,
+    SENSOR_KEY_BLOOM_REFRESH,
+)
+from core.infrastructure.write_behind import WriteBehindBuffer
+from core.infrastructure.ttl_cache import TTLCache
+from core.infrastructure.bloom_filter import RefreshingBloomFilter
+from core.request_memo import RequestMemo
+from core.response_cache import ResponseCache
+from core.metrics import METRICS, Metrics
 
 # models
 from models.building_model import BuildingModel
 from models.class_room_categories import ClassRoomCategoriesModel
 from models.class_rooms_model import ClassRoomsModel
 from models.classroom_motion_events_model import ClassroomMotionEventsModel
+from models.classroom_occupancy_hourly_model import ClassroomOccupancyHourlyModel
 from models.sensors_model import SensorsModel
 from models.users_model import UsersModel
 
@@ -17,24 +52,90 @@ from models.users_model import UsersModel
 from services.rooms_service import RoomsService
 from services.building_service import BuildingService
 from services.home_service import HomeService
+from services.occupancy_engine import OccupancyEngine
+from services.availability_stream import AvailabilityStream
+from services.retention_service import RetentionService
+from services.heatmap_service import HeatmapService
 
 
 class AppContainer:
     """
-    Composition Root:
+    Composition Root (one instance per process, built at startup):
     - builds & caches models/services
     - no string lookups
     - guarantees one instance per dependency (per container)
+
+    Scopes:
+    - process-scoped: db, occupancy engine, sensor credential cache, the
+      write-behind buffer, the SSE availability stream, the response
+      cache, the heatmap counters, the metrics registry, every model and
+      service. They hold no per-request state (or lock their own), so
+      threads share them.
+    - request-scoped: the RequestMemo created by request_scope(); inside it,
+      identical model reads and availability snapshots are computed once.
     """
 
-    def __init__(self, database=db) -> None:
+    def __init__(
+        self,
+        database=db,
+        occupancy: Optional[OccupancyEngine] = None,
+        events_buffer: Optional[WriteBehindBuffer] = None,
+        sensor_cache: Optional[TTLCache] = None,
+        sensor_key_filter: Optional[RefreshingBloomFilter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
         self._db = database
 
+        # process-wide state (defaults come from config)
+        self._occupancy = occupancy or OccupancyEngine(
+            int(SENSORE_LOG_ACTIVITY),
+            resync_seconds=OCCUPANCY_RESYNC_SECONDS,
+        )
+        self._sensor_cache = sensor_cache or TTLCache(
+            max_size=SENSOR_CACHE_SIZE,
+            ttl=SENSOR_CACHE_TTL,
+            negative_ttl=SENSOR_CACHE_NEGATIVE_TTL,
+        )
+
+        self._events_buffer = events_buffer
+        if self._events_buffer is None and MOTION_EVENTS_WRITE_BEHIND:
+            self._events_buffer = WriteBehindBuffer(
+                self._db,
+                "classroom_motion_events",
+                max_queue=WRITE_BEHIND_MAX_QUEUE,
+                batch_size=WRITE_BEHIND_BATCH_SIZE,
+                flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+            )
+            atexit.register(self._events_buffer.close)
+
+        self._sensor_key_filter = sensor_key_filter
+        if self._sensor_key_filter is None and SENSOR_KEY_BLOOM:
+            self._sensor_key_filter = RefreshingBloomFilter(
+                lambda: self.sensors_model.list_private_keys(),
+                refresh_seconds=SENSOR_KEY_BLOOM_REFRESH,
+            )
+
+        # rendered responses; availability transitions (event ingest,
+        # window expiry) invalidate the "availability" tag
+        self.response_cache = response_cache or ResponseCache(
+            RESPONSE_CACHE_SIZE,
+            enabled=RESPONSE_CACHE_ENABLED,
+            deadline_fn=self._availability_deadline,
+        )
+        self._occupancy.subscribe(lambda room_id, status, version: self.response_cache.invalidate("availability"))
+
+        # request latency and DB cost per route (Server-Timing, /metrics)
+        self.metrics = metrics or METRICS
+        # per-fingerprint slow statements (MySQL only; None elsewhere)
+        self.slow_query_log = getattr(self._db, "slow_query_log", None)
+
         # models cache
         self._building_model: Optional[BuildingModel] = None
         self._categories_model: Optional[ClassRoomCategoriesModel] = None
         self._class_rooms_model: Optional[ClassRoomsModel] = None
         self._motion_events_model: Optional[ClassroomMotionEventsModel] = None
+        self._occupancy_hourly_model: Optional[ClassroomOccupancyHourlyModel] = None
         self._sensors_model: Optional[SensorsModel] = None
         self._users_model: Optional[UsersModel] = None
 
@@ -42,6 +143,38 @@ class AppContainer:
         self._rooms_service: Optional[RoomsService] = None
         self._building_service: Optional[BuildingService] = None
         self._home_service: Optional[HomeService] = None
+        self._availability_stream: Optional[AvailabilityStream] = None
+        self._retention_service: Optional[RetentionService] = None
+        self._heatmap_service: Optional[HeatmapService] = None
+
+    def warm_up(self) -> "AppContainer":
+        """
+        Build every model/service now (at startup), so lazy properties are
+        never raced by request threads.
+        """
+        self.users_model
+        self.categories_model
+        self.home_service
+        self.availability_stream
+        if RETENTION_INTERVAL_SECONDS > 0:
+            self.retention_service.start(RETENTION_INTERVAL_SECONDS)
+            atexit.register(self.retention_service.stop)
+        return self
+
+    def _availability_deadline(self, tags):
+        # cached availability is valid until the next activity window runs out
+        if "availability" not in tags:
+            return None
+        next_change = self.rooms_service.next_availability_change()
+        if next_change is None:
+            return None
+        return (next_change - self._occupancy.utcnow_fn()).total_seconds()
+
+    @contextmanager
+    def request_scope(self) -> Iterator[RequestMemo]:
+        memo = RequestMemo()
+        with memo.activate():
+            yield memo
 
     # --------------------
     # MODELS
@@ -67,13 +200,19 @@ class AppContainer:
     @property
     def motion_events_model(self) -> ClassroomMotionEventsModel:
         if self._motion_events_model is None:
-            self._motion_events_model = ClassroomMotionEventsModel(self._db)
+            self._motion_events_model = ClassroomMotionEventsModel(self._db, self._events_buffer)
         return self._motion_events_model
 
+    @property
+    def occupancy_hourly_model(self) -> ClassroomOccupancyHourlyModel:
+        if self._occupancy_hourly_model is None:
+            self._occupancy_hourly_model = ClassroomOccupancyHourlyModel(self._db)
+        return self._occupancy_hourly_model
+
     @property
     def sensors_model(self) -> SensorsModel:
         if self._sensors_model is None:
-            self._sensors_model = SensorsModel(self._db)
+            self._sensors_model = SensorsModel(self._db, self._sensor_cache, self._sensor_key_filter)
         return self._sensors_model
 
     @property
@@ -93,6 +232,10 @@ class AppContainer:
                 self.class_rooms_model,
                 self.motion_events_model,
                 self.sensors_model,
+                self._occupancy,
+                self.occupancy_hourly_model,
+                self.heatmap_service,
+                delete_chunk_size=CASCADE_DELETE_CHUNK,
             )
         return self._rooms_service
 
@@ -116,7 +259,45 @@ class AppContainer:
                 self.rooms_service,
                 self.building_model,
                 self.class_rooms_model,
-                self.motion_events_model
+                self.motion_events_model,
+                snapshot_max_age=HOME_SNAPSHOT_MAX_AGE,
             )
         return self._home_service
 
+    @property
+    def heatmap_service(self) -> HeatmapService:
+        if self._heatmap_service is None:
+            self._heatmap_service = HeatmapService(
+                self.motion_events_model,
+                self.occupancy_hourly_model,
+                self.class_rooms_model,
+                weeks=HEATMAP_WEEKS,
+                utc_offset_minutes=HEATMAP_UTC_OFFSET_MINUTES,
+                resync_seconds=HEATMAP_RESYNC_SECONDS,
+                resync_overlap_ids=HEATMAP_RESYNC_OVERLAP_IDS,
+            )
+        return self._heatmap_service
+
+    @property
+    def availability_stream(self) -> AvailabilityStream:
+        if self._availability_stream is None:
+            self._availability_stream = AvailabilityStream(
+                self.rooms_service,
+                self._occupancy,
+                heartbeat_seconds=SSE_HEARTBEAT_SECONDS,
+                client_queue_size=SSE_CLIENT_QUEUE_SIZE,
+            )
+        return self._availability_stream
+
+    @property
+    def retention_service(self) -> RetentionService:
+        if self._retention_service is None:
+            self._retention_service = RetentionService(
+                self._db,
+                self.motion_events_model,
+                self.occupancy_hourly_model,
+                activity_seconds=int(SENSORE_LOG_ACTIVITY),
+                retention_days=RETENTION_DAYS,
+                delete_chunk_size=RETENTION_DELETE_CHUNK,
+            )
+        return self._retention_service
@@ -1,8 +1,13 @@
 from core.controller_base import ControllerBase
 from core.config import (SECRET_JWT_KEY)
 from core.validations.CreateValidation import CreateValidation
+from datetime import datetime, timedelta, timezone
 import jwt
 import time
+
+MAX_BATCH_EVENTS = 1000
+# sensor clocks may run a little fast; later event_times are rejected
+MAX_EVENT_CLOCK_SKEW_SECONDS = 60
 # app/controllers/home_controller.py
 class DashboardadminController(ControllerBase):
     def __init__(self, _container):
@@ -18,6 +23,10 @@ class DashboardadminController(ControllerBase):
         self.rooms_service = _container.rooms_service
         self.building_service = _container.building_service
 
+        # mutations below invalidate cached student pages ("catalog");
+        # event ingest invalidates "availability" through the occupancy engine
+        self.response_cache = _container.response_cache
+
     def print(self, params):
         categories = self.class_room_categories_model.filter()
         rooms = self.class_rooms_model.filter()
@@ -26,7 +35,7 @@ class DashboardadminController(ControllerBase):
             "buildings_server": buildings,
             "classRoom_categories_server" : categories,
             "rooms_server": rooms,
-            "sensors_server": list(map(lambda s: {"id": s['id'], "room_id" : s['room_id'], 'public_key': s['public_key']}, self.sensor_model.filter()))
+            "sensors_server": self.sensor_model.filter(columns=["id", "room_id", "public_key"])
         }
 
         return self.responseHTML(context, "admin-dashboard")
@@ -36,12 +45,69 @@ class DashboardadminController(ControllerBase):
         sensor = self.sensor_model.get_by_privateKey(sensor_private_key)
 
         if sensor:
-            new_row = {"classroom_id":sensor['room_id'], "sensor_id": sensor['id']}
-            self.motion_events_model.create(new_row)
+            self.rooms_service.record_motion(sensor)
             return self.responseJSON("Done", True)
 
         return self.responseJSON("Error - sensor not found", False)
 
+    def createNewActivities(self, params):
+        """
+        Batch ingest for gateways that buffer readings:
+        {"events": [{"private_key": "...", "event_time": "2026-01-01T12:00:00"}, ...]}
+        - event_time is optional (ISO 8601, UTC when naive), default: now;
+          more than MAX_EVENT_CLOCK_SKEW_SECONDS ahead of now is rejected
+        - all keys are resolved in one query, all rows written in one insert
+        """
+        events = params.get("events")
+        if not isinstance(events, list) or not events:
+            return self.responseJSON("Error - events must be a non-empty list", False)
+        if len(events) > MAX_BATCH_EVENTS:
+            return self.responseJSON(f"Error - at most {MAX_BATCH_EVENTS} events per batch", False)
+
+        keys = [e.get("private_key") for e in events if isinstance(e, dict)]
+        sensors = self.sensor_model.get_by_privateKeys([k for k in keys if isinstance(k, str)])
+
+        latest = self.rooms_service.utcnow_fn() + timedelta(seconds=MAX_EVENT_CLOCK_SKEW_SECONDS)
+        readings = []
+        rejected = []
+        for index, event in enumerate(events):
+            if not isinstance(event, dict):
+                rejected.append({"index": index, "error": "event must be an object"})
+                continue
+
+            key = event.get("private_key")
+            sensor = sensors.get(key) if isinstance(key, str) else None
+            if sensor is None:
+                rejected.append({"index": index, "error": "sensor not found"})
+                continue
+
+            event_time = self._parse_event_time(event.get("event_time"))
+            if event_time is False:
+                rejected.append({"index": index, "error": "invalid event_time"})
+                continue
+            if event_time is not None and event_time > latest:
+                rejected.append({"index": index, "error": "event_time is in the future"})
+                continue
+
+            readings.append((sensor, event_time))
+
+        accepted = self.rooms_service.record_motion_batch(readings) if readings else 0
+        return self.responseJSON({"accepted": accepted, "rejected": rejected}, bool(readings))
+
+    def _parse_event_time(self, value):
+        # None -> "now" (resolved by the service), False -> invalid
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            return False
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return False
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
     def createNewSensor(self, params):    
         validator = CreateValidation("sensor", params).create_validator()
         errors = validator.validate()
@@ -55,6 +121,7 @@ class DashboardadminController(ControllerBase):
         room = self.class_rooms_model.get_by_id(room_id)
         if room:
             id = self.sensor_model.create({"room_id":room_id, "private_key" : private_key, "public_key" : params['public_key']})
+            self.response_cache.invalidate("catalog")
             return self.responseJSON({"public_key": params['public_key'], "private_key": private_key, "id": id}, True)
 
         return self.responseJSON("Error - room not found", False)
@@ -73,6 +140,8 @@ class DashboardadminController(ControllerBase):
         building = self.building_model.get_by_id(building_id)
         if building:
             id = self.class_rooms_model.create({"id_building":building_id, "floor":floor, "class_number": class_number, "category": category_id})
+            self.rooms_service.register_room(id)
+            self.response_cache.invalidate("catalog")
             return self.responseJSON({"id":id}, True)
 
         return self.responseJSON("Error - building not found", False)
@@ -89,6 +158,7 @@ class DashboardadminController(ControllerBase):
 
         id = self.building_model.create({"building_name": building_name, "floors": floors, "color": color})
         if id:
+            self.response_cache.invalidate("catalog")
             return self.responseJSON({"id":id}, True)   
 
         return self.responseJSON("Error", False)
@@ -117,6 +187,7 @@ class DashboardadminController(ControllerBase):
     def deleteClassRoom(self, params):
         class_id = params["class_id"]
         if self.rooms_service.delete_room_by_id(class_id):
+            self.response_cache.invalidate("catalog")
             return self.responseJSON("Done", True)
 
         return self.responseJSON("Error - Operation failed", False)
@@ -125,6 +196,7 @@ class DashboardadminController(ControllerBase):
     def deleteBuilding(self, params):
         building_id = params["building_id"]
         if self.building_service.delete_building_by_id(building_id):
+            self.response_cache.invalidate("catalog")
             return self.responseJSON("Done", True)
 
         return self.responseJSON("Error - building not found", False)
\ No newline at end of file
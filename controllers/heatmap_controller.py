@@ -0,0 +1,28 @@
+from core.controller_base import ControllerBase
+
+class HeatmapController(ControllerBase):
+    # response cache: {action: (ttl seconds, invalidation tags)}; history moves slowly
+    CACHE = {"room": (60, ("catalog",)), "building": (60, ("catalog",))}
+
+    def __init__(self, _container):
+        self.heatmap_service = _container.heatmap_service
+
+    def room(self, params):
+        # GET /heatmap?method=room&id=<classroom id>
+        room_id = self._to_int(params.get("id"))
+        if room_id is None:
+            return self.responseJSON("Error - id must be an integer", False, 400)
+        return self.responseJSON(self.heatmap_service.room_heatmap(room_id))
+
+    def building(self, params):
+        # GET /heatmap?method=building&id=<building id>
+        building_id = self._to_int(params.get("id"))
+        if building_id is None:
+            return self.responseJSON("Error - id must be an integer", False, 400)
+        return self.responseJSON(self.heatmap_service.building_heatmap(building_id))
+
+    def _to_int(self, value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
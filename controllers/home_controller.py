@@ -2,20 +2,21 @@
 from core.controller_base import ControllerBase
 
 class HomeController(ControllerBase):
+    # response cache: {action: (ttl seconds, invalidation tags)}
+    CACHE = {"print": (30, ("catalog", "availability"))}
+
     def __init__(self, _container):
         self.home_service = _container.home_service
         
     def print(self, params):
 
-        buildings = self.home_service.getHomeBuildingsCards()
-        recent_spaces = self.home_service.getHomeRecentSpaces(limit=10)
-        available_now = self.home_service.getHomeAvailableNow(limit=6)
+        snapshot = self.home_service.get_home_snapshot(recent_limit=10, available_limit=6)
 
         context = {
             "page": "home",
-            "buildings_server": buildings,
-            "recentSpaces_server": recent_spaces,
-            "available_now_server": available_now,
+            "buildings_server": snapshot["buildings"],
+            "recentSpaces_server": snapshot["recentSpaces"],
+            "available_now_server": snapshot["availableNow"],
         }
 
         return self.responseHTML(context, "index")
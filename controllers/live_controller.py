@@ -0,0 +1,21 @@
+from flask import Response
+
+from core.controller_base import ControllerBase
+
+class LiveController(ControllerBase):
+    # response cache: {action: (ttl seconds, invalidation tags)}; never the stream
+    CACHE = {"snapshot": (30, ("availability",))}
+
+    def __init__(self, _container):
+        self.availability_stream = _container.availability_stream
+
+    def print(self, params):
+        # Server-Sent Events: one snapshot, then room transitions as they happen
+        return Response(
+            self.availability_stream.stream(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def snapshot(self, params):
+        return self.responseJSON(self.availability_stream.snapshot())
@@ -0,0 +1,20 @@
+from flask import Response
+
+from core.controller_base import ControllerBase
+
+class MetricsController(ControllerBase):
+    def __init__(self, _container):
+        self.metrics = _container.metrics
+        self.slow_query_log = _container.slow_query_log
+
+    def print(self, params):
+        # Prometheus text exposition: request latency and DB cost per route
+        if not self.metrics.enabled:
+            return self.responseJSON("metrics are disabled", False, 404)
+        return Response(self.metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    def slow_queries(self, params):
+        # GET /metrics?method=slow_queries: slow statements per fingerprint, slowest total first
+        if self.slow_query_log is None:
+            return self.responseJSON("slow-query log is off for this database", False, 404)
+        return self.responseJSON({"dropped": self.slow_query_log.dropped, "queries": self.slow_query_log.dump()})
@@ -2,6 +2,9 @@
 from core.controller_base import ControllerBase
 
 class SearchController(ControllerBase):
+    # response cache: {action: (ttl seconds, invalidation tags)}
+    CACHE = {"print": (30, ("catalog", "availability"))}
+
     def __init__(self, _container):
         self.building_service = _container.building_service
 
@@ -5,10 +5,12 @@ from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple, Union
 import json
 
-from flask import render_template, abort, Response, jsonify
+from flask import render_template, abort, Response, jsonify, make_response
 from werkzeug.wrappers import Request
 
 from core.controller_loader import ControllerLoader
+from core.response_cache import ResponseCache
+from core.metrics import Metrics, RequestTimings
 from container import AppContainer
 
 @dataclass
@@ -19,11 +21,39 @@ class AppCall:
 
 
 class Application:
-    def __init__(self, controller_loader: Optional[ControllerLoader] = None, logger: Any = None):
+    """
+    Front controller. Built once per process:
+    - controller classes are resolved at startup (ControllerLoader)
+    - one process-scoped AppContainer is shared by all requests
+    - each request runs inside container.request_scope()
+    - GET actions listed in a controller's CACHE are served from the
+      response cache (see core.response_cache)
+    - every request is timed; DB operations are counted against its
+      (controller, action) and reported as a Server-Timing header and on
+      /metrics (see core.metrics)
+    """
+
+    def __init__(
+        self,
+        controller_loader: Optional[ControllerLoader] = None,
+        logger: Any = None,
+        container: Optional[AppContainer] = None,
+        response_cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+    ):
         self.controller_loader = controller_loader or ControllerLoader()
+        self.container = container or AppContainer().warm_up()
+        self.response_cache = response_cache or self.container.response_cache
+        self.metrics = metrics or self.container.metrics
         self.logger = logger
 
     def handle(self, request: Request, controller_from_path: str) -> Response:
+        with self.metrics.track_request() as timings:
+            response = make_response(self._dispatch(request, controller_from_path, timings))
+            self._observe(timings, response)
+        return response
+
+    def _dispatch(self, request: Request, controller_from_path: str, timings: RequestTimings) -> Any:
         errors: list[str] = []
         
         call = self._parse_request(request, controller_from_path)
@@ -31,7 +61,8 @@ class Application:
             return render_template("error.html", errors=errors), 400
 
         try:
-            controller = self.controller_loader.get_controller(call.controller_name, AppContainer())
+            container = self.container
+            controller = self.controller_loader.get_controller(call.controller_name, container)
 
             method = getattr(controller, call.method_name, None)
             if not callable(method):
@@ -40,26 +71,77 @@ class Application:
                     errors=[f"Action '{call.method_name}' not found in controller '{call.controller_name}'"],
                 ), 404
 
+            timings.tag(call.controller_name, call.method_name)
+
+            cache_policy = self._cache_policy(request, controller, call)
+            if cache_policy is not None:
+                ttl, tags = cache_policy
+                cache_key = self.response_cache.key(call.controller_name, call.method_name, call.params)
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    self._log_call(call)
+                    return self._cached_response(cached)
+                versions = self.response_cache.tag_versions(tags)
+
             # Controllers expect: method(params: dict)
-            result = method(call.params)
+            with container.request_scope():
+                result = method(call.params)
 
-            if self.logger is not None:
-                try:
-                    self.logger.insert(
-                        {
-                            "params": call.params,
-                            "method": call.method_name,
-                            "controller": call.controller_name,
-                        }
-                    )
-                except Exception:
-                    pass
+            self._log_call(call)
 
-            return self._build_response(result)
+            response = self._build_response(result)
+            if cache_policy is not None:
+                response = self._store_response(cache_key, response, ttl, versions)
+            return response
 
         except Exception as err:
             return render_template("error.html", errors=[f"Internal Error: {str(err)}"]), 500
 
+    def _observe(self, timings: RequestTimings, response: Response) -> None:
+        if not self.metrics.enabled:
+            return
+        response.headers["Server-Timing"] = timings.server_timing()
+        # unresolved routes (bad controller/action) stay out of the per-route series
+        if timings.tagged:
+            self.metrics.observe_request(timings.controller, timings.action, response.status_code, timings.elapsed())
+
+    def _log_call(self, call: AppCall) -> None:
+        if self.logger is None:
+            return
+        try:
+            self.logger.insert(
+                {
+                    "params": call.params,
+                    "method": call.method_name,
+                    "controller": call.controller_name,
+                }
+            )
+        except Exception:
+            pass
+
+    def _cache_policy(self, request: Request, controller: Any, call: AppCall) -> Optional[Tuple[float, Tuple[str, ...]]]:
+        # controllers declare CACHE = {"action": (ttl_seconds, tags)}
+        if request.method != "GET":
+            return None
+        policy = (getattr(controller, "CACHE", None) or {}).get(call.method_name)
+        if policy is None:
+            return None
+        ttl, tags = policy
+        return float(ttl), tuple(tags)
+
+    def _store_response(self, key: Any, built: Any, ttl: float, versions: Any) -> Response:
+        response = make_response(built)
+        if response.status_code == 200 and not response.is_streamed:
+            self.response_cache.set(key, (response.get_data(), response.status_code, response.mimetype), ttl, versions)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    def _cached_response(self, payload: Any) -> Response:
+        body, status, mimetype = payload
+        response = Response(body, status=status, mimetype=mimetype)
+        response.headers["X-Cache"] = "HIT"
+        return response
+
     def _parse_request(self, request: Request, controller_from_path: str) -> AppCall:
         controller_name = (controller_from_path or "home").lower().strip()
 
@@ -4,6 +4,40 @@ from dotenv import load_dotenv
 load_dotenv()
 
 SENSORE_LOG_ACTIVITY = os.getenv("SENSORE_LOG_ACTIVITY")
+OCCUPANCY_RESYNC_SECONDS = int(os.getenv("OCCUPANCY_RESYNC_SECONDS", 30))
+HOME_SNAPSHOT_MAX_AGE = float(os.getenv("HOME_SNAPSHOT_MAX_AGE", 30))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+SSE_CLIENT_QUEUE_SIZE = int(os.getenv("SSE_CLIENT_QUEUE_SIZE", 256))
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1000))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+HEATMAP_WEEKS = int(os.getenv("HEATMAP_WEEKS", 8))
+HEATMAP_UTC_OFFSET_MINUTES = int(os.getenv("HEATMAP_UTC_OFFSET_MINUTES", 0))
+HEATMAP_RESYNC_SECONDS = float(os.getenv("HEATMAP_RESYNC_SECONDS", 300))
+HEATMAP_RESYNC_OVERLAP_IDS = int(os.getenv("HEATMAP_RESYNC_OVERLAP_IDS", 1000))
+
+SENSOR_CACHE_SIZE = int(os.getenv("SENSOR_CACHE_SIZE", 10000))
+SENSOR_CACHE_TTL = float(os.getenv("SENSOR_CACHE_TTL", 300))
+SENSOR_CACHE_NEGATIVE_TTL = float(os.getenv("SENSOR_CACHE_NEGATIVE_TTL", 30))
+SENSOR_KEY_BLOOM = os.getenv("SENSOR_KEY_BLOOM", "false").lower() == "true"
+SENSOR_KEY_BLOOM_REFRESH = float(os.getenv("SENSOR_KEY_BLOOM_REFRESH", 60))
+
+MOTION_EVENTS_WRITE_BEHIND = os.getenv("MOTION_EVENTS_WRITE_BEHIND", "false").lower() == "true"
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", 10000))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 500))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", 1))
+
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", 30))
+RETENTION_DELETE_CHUNK = int(os.getenv("RETENTION_DELETE_CHUNK", 1000))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", 0))  # 0: schedule off
+CASCADE_DELETE_CHUNK = int(os.getenv("CASCADE_DELETE_CHUNK", 1000))
+
+MOCK_DB_FSYNC_EVERY = int(os.getenv("MOCK_DB_FSYNC_EVERY", 100))
+MOCK_DB_FSYNC_INTERVAL = float(os.getenv("MOCK_DB_FSYNC_INTERVAL", 1))
+MOCK_DB_COMPACT_INTERVAL = float(os.getenv("MOCK_DB_COMPACT_INTERVAL", 60))
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "database/freeclass.sqlite3")
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 5))
 
 MYSQL_HOST = os.getenv("MYSQL_HOST")
 MYSQL_USER = os.getenv("MYSQL_USER")
@@ -11,6 +45,15 @@ MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT", 3306))
 MYSQL_SSL_REQUIRED = os.getenv("MYSQL_SSL_REQUIRED", "true").lower() == "true"
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", 10))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", 5))
+MYSQL_POOL_HEALTH_CHECK_IDLE = float(os.getenv("MYSQL_POOL_HEALTH_CHECK_IDLE", 30))
+MYSQL_SLOW_QUERY_LOG = os.getenv("MYSQL_SLOW_QUERY_LOG", "true").lower() == "true"
+MYSQL_SLOW_QUERY_MS = float(os.getenv("MYSQL_SLOW_QUERY_MS", 100))
+MYSQL_SLOW_QUERY_SAMPLE_RATE = float(os.getenv("MYSQL_SLOW_QUERY_SAMPLE_RATE", 1))
+MYSQL_STATEMENT_CACHE_SIZE = int(os.getenv("MYSQL_STATEMENT_CACHE_SIZE", 512))
+# prepared cursors kept per pooled connection; 0 = no server-side prepares
+MYSQL_PREPARED_PER_CONNECTION = int(os.getenv("MYSQL_PREPARED_PER_CONNECTION", 64))
 
 SECRET_JWT_KEY = os.getenv("SECRET_JWT_KEY")
 
@@ -3,33 +3,55 @@ from __future__ import annotations
 
 import importlib
 import os
-from typing import Any
+from typing import Any, Dict, Optional
 
 
 class ControllerLoader:
+    """
+    Resolves "<name>" -> controllers/<name>_controller.py::<Name>Controller.
+
+    The controllers folder is scanned and every module imported once, at
+    construction, into a dispatch table; lookups per request are a dict get.
+    """
+
     CONTROLLERS_PACKAGE = "controllers"
-    CONTROLLERS_PATH = "controllers"
+    CONTROLLERS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "controllers")
+
+    def __init__(self, controllers_path: Optional[str] = None) -> None:
+        self.controllers_path = controllers_path or self.CONTROLLERS_PATH
+        self._classes: Dict[str, type] = self._load_all()
+
+    def _load_all(self) -> Dict[str, type]:
+        classes: Dict[str, type] = {}
+        for file_name in sorted(os.listdir(self.controllers_path)):
+            if not file_name.endswith("_controller.py") or file_name.startswith("_"):
+                continue
+
+            name = file_name[: -len("_controller.py")]
+            module_name = f"{self.CONTROLLERS_PACKAGE}.{name}_controller"
+            class_name = f"{name.capitalize()}Controller"
+
+            module = importlib.import_module(module_name)
+
+            if not hasattr(module, class_name):
+                raise AttributeError(
+                    f"Class '{class_name}' not found in {module_name}"
+                )
+
+            classes[name] = getattr(module, class_name)
+        return classes
+
+    def controller_names(self):
+        return sorted(self._classes)
 
     def is_controller_exist(self, name: str) -> bool:
         if name.startswith("_"):
             return False
 
-        file_name = f"{name}_controller.py"
-        return file_name in os.listdir(self.CONTROLLERS_PATH)
+        return name in self._classes
 
     def get_controller(self, name: str, _container) -> Any:
         if not self.is_controller_exist(name):
             raise KeyError(f"Controller '{name}' not found")
 
-        module_name = f"{self.CONTROLLERS_PACKAGE}.{name}_controller"
-        class_name = f"{name.capitalize()}Controller"
-
-        module = importlib.import_module(module_name)
-
-        if not hasattr(module, class_name):
-            raise AttributeError(
-                f"Class '{class_name}' not found in {module_name}"
-            )
-
-        cls = getattr(module, class_name)
-        return cls(_container)
+        return self._classes[name](_container)
@@ -1,5 +1,9 @@
+import atexit
+
 from core.infrastructure.mysql import MySQL
 from core.infrastructure.mock_json_db import MockJSONDB
+from core.infrastructure.sqlite import SQLite
+from core.infrastructure.slow_query_log import SlowQueryLog
 from core.config import (
     MYSQL_HOST,
     MYSQL_USER,
@@ -7,6 +11,19 @@ from core.config import (
     MYSQL_DATABASE,
     MYSQL_PORT,
     MYSQL_SSL_REQUIRED,
+    MYSQL_POOL_SIZE,
+    MYSQL_POOL_TIMEOUT,
+    MYSQL_POOL_HEALTH_CHECK_IDLE,
+    MYSQL_SLOW_QUERY_LOG,
+    MYSQL_SLOW_QUERY_MS,
+    MYSQL_SLOW_QUERY_SAMPLE_RATE,
+    MYSQL_STATEMENT_CACHE_SIZE,
+    MYSQL_PREPARED_PER_CONNECTION,
+    MOCK_DB_FSYNC_EVERY,
+    MOCK_DB_FSYNC_INTERVAL,
+    MOCK_DB_COMPACT_INTERVAL,
+    SQLITE_PATH,
+    SQLITE_BUSY_TIMEOUT,
 
     ENV_MODE
 )
@@ -20,10 +37,33 @@ def createDatabase(_mode="production"):
             database=MYSQL_DATABASE,
             port=MYSQL_PORT,
             ssl_required=MYSQL_SSL_REQUIRED,
+            pool_size=MYSQL_POOL_SIZE,
+            pool_timeout=MYSQL_POOL_TIMEOUT,
+            pool_health_check_idle=MYSQL_POOL_HEALTH_CHECK_IDLE,
+            slow_query_log=(
+                SlowQueryLog(MYSQL_SLOW_QUERY_MS, sample_rate=MYSQL_SLOW_QUERY_SAMPLE_RATE)
+                if MYSQL_SLOW_QUERY_LOG
+                else None
+            ),
+            statement_cache_size=MYSQL_STATEMENT_CACHE_SIZE,
+            prepared_per_connection=MYSQL_PREPARED_PER_CONNECTION,
         )
 
     elif _mode == "develop":
-        return MockJSONDB("database/mock_db.json")
+        mock = MockJSONDB(
+            "database/mock_db.json",
+            fsync_every=MOCK_DB_FSYNC_EVERY,
+            fsync_interval=MOCK_DB_FSYNC_INTERVAL,
+            compact_interval=MOCK_DB_COMPACT_INTERVAL,
+        )
+        # fold the journal into the snapshot on shutdown
+        atexit.register(mock.close)
+        return mock
+
+    elif _mode == "local":
+        sqlite = SQLite(SQLITE_PATH, busy_timeout=SQLITE_BUSY_TIMEOUT)
+        atexit.register(sqlite.close)
+        return sqlite
 
     else:
         raise ValueError(f"Unknown ENV_MODE: {_mode}")
@@ -0,0 +1,133 @@
+# core/infrastructure/bloom_filter.py
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter for strings.
+
+    - might_contain() == False means "definitely not added"
+    - might_contain() == True may be a false positive (~error_rate)
+    - there is no remove(); rebuild instead
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(int(capacity), 1)
+        self.size_bits = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.size_bits / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size_bits + 7) // 8)
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # double hashing: h1 + i*h2
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.size_bits
+
+
+class RefreshingBloomFilter:
+    """
+    BloomFilter rebuilt from loader() every refresh_seconds.
+
+    Other worker processes may add keys this one has not seen yet, so a
+    negative answer is only trusted until the next rebuild.
+
+    The rebuild is single-flight and runs outside the lock: while one
+    thread reloads, the others keep answering from the previous filter
+    (only the very first build makes callers wait). Keys add()ed during a
+    rebuild are carried over into the new filter.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[str]],
+        *,
+        refresh_seconds: float = 60.0,
+        error_rate: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.error_rate = error_rate
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._filter: Optional[BloomFilter] = None
+        self._built_at = 0.0
+        self._pending: Optional[List[str]] = None  # add()s during a rebuild
+        self._generation = 0  # bumped by invalidate()
+
+    def might_contain(self, item: str) -> bool:
+        return self._current().might_contain(item)
+
+    def add(self, item: str) -> None:
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(item)
+            if self._pending is not None:
+                self._pending.append(item)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._filter = None
+            self._generation += 1
+
+    def _fresh(self) -> Optional[BloomFilter]:
+        # lock held
+        if self._filter is not None and self._clock() - self._built_at < self.refresh_seconds:
+            return self._filter
+        return None
+
+    def _current(self) -> BloomFilter:
+        with self._lock:
+            bloom = self._fresh()
+            if bloom is not None:
+                return bloom
+            previous = self._filter
+
+        # single-flight: with a previous filter, do not wait for the rebuild
+        if not self._load_lock.acquire(blocking=previous is None):
+            return previous
+        try:
+            with self._lock:
+                bloom = self._fresh()
+                if bloom is not None:
+                    return bloom
+                self._pending = []
+                generation = self._generation
+
+            try:
+                items = list(self._loader())
+                bloom = BloomFilter(max(len(items) * 2, 1024), self.error_rate)
+                for item in items:
+                    bloom.add(item)
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                for item in self._pending:
+                    bloom.add(item)
+                self._pending = None
+                self._filter = bloom
+                # invalidated while loading: use it, but rebuild on the next read
+                self._built_at = self._clock() if generation == self._generation else float("-inf")
+            return bloom
+        finally:
+            self._load_lock.release()
@@ -0,0 +1,205 @@
+# core/infrastructure/connection_pool.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+
+class PoolTimeoutError(RuntimeError):
+    """No connection became free within checkout_timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe connection pool.
+
+    - at most max_size connections exist; they are opened lazily
+    - checkout() waits up to checkout_timeout for a free connection
+    - a connection is health-checked only when it sat idle for at least
+      health_check_idle_seconds (instead of a ping before every query)
+    - stats() reports usage and saturation (waits, timeouts, wait time)
+
+    Usage:
+        with pool.connection() as conn:
+            ...
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        *,
+        max_size: int = 10,
+        checkout_timeout: float = 5.0,
+        health_check_idle_seconds: float = 30.0,
+        is_alive: Optional[Callable[[Any], bool]] = None,
+        close: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be > 0")
+
+        self._factory = factory
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_idle_seconds = health_check_idle_seconds
+        self._is_alive = is_alive or (lambda conn: True)
+        self._close = close or (lambda conn: conn.close())
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+
+        self._stats: Dict[str, float] = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_checks": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    # -----------------------------
+    # CHECKOUT / CHECKIN
+    # -----------------------------
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.checkout()
+        broken = False
+        try:
+            yield conn
+        except BaseException:
+            broken = not self._safe_is_alive(conn)
+            raise
+        finally:
+            self.checkin(conn, discard=broken)
+
+    def checkout(self, timeout: Optional[float] = None) -> Any:
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"no connection available within {timeout:.1f}s (max_size={self.max_size})"
+                        )
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()  # LIFO: reuse the warmest
+                    create = False
+                else:
+                    conn, last_used = None, 0.0
+                    create = True
+                self._size += 1 if create else 0
+                self._in_use += 1
+
+            if create:
+                try:
+                    conn = self._factory()
+                except BaseException:
+                    self._release_slot()
+                    raise
+                self._bump("created")
+            elif time.monotonic() - last_used >= self.health_check_idle_seconds:
+                self._bump("health_checks")
+                if not self._safe_is_alive(conn):
+                    self._discard(conn)
+                    continue
+
+            self._record_checkout(time.monotonic() - started)
+            return conn
+
+    def checkin(self, conn: Any, *, discard: bool = False) -> None:
+        if discard:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+
+        for conn, _ in idle:
+            self._safe_close(conn)
+
+    # -----------------------------
+    # STATS
+    # -----------------------------
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            result = dict(self._stats)
+            result.update(
+                max_size=self.max_size,
+                size=self._size,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                waiting=self._waiting,
+                saturation=self._in_use / self.max_size,
+            )
+        return result
+
+    # -----------------------------
+    # INTERNAL
+    # -----------------------------
+
+    def _discard(self, conn: Any) -> None:
+        self._release_slot()
+        self._bump("discarded")
+        self._safe_close(conn)
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _record_checkout(self, waited_seconds: float) -> None:
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_seconds_total"] += waited_seconds
+            if waited_seconds > self._stats["wait_seconds_max"]:
+                self._stats["wait_seconds_max"] = waited_seconds
+
+    def _bump(self, key: str) -> None:
+        with self._cond:
+            self._stats[key] += 1
+
+    def _safe_is_alive(self, conn: Any) -> bool:
+        try:
+            return bool(self._is_alive(conn))
+        except Exception:
+            return False
+
+    def _safe_close(self, conn: Any) -> None:
+        try:
+            self._close(conn)
+        except Exception:
+            pass
@@ -0,0 +1,160 @@
+# core/infrastructure/filters.py
+"""
+Shared filter syntax for DB.select / update / delete.
+
+A filter is a dict of "column" or "column <op>" keys, ANDed together:
+
+    {"id": 3}                          -> id = 3
+    {"id": [1, 2, 3]}                  -> id IN (1, 2, 3)
+    {"category": None}                 -> category IS NULL
+    {"event_time >=": since}           -> event_time >= since
+    {"event_time <": until}            -> event_time < until
+    {"id !=": [4, 5]}                  -> id NOT IN (4, 5)
+    {"payload !=": None}               -> payload IS NOT NULL
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=")
+
+_COLUMN_RE = re.compile(r"[A-Za-z0-9_]+")
+
+
+def validate_column(column: str) -> str:
+    if not _COLUMN_RE.fullmatch(str(column)):
+        raise ValueError("column contains invalid characters")
+    return column
+
+
+def parse_filter_key(key: str) -> Tuple[str, str]:
+    """
+    "event_time >=" -> ("event_time", ">=")
+    "id"            -> ("id", "=")
+    """
+    parts = str(key).split()
+    if len(parts) == 1:
+        column, op = parts[0], "="
+    elif len(parts) == 2:
+        column, op = parts
+    else:
+        raise ValueError("filter key format is invalid")
+
+    if op not in OPERATORS:
+        raise ValueError(f"filter operator '{op}' is not supported")
+
+    return validate_column(column), op
+
+
+def is_list_value(value: Any) -> bool:
+    return isinstance(value, (list, tuple, set, frozenset))
+
+
+def build_where(filters: Optional[Dict[str, Any]], placeholder: str) -> Tuple[str, List[Any]]:
+    """
+    " WHERE ..." (or "") and its values, for SQL backends.
+    placeholder: the driver's parameter marker ("%s" MySQL, "?" SQLite).
+    """
+    if not filters:
+        return "", []
+
+    parts: List[str] = []
+    values: List[Any] = []
+    for key, v in filters.items():
+        col, op = parse_filter_key(key)
+
+        if v is None:
+            if op not in ("=", "!="):
+                raise ValueError("NULL only supports = and !=")
+            parts.append(f"{col} IS NULL" if op == "=" else f"{col} IS NOT NULL")
+        elif is_list_value(v):
+            if op not in ("=", "!="):
+                raise ValueError("list values only support = and !=")
+            items = list(v)
+            if not items:
+                # empty IN never matches, empty NOT IN always does
+                parts.append("1=0" if op == "=" else "1=1")
+                continue
+            placeholders = ", ".join([placeholder] * len(items))
+            keyword = "IN" if op == "=" else "NOT IN"
+            parts.append(f"{col} {keyword} ({placeholders})")
+            values.extend(items)
+        else:
+            parts.append(f"{col}{op}{placeholder}")
+            values.append(v)
+
+    return " WHERE " + " AND ".join(parts), values
+
+
+def where_shape(filters: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, Any], ...]:
+    """
+    What build_where's SQL depends on, without the values: per key, NULL
+    (None), a list and its length, or a scalar ("="). Two filters with
+    the same shape build the same SQL, so it can key a statement cache.
+    """
+    shape = []
+    for key, v in (filters or {}).items():
+        if v is None:
+            shape.append((key, None))
+        elif is_list_value(v):
+            shape.append((key, len(v)))
+        else:
+            shape.append((key, "="))
+    return tuple(shape)
+
+
+def where_values(filters: Optional[Dict[str, Any]]) -> List[Any]:
+    """build_where's values, in placeholder order."""
+    values: List[Any] = []
+    for v in (filters or {}).values():
+        if v is None:
+            continue
+        if is_list_value(v):
+            values.extend(v)
+        else:
+            values.append(v)
+    return values
+
+
+def parse_order_by(order_by: str) -> List[Tuple[str, str]]:
+    """
+    "event_time DESC, id" / "-id" / "`id` asc" -> [(column, "ASC" | "DESC"), ...]
+    """
+    ob = order_by.strip()
+    if not ob:
+        raise ValueError("order_by cannot be empty")
+
+    order_terms: List[Tuple[str, str]] = []
+    for raw_term in ob.split(","):
+        term = raw_term.strip()
+        if not term:
+            continue
+
+        if term.startswith("-"):
+            col = term[1:].strip()
+            direction = "DESC"
+            if not col:
+                raise ValueError("order_by contains invalid characters")
+        else:
+            parts = term.split()
+            if len(parts) == 1:
+                col = parts[0]
+                direction = "ASC"
+            elif len(parts) == 2:
+                col = parts[0]
+                direction = parts[1].upper()
+                if direction not in ("ASC", "DESC"):
+                    raise ValueError("order_by direction must be ASC or DESC")
+            else:
+                raise ValueError("order_by format is invalid")
+
+        col_clean = col.strip()
+        if col_clean.startswith("`") and col_clean.endswith("`") and len(col_clean) >= 3:
+            col_clean = col_clean[1:-1]
+
+        if not _COLUMN_RE.fullmatch(col_clean):
+            raise ValueError("order_by contains invalid characters")
+
+        order_terms.append((col_clean, direction))
+    return order_terms
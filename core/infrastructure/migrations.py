@@ -0,0 +1,130 @@
+# core/infrastructure/migrations.py
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "database", "migrations")
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    path: str
+    checksum: str
+    statements: List[str]
+
+
+def split_statements(script: str) -> List[str]:
+    """
+    ;-terminated statements of a .sql file, without "--" comment lines.
+    Statements end with ";" at the end of a line (no procedures/DELIMITER).
+    """
+    lines = [line for line in script.splitlines() if not line.lstrip().startswith("--")]
+    statements = re.split(r";[ \t]*(?:\n|$)", "\n".join(lines))
+    return [s.strip() for s in statements if s.strip()]
+
+
+class MigrationRunner:
+    """
+    Applies database/migrations/NNNN_description.sql in version order,
+    each exactly once, and records them in schema_migrations.
+
+    - database/schema.sql is the baseline; migrations move it forward
+    - a migration is recorded only after all of its statements ran. MySQL
+      commits DDL implicitly, so keep one ALTER per table per file: a
+      multi-clause ALTER is atomic, a failed file can be fixed and re-run
+    - the checksum of every applied file is kept; editing an applied
+      migration is an error (add a new one instead)
+    - run it from one place at a time (a deploy step), not from every worker
+    """
+
+    TABLE = "schema_migrations"
+    FILE_PATTERN = re.compile(r"^(\d{4})_([A-Za-z0-9_]+)\.sql$")
+
+    def __init__(self, db, directory: str = MIGRATIONS_DIR) -> None:
+        if not hasattr(db, "execute_statements"):
+            raise MigrationError("migrations need a SQL backend (MySQL)")
+        self.db = db
+        self.directory = os.path.abspath(directory)
+
+    def discover(self) -> List[Migration]:
+        migrations: List[Migration] = []
+        for filename in sorted(os.listdir(self.directory)):
+            match = self.FILE_PATTERN.match(filename)
+            if not match:
+                continue
+            path = os.path.join(self.directory, filename)
+            with open(path, "r", encoding="utf-8") as fh:
+                script = fh.read()
+            migrations.append(
+                Migration(
+                    version=int(match.group(1)),
+                    name=match.group(2),
+                    path=path,
+                    checksum=hashlib.sha256(script.encode("utf-8")).hexdigest(),
+                    statements=split_statements(script),
+                )
+            )
+
+        versions = [m.version for m in migrations]
+        if len(versions) != len(set(versions)):
+            raise MigrationError("two migration files share a version number")
+        return migrations
+
+    def applied(self) -> Dict[int, str]:
+        """{version: checksum} of the migrations already applied."""
+        self._ensure_table()
+        rows = self.db.select(self.TABLE, {}, order_by="version ASC", columns=["version", "checksum"])
+        return {int(r["version"]): r["checksum"] for r in rows}
+
+    def pending(self) -> List[Migration]:
+        applied = self.applied()
+        pending = []
+        for migration in self.discover():
+            checksum = applied.get(migration.version)
+            if checksum is None:
+                pending.append(migration)
+            elif checksum != migration.checksum:
+                raise MigrationError(
+                    f"migration {migration.version:04d}_{migration.name} changed after it was applied"
+                )
+        return pending
+
+    def migrate(self, target: Optional[int] = None) -> List[Migration]:
+        """Apply pending migrations up to target (default: all). Returns them."""
+        done: List[Migration] = []
+        for migration in self.pending():
+            if target is not None and migration.version > target:
+                break
+            try:
+                self.db.execute_statements(migration.statements)
+            except Exception as err:
+                raise MigrationError(f"migration {migration.version:04d}_{migration.name} failed: {err}") from err
+            self.db.insert(
+                self.TABLE,
+                {"version": migration.version, "name": migration.name, "checksum": migration.checksum},
+            )
+            done.append(migration)
+        return done
+
+    def _ensure_table(self) -> None:
+        self.db.execute_statements(
+            [
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                " version int unsigned NOT NULL,"
+                " name varchar(255) NOT NULL,"
+                " checksum char(64) NOT NULL,"
+                " applied_at datetime(3) NOT NULL DEFAULT (utc_timestamp(3)),"
+                " PRIMARY KEY (version)"
+                ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci"
+            ]
+        )
@@ -2,11 +2,24 @@
 from __future__ import annotations
 
 import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from copy import deepcopy
 
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
 from core.interfaces.db import DB
+from core.infrastructure.filters import is_list_value, parse_filter_key, validate_column
+from core.infrastructure.rw_lock import ReadWriteLock
+from core.metrics import instrumented
 
 
 class MockJSONDB(DB):
@@ -20,15 +33,92 @@ class MockJSONDB(DB):
             {"id": 2, "col": "value"}
         ]
     }
+
+    Persistence (when json_path is set):
+    - the JSON file is a snapshot; every write is appended as one line to
+      <json_path>.journal, so a write is O(1) instead of a full rewrite
+    - fsync of the journal is batched (every fsync_every writes or
+      fsync_interval seconds)
+    - _load() replays the journal over the snapshot (replay is idempotent)
+    - a background thread compacts the journal into the snapshot every
+      compact_interval seconds, or once it grows past compact_max_bytes
+    - journal=False keeps the old behavior: rewrite the file on every write
+
+    Concurrency (threads and worker processes sharing one json_path):
+    - in-process: a reader/writer lock (many selects or one write)
+    - cross-process: writes and compaction hold an exclusive flock on
+      <json_path>.lock; catching up takes it shared
+    - the snapshot is only ever replaced by an atomic rename
+    - every call compares the snapshot's stat and the journal size with
+      what this instance last saw: a grown journal is replayed from the
+      last offset, a new snapshot (another process compacted) is reloaded
+    - a write first catches up, so ids never collide across processes
+
+    Transactions (transaction()):
+    - the block runs under the write lock (and the exclusive flock), so
+      other threads and processes see all of its writes or none
+    - journal lines are written at commit; on error an undo log puts the
+      touched rows back (ids handed out stay used, as in MySQL)
+    - nested calls are savepoints: an error undoes the nested block only
+
+    Indexes (in memory, rebuilt on load):
+    - primary key: {table: {id: row}}
+    - secondary: {table: {column: {value: {id: row}}}} for index_columns
+    select/update/delete use them for "=" and IN filters on id or an
+    indexed column, and only the returned rows are copied.
     """
 
-    def __init__(self, json_path: Optional[str] = None) -> None:
+    DEFAULT_INDEX_COLUMNS = ("classroom_id", "room_id", "private_key", "id_building", "sensor_id")
+
+    def __init__(
+        self,
+        json_path: Optional[str] = None,
+        index_columns: Iterable[str] = DEFAULT_INDEX_COLUMNS,
+        *,
+        journal: bool = True,
+        fsync_every: int = 100,
+        fsync_interval: float = 1.0,
+        compact_interval: Optional[float] = 60.0,
+        compact_max_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
         self._path = Path(json_path) if json_path else None
         self._data: Dict[str, List[Dict[str, Any]]] = {}
         self._pk_counter: Dict[str, int] = {}
 
-        if self._path and self._path.exists():
-            self._load()
+        self._index_columns = tuple(index_columns)
+        self._pk_index: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self._indexes: Dict[str, Dict[str, Dict[Any, Dict[Any, Dict[str, Any]]]]] = {}
+
+        self._rw_lock = ReadWriteLock()
+        self._lock_path = Path(f"{self._path}.lock") if self._path else None
+        self._lock_file = None
+        self._seen_snapshot: Optional[Tuple[int, int, int]] = None
+        self._journal_offset = 0
+
+        self._journal_path = Path(f"{self._path}.journal") if (self._path and journal) else None
+        self._journal_file = None
+        self._fsync_every = fsync_every
+        self._fsync_interval = fsync_interval
+        self._compact_interval = compact_interval
+        self._compact_max_bytes = compact_max_bytes
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+        self._last_compact = time.monotonic()
+        self._closed = threading.Event()
+        self._maintenance: Optional[threading.Thread] = None
+
+        # transaction() state: owning thread, pending journal lines, undo log
+        self._tx_owner: Optional[int] = None
+        self._tx_lines: List[bytes] = []
+        self._tx_undo: List[Tuple[Dict[str, Any], Any]] = []
+
+        if self._path:
+            with self._file_lock(exclusive=False):
+                self._load()
+
+        if self._journal_path is not None:
+            self._maintenance = threading.Thread(target=self._maintenance_loop, name="mockdb-journal", daemon=True)
+            self._maintenance.start()
 
     # -----------------------------
     # INTERNAL
@@ -37,29 +127,432 @@ class MockJSONDB(DB):
         print(self._data)
         
     def _load(self) -> None:
-        raw = json.loads(self._path.read_text())
-        self._data = raw
-        for table, rows in raw.items():
+        self._data = {}
+        self._pk_counter = {}
+        self._pk_index = {}
+        self._indexes = {}
+
+        self._seen_snapshot = self._snapshot_signature()
+        if self._seen_snapshot is not None:
+            self._data = json.loads(self._path.read_text())
+        for table, rows in self._data.items():
             max_id = max((row.get("id", 0) for row in rows), default=0)
             self._pk_counter[table] = max_id
+            self._build_indexes(table)
+
+        self._journal_offset = self._replay_journal(0)
 
     def _save(self) -> None:
-        if self._path:
-            self._path.write_text(json.dumps(self._data, indent=2))
+        """
+        Write the full snapshot atomically (temp file + rename).
+        """
+        if not self._path:
+            return
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._data, indent=2, default=self._json_default))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+        self._seen_snapshot = self._snapshot_signature()
+
+    def _commit(self, entry: Dict[str, Any], before: Any = None) -> None:
+        # called after every write (entry already applied in memory);
+        # before: what _rollback() needs to undo it (see update/delete)
+        self._bump_write_generation(entry["table"])
+        if self._tx_owner is not None:
+            # only the owner can write while a transaction holds the lock
+            self._tx_undo.append((entry, before))
+            if self._journal_path is not None:
+                self._tx_lines.append(self._journal_line(entry))
+            return
+        if self._journal_path is None:
+            self._save()
+            return
+        self._append_journal(entry)
+
+    # -----------------------------
+    # LOCKING / EXTERNAL CHANGES
+    # -----------------------------
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        # only used while holding the in-process write lock (or in __init__)
+        if self._lock_path is None or fcntl is None:
+            yield
+            return
+
+        if self._lock_file is None:
+            self._lock_file = open(self._lock_path, "a")
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def _reading(self) -> Iterator[None]:
+        if self._tx_owner == threading.get_ident():
+            yield  # the transaction already holds the write lock
+            return
+        if self._changed_on_disk():
+            with self._rw_lock.write(), self._file_lock(exclusive=False):
+                self._catch_up()
+        with self._rw_lock.read():
+            yield
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        if self._tx_owner == threading.get_ident():
+            yield
+            return
+        with self._rw_lock.write(), self._file_lock(exclusive=True):
+            self._catch_up()
+            yield
+
+    def _snapshot_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _journal_size(self) -> int:
+        try:
+            return os.stat(self._journal_path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _changed_on_disk(self) -> bool:
+        if self._path is None:
+            return False
+        if self._snapshot_signature() != self._seen_snapshot:
+            return True
+        return self._journal_path is not None and self._journal_size() != self._journal_offset
+
+    def _catch_up(self) -> None:
+        # caller holds the write lock and the file lock
+        if not self._changed_on_disk():
+            return
+
+        snapshot_replaced = self._snapshot_signature() != self._seen_snapshot
+        if snapshot_replaced or (self._journal_path is not None and self._journal_size() < self._journal_offset):
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+            self._load()
+        else:
+            self._journal_offset = self._replay_journal(self._journal_offset)
+        self._bump_write_generation()
+
+    # -----------------------------
+    # JOURNAL
+    # -----------------------------
+
+    def _journal_line(self, entry: Dict[str, Any]) -> bytes:
+        return (json.dumps(entry, default=self._json_default) + "\n").encode("utf-8")
+
+    def _append_journal(self, entry: Dict[str, Any]) -> None:
+        self._write_journal([self._journal_line(entry)])
+
+    def _write_journal(self, lines: List[bytes]) -> None:
+        if self._journal_size() > self._journal_offset:
+            # a torn line left by a crashed writer: drop it before appending
+            os.truncate(self._journal_path, self._journal_offset)
+        if self._journal_file is None:
+            self._journal_file = open(self._journal_path, "ab")
+
+        data = b"".join(lines)
+        self._journal_file.write(data)
+        self._journal_file.flush()
+        self._journal_offset += len(data)
+
+        self._unsynced += len(lines)
+        if self._unsynced >= self._fsync_every:
+            self._fsync_journal()
+
+    def _fsync_journal(self) -> None:
+        if self._journal_file is not None and self._unsynced:
+            os.fsync(self._journal_file.fileno())
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    def _replay_journal(self, offset: int) -> int:
+        """
+        Apply journal lines from byte offset on; returns the new offset.
+        """
+        if self._journal_path is None or not self._journal_path.exists():
+            return 0
+
+        with open(self._journal_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn last write
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(entry)
+        return offset
+
+    def compact(self) -> None:
+        """
+        Fold the journal into the snapshot file and truncate it.
+        """
+        with self._writing():
+            if self._journal_path is None:
+                self._save()
+                return
+
+            if not self._journal_size():
+                self._last_compact = time.monotonic()
+                return
+
+            self._fsync_journal()
+            self._save()
+            # a crash before this truncate only means an idempotent re-replay
+            os.truncate(self._journal_path, 0)
+            self._journal_offset = 0
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+            self._last_compact = time.monotonic()
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._maintenance is not None:
+            self._maintenance.join()
+        if self._journal_path is not None:
+            self.compact()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _maintenance_loop(self) -> None:
+        while not self._closed.wait(self._fsync_interval):
+            try:
+                with self._rw_lock.write():
+                    if self._unsynced:
+                        self._fsync_journal()
+
+                journal_size = self._journal_size()
+                due = self._compact_interval is not None and time.monotonic() - self._last_compact >= self._compact_interval
+                if journal_size and (due or journal_size >= self._compact_max_bytes):
+                    self.compact()
+            except Exception:
+                # keep the thread alive; the next tick retries
+                pass
+
+    def _json_default(self, value: Any) -> Any:
+        # datetimes (e.g. event_time) are stored as ISO strings
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
     def _table(self, name: str) -> List[Dict[str, Any]]:
         if name not in self._data:
-            self._data[name] = []
+            # publish the table last: concurrent readers may create it too
             self._pk_counter[name] = 0
+            self._pk_index[name] = {}
+            self._indexes[name] = {col: {} for col in self._index_columns}
+            self._data[name] = []
         return self._data[name]
 
+    # -----------------------------
+    # INDEXES
+    # -----------------------------
+
+    def _build_indexes(self, table: str) -> None:
+        self._pk_index[table] = {}
+        self._indexes[table] = {col: {} for col in self._index_columns}
+        for row in self._data.get(table, []):
+            self._index_row(table, row)
+
+    def _index_row(self, table: str, row: Dict[str, Any]) -> None:
+        self._pk_index[table][row.get("id")] = row
+        for col, index in self._indexes[table].items():
+            if col in row:
+                index.setdefault(self._index_key(row[col]), {})[row.get("id")] = row
+
+    def _unindex_row(self, table: str, row: Dict[str, Any]) -> None:
+        self._pk_index[table].pop(row.get("id"), None)
+        for col, index in self._indexes[table].items():
+            if col not in row:
+                continue
+            key = self._index_key(row[col])
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(row.get("id"), None)
+                if not bucket:
+                    del index[key]
+
+    def _index_key(self, value: Any) -> Any:
+        # unhashable values (e.g. JSON payloads) are never looked up by index
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return repr(value)
+
+    def _candidates(self, tbname: str, filters: Dict[str, Any]) -> Tuple[Iterable[Dict[str, Any]], bool]:
+        """
+        Rows that may match filters, using the narrowest usable index.
+        Returns (rows, in_table_order).
+        """
+        table = self._table(tbname)
+
+        for key, expected in filters.items():
+            col, op = parse_filter_key(key)
+            if op != "=" or expected is None:
+                continue
+
+            if is_list_value(expected):
+                values = list(expected)
+                if not all(self._hashable(v) for v in values):
+                    continue
+            elif self._hashable(expected):
+                values = [expected]
+            else:
+                continue
+
+            if col == "id":
+                lookup = self._pk_index[tbname]
+                rows = [lookup[v] for v in dict.fromkeys(values) if v in lookup]
+                return rows, False
+
+            index = self._indexes[tbname].get(col)
+            if index is None:
+                continue
+
+            rows = []
+            for v in dict.fromkeys(values):
+                rows.extend(index.get(v, {}).values())
+            # buckets lose table order when a row is re-indexed by update()
+            return rows, False
+
+        return table, True
+
+    def _hashable(self, value: Any) -> bool:
+        try:
+            hash(value)
+            return True
+        except TypeError:
+            return False
+
+    def _find(self, tbname: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # matching rows (live objects, not copies), in table order
+        rows, in_order = self._candidates(tbname, filters)
+        found = [r for r in rows if self._match(r, filters)] if filters else list(rows)
+        if not in_order and len(found) > 1:
+            # ids grow with insertion, so id order is table order
+            found.sort(key=lambda r: (not isinstance(r.get("id"), int), r.get("id") if isinstance(r.get("id"), int) else 0))
+        return found
+
+    def _copy_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: (deepcopy(v) if isinstance(v, (dict, list)) else v) for k, v in row.items()}
+
+    def _sort(self, rows: List[Dict[str, Any]], order_by: str) -> List[Dict[str, Any]]:
+        """
+        Same order_by syntax as MySQL: "id", "-id", "event_time DESC, id ASC".
+        NULLs sort first ascending (like MySQL); datetimes compare as ISO text.
+        """
+        terms: List[Tuple[str, bool]] = []
+        for raw_term in order_by.split(","):
+            term = raw_term.strip()
+            if not term:
+                continue
+            if term.startswith("-"):
+                terms.append((validate_column(term[1:].strip().strip("`")), True))
+                continue
+            parts = term.split()
+            if len(parts) == 1:
+                terms.append((validate_column(parts[0].strip("`")), False))
+            elif len(parts) == 2 and parts[1].upper() in ("ASC", "DESC"):
+                terms.append((validate_column(parts[0].strip("`")), parts[1].upper() == "DESC"))
+            else:
+                raise ValueError("order_by format is invalid")
+
+        def sort_key(col):
+            def key(row):
+                value = row.get(col)
+                if isinstance(value, (datetime, date)):
+                    value = value.isoformat()
+                return (value is not None, value if value is not None else 0)
+            return key
+
+        # stable sorts, least significant term first
+        for col, descending in reversed(terms):
+            try:
+                rows.sort(key=sort_key(col), reverse=descending)
+            except TypeError:
+                rows.sort(key=lambda r, c=col: (r.get(c) is not None, str(r.get(c))), reverse=descending)
+        return rows
+
     def _match(self, row: Dict[str, Any], filters: Dict[str, Any]) -> bool:
-        return all(row.get(k) == v for k, v in filters.items())
+        """
+        Same filter syntax as MySQL (see core.infrastructure.filters).
+        """
+        for key, expected in filters.items():
+            col, op = parse_filter_key(key)
+            if not self._compare(row.get(col), op, expected):
+                return False
+        return True
+
+    def _compare(self, actual: Any, op: str, expected: Any) -> bool:
+        if expected is None:
+            return (actual is None) if op == "=" else (actual is not None)
+
+        if is_list_value(expected):
+            found = actual in expected
+            return found if op == "=" else not found
+
+        # datetimes may be stored as ISO strings (after a reload)
+        if isinstance(expected, datetime) and actual is not None:
+            actual = self._as_datetime(actual)
+
+        if op == "=":
+            return actual == expected
+        if op == "!=":
+            return actual != expected
+
+        # ranges: NULL never matches
+        if actual is None:
+            return False
+
+        try:
+            if op == "<":
+                return actual < expected
+            if op == "<=":
+                return actual <= expected
+            if op == ">":
+                return actual > expected
+            return actual >= expected
+        except TypeError:
+            return False
+
+    def _project(self, row: Dict[str, Any], columns: Optional[List[str]]) -> Dict[str, Any]:
+        if not columns:
+            return row
+        return {c: row.get(c) for c in columns}
+
+    def _as_datetime(self, value: Any) -> Optional[datetime]:
+        # datetimes come back as ISO strings after a reload from disk
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        return None
 
     # -----------------------------
     # SELECT
     # -----------------------------
 
+    @instrumented("mock", "select")
     def select(
         self,
         tbname: str,
@@ -68,76 +561,219 @@ class MockJSONDB(DB):
         order_by: Optional[str] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
+        columns: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
 
-        rows = deepcopy(self._table(tbname))
-        filters = filters or {}
+        for c in columns or []:
+            validate_column(c)
 
-        if filters:
-            rows = [r for r in rows if self._match(r, filters)]
+        with self._reading():
+            rows = self._find(tbname, filters or {})
 
-        if order_by:
-            reverse = False
-            key = order_by.strip()
-            if key.startswith("-"):
-                reverse = True
-                key = key[1:]
-            rows.sort(key=lambda r: r.get(key), reverse=reverse)
+            if order_by:
+                rows = self._sort(rows, order_by)
 
-        if offset is not None:
-            rows = rows[offset:]
+            if offset is not None:
+                rows = rows[offset:]
 
-        if limit is not None:
-            rows = rows[:limit]
+            if limit is not None:
+                rows = rows[:limit]
 
-        return rows
+            # copy only what is returned
+            return [self._copy_row(self._project(r, columns)) for r in rows]
+
+    @instrumented("mock", "select_active_keys")
+    def select_active_keys(
+        self,
+        tbname: str,
+        key_column: str,
+        time_column: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+    ) -> Dict[Any, datetime]:
+        result: Dict[Any, datetime] = {}
+
+        with self._reading():
+            for row in self._table(tbname):
+                t = self._as_datetime(row.get(time_column))
+                if t is None or t < since or (until is not None and t > until):
+                    continue
+                key = row.get(key_column)
+                if key not in result or t > result[key]:
+                    result[key] = t
+
+        return result
 
     # -----------------------------
     # INSERT
     # -----------------------------
 
+    @instrumented("mock", "insert")
     def insert(self, tbname: str, data: Dict[str, Any]) -> int:
-        table = self._table(tbname)
+        with self._writing():
+            self._table(tbname)
 
-        self._pk_counter[tbname] += 1
-        row_id = self._pk_counter[tbname]
+            row_id = self._pk_counter[tbname] + 1
+            row = {"id": row_id, **data}
+            self._apply_insert(tbname, [row])
 
-        row = {"id": row_id, **data}
-        table.append(row)
+            self._commit({"op": "insert", "table": tbname, "rows": [row]})
+            return row_id
 
-        self._save()
-        return row_id
+    @instrumented("mock", "insert_many")
+    def insert_many(self, tbname: str, rows: List[Dict[str, Any]]) -> int:
+        with self._writing():
+            self._table(tbname)
+
+            new_rows = []
+            next_id = self._pk_counter[tbname]
+            for data in rows:
+                next_id += 1
+                new_rows.append({"id": next_id, **data})
+            self._apply_insert(tbname, new_rows)
+
+            if new_rows:
+                self._commit({"op": "insert", "table": tbname, "rows": new_rows})
+            return len(new_rows)
 
     # -----------------------------
     # UPDATE
     # -----------------------------
 
+    @instrumented("mock", "update")
     def update(self, tbname: str, data: Dict[str, Any], where: Dict[str, Any]) -> int:
-        table = self._table(tbname)
-        updated = 0
+        with self._writing():
+            rows = self._find(tbname, where)
+            ids = [row.get("id") for row in rows]
+            # undo: the live rows and their values before the update
+            before = [(row, dict(row)) for row in rows] if self._tx_owner is not None else None
+            updated = self._apply_update(tbname, ids, data)
 
-        for row in table:
-            if self._match(row, where):
-                row.update(data)
-                updated += 1
+            if updated:
+                self._commit({"op": "update", "table": tbname, "ids": ids, "data": data}, before)
 
-        if updated:
-            self._save()
-
-        return updated
+            return updated
 
     # -----------------------------
     # DELETE
     # -----------------------------
 
+    @instrumented("mock", "delete")
     def delete(self, tbname: str, where: Dict[str, Any]) -> int:
-        table = self._table(tbname)
-        original_len = len(table)
+        with self._writing():
+            rows = self._find(tbname, where)
+            ids = [row.get("id") for row in rows]
+            deleted = self._apply_delete(tbname, ids)
 
-        table[:] = [r for r in table if not self._match(r, where)]
+            if deleted:
+                # undo: the removed rows themselves
+                self._commit({"op": "delete", "table": tbname, "ids": ids}, rows if self._tx_owner is not None else None)
 
-        deleted = original_len - len(table)
-        if deleted:
-            self._save()
+            return deleted
+
+    # -----------------------------
+    # TRANSACTIONS
+    # -----------------------------
 
-        return deleted
\ No newline at end of file
+    @contextmanager
+    def transaction(self) -> Iterator["MockJSONDB"]:
+        if self._tx_owner == threading.get_ident():
+            # savepoint: remember where the nested block starts
+            undo_mark, lines_mark = len(self._tx_undo), len(self._tx_lines)
+            try:
+                yield self
+            except BaseException:
+                self._rollback(undo_mark)
+                del self._tx_lines[lines_mark:]
+                raise
+            return
+
+        with self._writing():
+            self._tx_owner = threading.get_ident()
+            try:
+                yield self
+            except BaseException:
+                self._rollback()
+                raise
+            else:
+                if self._tx_lines:
+                    self._write_journal(self._tx_lines)
+                elif self._journal_path is None and self._tx_undo:
+                    self._save()
+            finally:
+                self._tx_owner = None
+                self._tx_lines, self._tx_undo = [], []
+
+    def _rollback(self, mark: int = 0) -> None:
+        # undo the transaction's writes from position mark on
+        undo, self._tx_undo = self._tx_undo[mark:], self._tx_undo[:mark]
+        resort = set()
+        for entry, before in reversed(undo):
+            tbname = entry["table"]
+            if entry["op"] == "insert":
+                self._apply_delete(tbname, [row.get("id") for row in entry["rows"]])
+            elif entry["op"] == "update":
+                for row, old in before:
+                    self._unindex_row(tbname, row)
+                    row.clear()
+                    row.update(old)
+                    self._index_row(tbname, row)
+            elif entry["op"] == "delete":
+                self._apply_insert(tbname, before)
+                resort.add(tbname)
+            self._bump_write_generation(tbname)
+
+        # re-inserted rows went to the end; ids grow with insertion
+        for tbname in resort:
+            self._data[tbname].sort(key=lambda r: (not isinstance(r.get("id"), int), r.get("id") if isinstance(r.get("id"), int) else 0))
+
+    # -----------------------------
+    # APPLY (shared by writes and journal replay; idempotent)
+    # -----------------------------
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        op = entry.get("op")
+        tbname = entry.get("table")
+        if op == "insert":
+            self._apply_insert(tbname, entry.get("rows", []))
+        elif op == "update":
+            self._apply_update(tbname, entry.get("ids", []), entry.get("data", {}))
+        elif op == "delete":
+            self._apply_delete(tbname, entry.get("ids", []))
+
+    def _apply_insert(self, tbname: str, rows: List[Dict[str, Any]]) -> None:
+        table = self._table(tbname)
+        for row in rows:
+            if row.get("id") in self._pk_index[tbname]:
+                continue
+            table.append(row)
+            self._index_row(tbname, row)
+            if isinstance(row.get("id"), int) and row["id"] > self._pk_counter[tbname]:
+                self._pk_counter[tbname] = row["id"]
+
+    def _apply_update(self, tbname: str, ids: List[Any], data: Dict[str, Any]) -> int:
+        self._table(tbname)
+        lookup = self._pk_index[tbname]
+        rows = [lookup[i] for i in ids if i in lookup]
+        reindex = "id" in data or any(c in data for c in self._index_columns)
+
+        for row in rows:
+            if reindex:
+                self._unindex_row(tbname, row)
+            row.update(data)
+            if reindex:
+                self._index_row(tbname, row)
+        return len(rows)
+
+    def _apply_delete(self, tbname: str, ids: List[Any]) -> int:
+        table = self._table(tbname)
+        lookup = self._pk_index[tbname]
+        doomed = [lookup[i] for i in ids if i in lookup]
+        if not doomed:
+            return 0
+
+        doomed_ids = {id(r) for r in doomed}
+        for row in doomed:
+            self._unindex_row(tbname, row)
+        table[:] = [r for r in table if id(r) not in doomed_ids]
+        return len(doomed)
@@ -1,18 +1,43 @@
 # core/mysql.py
 from __future__ import annotations
 
-from typing import Optional, Any, Dict, List, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Any, Callable, Dict, Iterator, List, Tuple
 import re
+import threading
+import time
+import weakref
 import mysql.connector
 from mysql.connector import MySQLConnection
 from core.interfaces.db import DB
+from core.infrastructure.connection_pool import ConnectionPool
+from core.infrastructure.filters import build_where, parse_order_by, validate_column, where_shape, where_values
+from core.infrastructure.slow_query_log import SlowQueryLog
+from core.infrastructure.ttl_cache import TTLCache
+from core.metrics import db_timer
 
 class MySQL(DB):
     """
     Minimal MySQL wrapper with:
     - insert/update/delete
-    - select with ADT-style filters + safe-ish order_by + limit/offset
-    - auto reconnect + single retry on transient connection drops
+    - select with ADT-style filters (=, !=, ranges, IN, IS NULL),
+      column projection + safe-ish order_by + limit/offset
+    - a bounded, thread-safe connection pool (one connection per query,
+      never shared between threads)
+    - single retry on transient connection drops
+    - transaction(): the thread's statements run on one connection and
+      commit together; nested calls are savepoints
+    - an optional slow-query log, aggregated per statement fingerprint
+      (see core.infrastructure.slow_query_log)
+    - compiled statements: the SQL of select/insert/update/delete is built
+      and validated once per shape (table, filter keys, order_by, limit,
+      offset...) and then only bound to new values
+    - prepared statements: those without IN lists run on server-side
+      prepared cursors kept per connection (at most
+      prepared_per_connection, LRU), so a repeated shape skips the
+      server's parse as well; prepared_per_connection=0 turns them off
     """
 
     def __init__(
@@ -23,6 +48,12 @@ class MySQL(DB):
         database: str,
         port: int = 3306,
         ssl_required: bool = True,
+        pool_size: int = 10,
+        pool_timeout: float = 5.0,
+        pool_health_check_idle: float = 30.0,
+        slow_query_log: Optional[SlowQueryLog] = None,
+        statement_cache_size: int = 512,
+        prepared_per_connection: int = 64,
     ) -> None:
         self._cfg = dict(
             host=host,
@@ -32,7 +63,24 @@ class MySQL(DB):
             port=port,
             ssl_required=ssl_required,
         )
-        self.connection: MySQLConnection = self._connect()
+        # connections are opened lazily on first checkout
+        self._pool = ConnectionPool(
+            self._connect,
+            max_size=pool_size,
+            checkout_timeout=pool_timeout,
+            health_check_idle_seconds=pool_health_check_idle,
+            is_alive=lambda conn: conn.is_connected(),
+        )
+        self.slow_query_log = slow_query_log
+        # statement shape -> SQL; shapes never go stale, only get evicted
+        self._statements = TTLCache(max_size=statement_cache_size, ttl=float("inf"))
+        # connection -> OrderedDict[(query, dictionary) -> prepared cursor]
+        self.prepared_per_connection = prepared_per_connection
+        self._prepared: "weakref.WeakKeyDictionary[MySQLConnection, OrderedDict]" = weakref.WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+        self._prepared_stats = {"prepared": 0, "reused": 0, "closed": 0}
+        # transaction() state per thread: pinned connection, tables written
+        self._tx = threading.local()
 
     # -----------------------------
     # CONNECTION
@@ -50,18 +98,17 @@ class MySQL(DB):
         conn.autocommit = True  # you already rely on autocommit behavior
         return conn
 
-    def ensure_connection(self) -> None:
-        """
-        Make sure connection is alive.
-        mysql-connector supports ping(reconnect=True)
-        """
-        try:
-            if self.connection is None:  # type: ignore[truthy-bool]
-                self.connection = self._connect()
-                return
-            self.connection.ping(reconnect=True, attempts=1, delay=0)
-        except Exception:
-            self.connection = self._connect()
+    def pool_stats(self) -> Dict[str, float]:
+        return self._pool.stats()
+
+    def statement_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._prepared_lock:
+            prepared = dict(self._prepared_stats)
+            prepared["open"] = sum(len(c) for c in self._prepared.values())
+        return {"compiled": self._statements.stats(), "prepared": prepared}
+
+    def close(self) -> None:
+        self._pool.close_all()
 
     def _validate_tbname(self, tbname: str) -> None:
         # prevent SQL injection via table name
@@ -76,59 +123,242 @@ class MySQL(DB):
         dictionary: bool,
         fetch: bool,
         commit: bool,
+        many: bool = False,
+        tbname: Optional[str] = None,
+        prepared: bool = False,
     ):
         """
-        Execute with:
-        - ensure_connection()
-        - retry exactly once if the socket/connection dropped
+        Execute on a pooled connection (many=True: params is a list of tuples):
+        - the pool health-checks connections that sat idle
+        - retry exactly once (on a fresh connection) if the socket dropped
+        - counted and timed as one DB operation (see core.metrics), retry
+          included; slow ones go to the slow-query log
+        - prepared=True: on the connection's prepared cursor for query
         """
-        last_exc: Optional[Exception] = None
+        with db_timer("mysql", query.split(None, 1)[0].lower()):
+            start = time.perf_counter()
+            result = self._execute(
+                query, params, dictionary=dictionary, fetch=fetch, commit=commit, many=many, tbname=tbname, prepared=prepared
+            )
+            if self.slow_query_log is not None:
+                rows = len(result) if fetch else result[0]
+                self.slow_query_log.record(query, time.perf_counter() - start, rows)
+            return result
+
+    def _execute(
+        self,
+        query: str,
+        params: Tuple[Any, ...],
+        *,
+        dictionary: bool,
+        fetch: bool,
+        commit: bool,
+        many: bool,
+        tbname: Optional[str],
+        prepared: bool,
+    ):
+        tx_conn = getattr(self._tx, "conn", None)
+        if tx_conn is not None:
+            # inside transaction(): its connection, committed there; no
+            # retry, a dropped connection has lost the transaction anyway
+            result = self._run(tx_conn, query, params, dictionary=dictionary, fetch=fetch, many=many, prepared=prepared)
+            if commit:
+                self._tx.tables.add(tbname)
+                self._bump_write_generation(tbname)
+            return result
 
         for attempt in (1, 2):
+            conn = self._pool.checkout()
+            broken = False
             try:
-                self.ensure_connection()
-                cursor = self.connection.cursor(dictionary=dictionary)
-                try:
-                    cursor.execute(query, params)
-                    if fetch:
-                        return cursor.fetchall()
-                    if commit:
-                        # In practice autocommit is True, but keep this safe.
-                        self.connection.commit()
-                    return cursor.rowcount, getattr(cursor, "lastrowid", None)
-                finally:
-                    cursor.close()
-            except Exception as exc:
-                last_exc = exc
+                result = self._run(conn, query, params, dictionary=dictionary, fetch=fetch, many=many, prepared=prepared)
+                if commit:
+                    # In practice autocommit is True, but keep this safe.
+                    conn.commit()
+                    self._bump_write_generation(tbname)
+                return result
+            except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+                broken = True
                 if attempt == 1:
-                    # reconnect and retry once
-                    try:
-                        self.connection = self._connect()
-                    except Exception:
-                        pass
                     continue
                 raise
+            finally:
+                self._pool.checkin(conn, discard=broken)
+
+    def _run(
+        self,
+        conn: MySQLConnection,
+        query: str,
+        params: Tuple[Any, ...],
+        *,
+        dictionary: bool,
+        fetch: bool,
+        many: bool,
+        prepared: bool = False,
+    ):
+        if prepared and not many and self.prepared_per_connection > 0:
+            return self._run_prepared(conn, query, params, dictionary=dictionary, fetch=fetch)
 
-        if last_exc:
-            raise last_exc
+        cursor = conn.cursor(dictionary=dictionary)
+        try:
+            if many:
+                cursor.executemany(query, params)
+            else:
+                cursor.execute(query, params)
+            if fetch:
+                return cursor.fetchall()
+            return cursor.rowcount, getattr(cursor, "lastrowid", None)
+        finally:
+            cursor.close()
+
+    def _run_prepared(self, conn: MySQLConnection, query: str, params: Tuple[Any, ...], *, dictionary: bool, fetch: bool):
+        # a cursor re-executing the statement it prepared last skips the
+        # PREPARE round trip; the connection is ours until checkin, so
+        # only the registry itself needs the lock
+        key = (query, dictionary)
+        with self._prepared_lock:
+            cursors = self._prepared.get(conn)
+            if cursors is None:
+                cursors = self._prepared[conn] = OrderedDict()
+            cursor = cursors.pop(key, None)
+            self._prepared_stats["reused" if cursor is not None else "prepared"] += 1
+        if cursor is None:
+            cursor = conn.cursor(prepared=True, dictionary=dictionary)
+
+        try:
+            cursor.execute(query, params)
+            if fetch:
+                result = cursor.fetchall()
+            else:
+                result = cursor.rowcount, getattr(cursor, "lastrowid", None)
+        except BaseException:
+            self._close_cursor(cursor)
+            raise
+
+        with self._prepared_lock:
+            cursors[key] = cursor
+            evicted = []
+            while len(cursors) > self.prepared_per_connection:
+                evicted.append(cursors.popitem(last=False)[1])
+        for old in evicted:
+            self._close_cursor(old)
+        return result
+
+    def _close_cursor(self, cursor) -> None:
+        with self._prepared_lock:
+            self._prepared_stats["closed"] += 1
+        try:
+            cursor.close()  # deallocates the server-side statement
+        except mysql.connector.Error:
+            pass
+
+    def is_data_error(self, exc: BaseException) -> bool:
+        # duplicate key, foreign key, out-of-range or truncated values
+        return isinstance(exc, (mysql.connector.errors.IntegrityError, mysql.connector.errors.DataError)) or super().is_data_error(exc)
+
+    # ---------------------------------
+    # TRANSACTIONS
+    # ---------------------------------
+
+    @contextmanager
+    def transaction(self) -> Iterator["MySQL"]:
+        if getattr(self._tx, "conn", None) is not None:
+            with self._savepoint(self._tx.conn):
+                yield self
+            return
+
+        conn = self._pool.checkout()
+        broken = False
+        self._tx.conn, self._tx.tables, self._tx.depth = conn, set(), 0
+        try:
+            conn.start_transaction()
+            yield self
+            conn.commit()
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+            broken = True
+            raise
+        except BaseException:
+            try:
+                conn.rollback()
+            except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+                broken = True
+            raise
+        finally:
+            tables = self._tx.tables
+            self._tx.conn, self._tx.tables = None, None
+            self._pool.checkin(conn, discard=broken)
+            # committed or rolled back: reads memoized inside the block are stale
+            for tbname in tables:
+                self._bump_write_generation(tbname)
+
+    @contextmanager
+    def _savepoint(self, conn: MySQLConnection) -> Iterator[None]:
+        self._tx.depth += 1
+        name = f"sp_{self._tx.depth}"
+        self._run(conn, f"SAVEPOINT {name}", (), dictionary=False, fetch=False, many=False)
+        try:
+            yield
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+            raise  # the connection is gone; the outer transaction discards it
+        except BaseException:
+            self._run(conn, f"ROLLBACK TO SAVEPOINT {name}", (), dictionary=False, fetch=False, many=False)
+            raise
+        else:
+            self._run(conn, f"RELEASE SAVEPOINT {name}", (), dictionary=False, fetch=False, many=False)
+        finally:
+            self._tx.depth -= 1
+
+    # ---------------------------------
+    # RAW SQL (migrations, tooling)
+    # ---------------------------------
+
+    def execute_statements(self, statements: List[str]) -> None:
+        """
+        Run statements in order on one connection, so session settings
+        (SET FOREIGN_KEY_CHECKS=0, ...) apply to the ones after them.
+        Models use the filter API instead; this is for schema changes.
+        """
+        with db_timer("mysql", "statements"):
+            self._execute_statements(statements)
+
+    def _execute_statements(self, statements: List[str]) -> None:
+        conn = self._pool.checkout()
+        broken = False
+        try:
+            cursor = conn.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+                    if cursor.with_rows:
+                        cursor.fetchall()
+                conn.commit()
+            finally:
+                cursor.close()
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._pool.checkin(conn, discard=broken)
+            self._bump_write_generation()
+
+    def fetch_all(self, query: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+        """Rows of a hand-written read-only query (EXPLAIN, reports)."""
+        return self._execute_with_retry(query, tuple(params), dictionary=True, fetch=True, commit=False)
 
     # ---------------------------------
     # INTERNAL HELPERS
     # ---------------------------------
 
     def _build_where(self, filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
-        if not filters:
-            return "", []
-
-        parts: List[str] = []
-        values: List[Any] = []
-        for k, v in filters.items():
-            if not str(k).replace("_", "").isalnum():
-                raise ValueError("filter key contains invalid characters")
-            parts.append(f"{k}=%s")
-            values.append(v)
+        """
+        See core.infrastructure.filters for the filter syntax.
+        """
+        return build_where(filters, "%s")
 
-        return " WHERE " + " AND ".join(parts), values
+    def _build_columns(self, columns: Optional[List[str]]) -> str:
+        if not columns:
+            return "*"
+        return ", ".join(validate_column(c) for c in columns)
 
     def _build_order_limit_offset(
         self,
@@ -139,59 +369,43 @@ class MySQL(DB):
         sql_parts: List[str] = []
 
         if order_by:
-            ob = order_by.strip()
-            if not ob:
-                raise ValueError("order_by cannot be empty")
-
-            order_terms: List[str] = []
-            for raw_term in ob.split(","):
-                term = raw_term.strip()
-                if not term:
-                    continue
-
-                if term.startswith("-"):
-                    col = term[1:].strip()
-                    direction = "DESC"
-                    if not col:
-                        raise ValueError("order_by contains invalid characters")
-                else:
-                    parts = term.split()
-                    if len(parts) == 1:
-                        col = parts[0]
-                        direction = "ASC"
-                    elif len(parts) == 2:
-                        col = parts[0]
-                        direction = parts[1].upper()
-                        if direction not in ("ASC", "DESC"):
-                            raise ValueError("order_by direction must be ASC or DESC")
-                    else:
-                        raise ValueError("order_by format is invalid")
-
-                col_clean = col.strip()
-                if col_clean.startswith("`") and col_clean.endswith("`") and len(col_clean) >= 3:
-                    col_clean = col_clean[1:-1]
-
-                if not re.fullmatch(r"[A-Za-z0-9_]+", col_clean):
-                    raise ValueError("order_by contains invalid characters")
-
-                order_terms.append(f"{col_clean} {direction}")
-
+            order_terms = parse_order_by(order_by)
             if order_terms:
-                sql_parts.append(" ORDER BY " + ", ".join(order_terms))
+                sql_parts.append(" ORDER BY " + ", ".join(f"{col} {direction}" for col, direction in order_terms))
 
+        self._check_limit_offset(limit, offset)
         if limit is not None:
-            if limit <= 0:
-                raise ValueError("limit must be > 0")
             sql_parts.append(" LIMIT %s")
+        if offset is not None:
+            sql_parts.append(" OFFSET %s")
+
+        return "".join(sql_parts)
 
+    def _check_limit_offset(self, limit: Optional[int], offset: Optional[int]) -> None:
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be > 0")
         if offset is not None:
             if offset < 0:
                 raise ValueError("offset must be >= 0")
             if limit is None:
                 raise ValueError("offset requires limit")
-            sql_parts.append(" OFFSET %s")
 
-        return "".join(sql_parts)
+    def _preparable(self, shape: Tuple[Tuple[str, Any], ...]) -> bool:
+        # IN-list lengths vary per call (id batches, ragged last chunks);
+        # preparing each length would fill the server's statement slots
+        # with statements that run once, so those use plain cursors
+        return not any(isinstance(kind, int) for _, kind in shape)
+
+    def _statement(self, key: Tuple[Any, ...], build: Callable[[], str]) -> str:
+        """
+        SQL for a statement shape, built (and validated) on first use only.
+        key must hold everything build() reads except the values.
+        """
+        hit, query = self._statements.get(key)
+        if not hit:
+            query = build()
+            self._statements.set(key, query)
+        return query
 
     # ---------------------------------
     # SELECT
@@ -205,14 +419,31 @@ class MySQL(DB):
         order_by: Optional[str] = None,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
+        columns: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
-        self._validate_tbname(tbname)
         filters = filters or {}
+        self._check_limit_offset(limit, offset)
+
+        def build() -> str:
+            self._validate_tbname(tbname)
+            columns_sql = self._build_columns(columns)
+            where_sql, _ = self._build_where(filters)
+            tail_sql = self._build_order_limit_offset(order_by, limit, offset)
+            return f"SELECT {columns_sql} FROM {tbname}{where_sql}{tail_sql}"
+
+        shape = where_shape(filters)
+        key = (
+            "select",
+            tbname,
+            shape,
+            tuple(columns) if columns else None,
+            order_by,
+            limit is not None,
+            offset is not None,
+        )
+        query = self._statement(key, build)
 
-        where_sql, values = self._build_where(filters)
-        tail_sql = self._build_order_limit_offset(order_by, limit, offset)
-        query = f"SELECT * FROM {tbname}{where_sql}{tail_sql}"
-
+        values = where_values(filters)
         if limit is not None:
             values.append(limit)
         if offset is not None:
@@ -224,63 +455,160 @@ class MySQL(DB):
             dictionary=True,
             fetch=True,
             commit=False,
+            prepared=self._preparable(shape),
         )
         return rows
 
+    def select_active_keys(
+        self,
+        tbname: str,
+        key_column: str,
+        time_column: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+    ) -> Dict[Any, datetime]:
+        """
+        SELECT key, MAX(time) ... WHERE time >= since GROUP BY key
+
+        Served by a (time_column, key_column) index as a covering range scan,
+        so only rows inside the window are read.
+        """
+
+        def build() -> str:
+            self._validate_tbname(tbname)
+            for col in (key_column, time_column):
+                if not str(col).replace("_", "").isalnum():
+                    raise ValueError("column contains invalid characters")
+
+            query = (
+                f"SELECT {key_column} AS k, MAX({time_column}) AS t FROM {tbname}"
+                f" WHERE {time_column} >= %s"
+            )
+            if until is not None:
+                query += f" AND {time_column} <= %s"
+            return query + f" GROUP BY {key_column}"
+
+        query = self._statement(("active_keys", tbname, key_column, time_column, until is not None), build)
+        values = (since,) if until is None else (since, until)
+
+        rows = self._execute_with_retry(
+            query,
+            values,
+            dictionary=True,
+            fetch=True,
+            commit=False,
+            prepared=True,
+        )
+        return {row["k"]: row["t"] for row in rows}
+
     # ---------------------------------
     # INSERT
     # ---------------------------------
 
     def insert(self, tbname: str, data: Dict[str, Any]) -> Optional[int]:
-        self._validate_tbname(tbname)
-
         if not data:
             raise ValueError("insert() requires data")
 
-        cols = list(data.keys())
-        for c in cols:
-            if not str(c).replace("_", "").isalnum():
-                raise ValueError("insert key contains invalid characters")
-
-        placeholders = ", ".join(["%s"] * len(cols))
-        columns_sql = ", ".join(cols)
+        cols = tuple(data.keys())
+        query = self._insert_statement(tbname, cols)
         values = tuple(data[c] for c in cols)
 
-        query = f"INSERT INTO {tbname} ({columns_sql}) VALUES ({placeholders})"
-
         _, lastrowid = self._execute_with_retry(
             query,
             values,
             dictionary=False,
             fetch=False,
             commit=True,
+            tbname=tbname,
+            prepared=True,
         )
         return lastrowid
 
+    def insert_many(self, tbname: str, rows: List[Dict[str, Any]], *, chunk_size: int = 1000) -> int:
+        """
+        Multi-row insert. Rows are grouped by column set; mysql-connector
+        rewrites executemany() of an INSERT into one multi-row statement
+        per chunk, so N rows cost ceil(N / chunk_size) round trips and,
+        in one transaction, a single commit.
+
+        The SQL comes from the statement cache (same shape as insert()).
+        Chunks of several rows run on plain cursors: a prepared cursor
+        would execute them one row at a time instead of rewriting them
+        into one statement. A one-row chunk runs prepared, like insert().
+        """
+        self._validate_tbname(tbname)
+
+        if not rows:
+            return 0
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be > 0")
+
+        groups: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+        for row in rows:
+            if not row:
+                raise ValueError("insert_many() rows cannot be empty")
+            cols = tuple(row.keys())
+            groups.setdefault(cols, []).append(tuple(row[c] for c in cols))
+
+        queries = {cols: self._insert_statement(tbname, cols) for cols in groups}
+
+        inserted = 0
+        with self.transaction():
+            for cols, values in groups.items():
+                for i in range(0, len(values), chunk_size):
+                    chunk = values[i:i + chunk_size]
+                    single = len(chunk) == 1
+                    rowcount, _ = self._execute_with_retry(
+                        queries[cols],
+                        chunk[0] if single else chunk,
+                        dictionary=False,
+                        fetch=False,
+                        commit=True,
+                        many=not single,
+                        tbname=tbname,
+                        prepared=single,
+                    )
+                    inserted += int(rowcount)
+
+        return inserted
+
+    def _insert_statement(self, tbname: str, cols: Tuple[str, ...]) -> str:
+        def build() -> str:
+            self._validate_tbname(tbname)
+            for c in cols:
+                if not str(c).replace("_", "").isalnum():
+                    raise ValueError("insert key contains invalid characters")
+
+            placeholders = ", ".join(["%s"] * len(cols))
+            columns_sql = ", ".join(cols)
+            return f"INSERT INTO {tbname} ({columns_sql}) VALUES ({placeholders})"
+
+        return self._statement(("insert", tbname, cols), build)
+
     # ---------------------------------
     # UPDATE
     # ---------------------------------
 
     def update(self, tbname: str, data: Dict[str, Any], where: Dict[str, Any]) -> int:
-        self._validate_tbname(tbname)
-
         if not data:
             raise ValueError("update() requires data")
         if not where:
             raise ValueError("update() requires where")
 
-        set_parts: List[str] = []
-        values: List[Any] = []
-        for k, v in data.items():
-            if not str(k).replace("_", "").isalnum():
-                raise ValueError("update key contains invalid characters")
-            set_parts.append(f"{k}=%s")
-            values.append(v)
+        def build() -> str:
+            self._validate_tbname(tbname)
+            set_parts: List[str] = []
+            for k in data.keys():
+                if not str(k).replace("_", "").isalnum():
+                    raise ValueError("update key contains invalid characters")
+                set_parts.append(f"{k}=%s")
 
-        where_sql, where_values = self._build_where(where)
-        values.extend(where_values)
+            where_sql, _ = self._build_where(where)
+            return f"UPDATE {tbname} SET " + ", ".join(set_parts) + where_sql
 
-        query = f"UPDATE {tbname} SET " + ", ".join(set_parts) + where_sql
+        shape = where_shape(where)
+        query = self._statement(("update", tbname, tuple(data.keys()), shape), build)
+        values = list(data.values()) + where_values(where)
 
         rowcount, _ = self._execute_with_retry(
             query,
@@ -288,6 +616,8 @@ class MySQL(DB):
             dictionary=False,
             fetch=False,
             commit=True,
+            tbname=tbname,
+            prepared=self._preparable(shape),
         )
         return int(rowcount)
 
@@ -296,19 +626,24 @@ class MySQL(DB):
     # ---------------------------------
 
     def delete(self, tbname: str, where: Dict[str, Any]) -> int:
-        self._validate_tbname(tbname)
-
         if not where:
             raise ValueError("delete() requires where")
 
-        where_sql, values = self._build_where(where)
-        query = f"DELETE FROM {tbname}{where_sql}"
+        def build() -> str:
+            self._validate_tbname(tbname)
+            where_sql, _ = self._build_where(where)
+            return f"DELETE FROM {tbname}{where_sql}"
+
+        shape = where_shape(where)
+        query = self._statement(("delete", tbname, shape), build)
 
         rowcount, _ = self._execute_with_retry(
             query,
-            tuple(values),
+            tuple(where_values(where)),
             dictionary=False,
             fetch=False,
             commit=True,
+            tbname=tbname,
+            prepared=self._preparable(shape),
         )
         return int(rowcount)
@@ -0,0 +1,153 @@
+# core/infrastructure/slow_query_log.py
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|%\([A-Za-z0-9_]+\)s|\?")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_ROWS_RE = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(query: str) -> str:
+    """
+    Normalized statement shape: literals and driver placeholders become
+    "?", IN lists and multi-row VALUES collapse, whitespace is folded.
+
+        SELECT * FROM classrooms WHERE id_building=%s   -> ... id_building=?
+        DELETE FROM sensors WHERE room_id IN (%s, %s)   -> ... room_id IN (?+)
+    """
+    text = _STRING_RE.sub("?", query)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (?+)", text)
+    text = _ROWS_RE.sub(r"\1", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class _Stats:
+    __slots__ = ("count", "total", "max", "rows", "samples", "seen", "example", "last_seen")
+
+    def __init__(self, example: str) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples: List[float] = []
+        self.seen = 0
+        self.example = example
+        self.last_seen = 0.0
+
+
+class SlowQueryLog:
+    """
+    In-memory slow-query log, aggregated per statement fingerprint.
+
+    - a query slower than threshold_ms is kept with probability
+      sample_rate; faster ones cost one comparison
+    - per fingerprint: count, total/max time, rows (returned or affected)
+      and a bounded reservoir of durations for p50/p99
+    - at most max_fingerprints shapes are kept; new shapes beyond that
+      are only counted in `dropped`
+    - dump() returns the aggregates, slowest total first
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 100.0,
+        *,
+        sample_rate: float = 1.0,
+        max_fingerprints: int = 500,
+        reservoir_size: int = 512,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be in [0, 1]")
+        if reservoir_size <= 0:
+            raise ValueError("reservoir_size must be > 0")
+
+        self.threshold = threshold_ms / 1000.0
+        self.sample_rate = sample_rate
+        self.max_fingerprints = max_fingerprints
+        self.reservoir_size = reservoir_size
+        self._rng = rng or random.Random()
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _Stats] = {}
+        self.dropped = 0
+
+    def record(self, query: str, seconds: float, rows: int = 0) -> bool:
+        """Account one execution; True when it was kept."""
+        if seconds < self.threshold:
+            return False
+        if self.sample_rate < 1.0 and self._rng.random() >= self.sample_rate:
+            return False
+
+        key = fingerprint(query)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return False
+                stats = self._stats[key] = _Stats(query[:1000])
+
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.rows += int(rows or 0)
+            stats.last_seen = self._clock()
+
+            # reservoir sampling: every kept execution has the same chance
+            stats.seen += 1
+            if len(stats.samples) < self.reservoir_size:
+                stats.samples.append(seconds)
+            else:
+                j = self._rng.randrange(stats.seen)
+                if j < self.reservoir_size:
+                    stats.samples[j] = seconds
+        return True
+
+    def dump(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [(key, s, sorted(s.samples)) for key, s in self._stats.items()]
+
+        out = []
+        for key, s, samples in entries:
+            out.append(
+                {
+                    "fingerprint": key,
+                    "example": s.example,
+                    "count": s.count,
+                    "total_ms": round(s.total * 1000, 3),
+                    "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+                    "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+                    "max_ms": round(s.max * 1000, 3),
+                    "rows": s.rows,
+                    "rows_avg": round(s.rows / s.count, 2) if s.count else 0,
+                    "last_seen": s.last_seen,
+                }
+            )
+        out.sort(key=lambda e: e["total_ms"], reverse=True)
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.dropped = 0
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # nearest rank
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
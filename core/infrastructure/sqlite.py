@@ -0,0 +1,349 @@
+# core/infrastructure/sqlite.py
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from core.interfaces.db import DB
+from core.infrastructure.filters import build_where, parse_order_by, validate_column
+from core.metrics import instrumented
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database", "schema_sqlite.sql")
+
+
+class SQLite(DB):
+    """
+    SQLite backend (ENV_MODE=local): a real, indexed database without a
+    server, for single-node and edge deployments.
+
+    - same filter syntax, ordering, limit/offset and projection as MySQL
+      (see core.infrastructure.filters)
+    - WAL journal: readers never block the writer and vice versa;
+      synchronous=NORMAL (durable at checkpoints, never corrupt)
+    - one connection per thread, opened on first use and reused
+    - the schema (database/schema_sqlite.sql) is created on open
+    - datetimes are stored as "YYYY-MM-DD HH:MM:SS[.ffffff]" text, which
+      sorts and compares like the datetimes, and come back as datetime
+    - insert_many runs in one transaction (one fsync for the batch)
+    - transaction() is BEGIN IMMEDIATE ... COMMIT on the thread's
+      connection; nested calls are savepoints
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        busy_timeout: float = 5.0,
+        schema_path: Optional[str] = SCHEMA_PATH,
+    ) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        if schema_path:
+            with open(schema_path, "r", encoding="utf-8") as fh:
+                self._conn().executescript(fh.read())
+        self._datetime_columns = self._load_datetime_columns()
+
+    # -----------------------------
+    # CONNECTION
+    # -----------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: autocommit; transaction() opens explicit ones
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def _validate_tbname(self, tbname: str) -> None:
+        # prevent SQL injection via table name
+        if not re.fullmatch(r"[A-Za-z0-9_]+", tbname):
+            raise ValueError("table name contains invalid characters")
+
+    def _load_datetime_columns(self) -> Dict[str, Set[str]]:
+        conn = self._conn()
+        columns: Dict[str, Set[str]] = {}
+        for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"):
+            info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+            columns[table] = {row["name"] for row in info if str(row["type"]).upper() == "DATETIME"}
+        return columns
+
+    # ---------------------------------
+    # INTERNAL HELPERS
+    # ---------------------------------
+
+    def _param(self, value: Any) -> Any:
+        if isinstance(value, datetime):
+            return value.isoformat(" ")
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    def _params(self, values: List[Any]) -> Tuple[Any, ...]:
+        return tuple(self._param(v) for v in values)
+
+    def _row(self, tbname: str, row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        for col in self._datetime_columns.get(tbname, ()):
+            value = data.get(col)
+            if isinstance(value, str):
+                data[col] = self._to_datetime(value)
+        return data
+
+    def _to_datetime(self, value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+
+    def _build_columns(self, columns: Optional[List[str]]) -> str:
+        if not columns:
+            return "*"
+        return ", ".join(validate_column(c) for c in columns)
+
+    def _build_order_limit_offset(
+        self,
+        order_by: Optional[str],
+        limit: Optional[int],
+        offset: Optional[int],
+    ) -> str:
+        sql_parts: List[str] = []
+
+        if order_by:
+            order_terms = parse_order_by(order_by)
+            if order_terms:
+                sql_parts.append(" ORDER BY " + ", ".join(f"{col} {direction}" for col, direction in order_terms))
+
+        if limit is not None:
+            if limit <= 0:
+                raise ValueError("limit must be > 0")
+            sql_parts.append(" LIMIT ?")
+
+        if offset is not None:
+            if offset < 0:
+                raise ValueError("offset must be >= 0")
+            if limit is None:
+                raise ValueError("offset requires limit")
+            sql_parts.append(" OFFSET ?")
+
+        return "".join(sql_parts)
+
+    def is_data_error(self, exc: BaseException) -> bool:
+        # constraint failures, and values sqlite3 cannot bind
+        return isinstance(exc, (sqlite3.IntegrityError, sqlite3.DataError, sqlite3.InterfaceError)) or super().is_data_error(exc)
+
+    # ---------------------------------
+    # TRANSACTIONS
+    # ---------------------------------
+
+    @contextmanager
+    def transaction(self) -> Iterator["SQLite"]:
+        conn = self._conn()
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            name = f"sp_{depth}"
+            conn.execute(f"SAVEPOINT {name}")
+            self._local.depth = depth + 1
+            try:
+                yield self
+                conn.execute(f"RELEASE SAVEPOINT {name}")
+            except BaseException:
+                conn.execute(f"ROLLBACK TO SAVEPOINT {name}")
+                conn.execute(f"RELEASE SAVEPOINT {name}")
+                self._bump_write_generation()
+                raise
+            finally:
+                self._local.depth = depth
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield self
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            # reads memoized inside the block saw rows that are gone now
+            self._bump_write_generation()
+            raise
+        finally:
+            self._local.depth = 0
+
+    def _write(self, query: str, params: Tuple[Any, ...], tbname: str) -> sqlite3.Cursor:
+        cursor = self._conn().execute(query, params)
+        self._bump_write_generation(tbname)
+        return cursor
+
+    # ---------------------------------
+    # SELECT
+    # ---------------------------------
+
+    @instrumented("sqlite", "select")
+    def select(
+        self,
+        tbname: str,
+        filters: Optional[Dict[str, Any]] = None,
+        *,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        columns: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        self._validate_tbname(tbname)
+
+        columns_sql = self._build_columns(columns)
+        where_sql, values = build_where(filters or {}, "?")
+        tail_sql = self._build_order_limit_offset(order_by, limit, offset)
+        query = f"SELECT {columns_sql} FROM {tbname}{where_sql}{tail_sql}"
+
+        if limit is not None:
+            values.append(limit)
+        if offset is not None:
+            values.append(offset)
+
+        rows = self._conn().execute(query, self._params(values)).fetchall()
+        return [self._row(tbname, r) for r in rows]
+
+    @instrumented("sqlite", "select_active_keys")
+    def select_active_keys(
+        self,
+        tbname: str,
+        key_column: str,
+        time_column: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+    ) -> Dict[Any, datetime]:
+        """
+        SELECT key, MAX(time) ... WHERE time >= since GROUP BY key
+        (a range scan on a (time_column, key_column) index).
+        """
+        self._validate_tbname(tbname)
+        validate_column(key_column)
+        validate_column(time_column)
+
+        query = f"SELECT {key_column} AS k, MAX({time_column}) AS t FROM {tbname} WHERE {time_column} >= ?"
+        values: List[Any] = [since]
+        if until is not None:
+            query += f" AND {time_column} <= ?"
+            values.append(until)
+        query += f" GROUP BY {key_column}"
+
+        rows = self._conn().execute(query, self._params(values)).fetchall()
+        return {row["k"]: self._to_datetime(row["t"]) for row in rows}
+
+    # ---------------------------------
+    # INSERT
+    # ---------------------------------
+
+    @instrumented("sqlite", "insert")
+    def insert(self, tbname: str, data: Dict[str, Any]) -> Optional[int]:
+        self._validate_tbname(tbname)
+
+        if not data:
+            raise ValueError("insert() requires data")
+
+        cols = [validate_column(c) for c in data.keys()]
+        placeholders = ", ".join(["?"] * len(cols))
+        query = f"INSERT INTO {tbname} ({', '.join(cols)}) VALUES ({placeholders})"
+
+        cursor = self._write(query, self._params([data[c] for c in cols]), tbname)
+        return cursor.lastrowid
+
+    @instrumented("sqlite", "insert_many")
+    def insert_many(self, tbname: str, rows: List[Dict[str, Any]], *, chunk_size: int = 1000) -> int:
+        """
+        Multi-row insert in one transaction; rows are grouped by column set
+        and sent with executemany() in chunks of chunk_size.
+        """
+        self._validate_tbname(tbname)
+
+        if not rows:
+            return 0
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be > 0")
+
+        groups: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+        for row in rows:
+            if not row:
+                raise ValueError("insert_many() rows cannot be empty")
+            cols = tuple(validate_column(c) for c in row.keys())
+            groups.setdefault(cols, []).append(self._params([row[c] for c in cols]))
+
+        conn = self._conn()
+        inserted = 0
+        with self.transaction():
+            for cols, values in groups.items():
+                placeholders = ", ".join(["?"] * len(cols))
+                query = f"INSERT INTO {tbname} ({', '.join(cols)}) VALUES ({placeholders})"
+                for i in range(0, len(values), chunk_size):
+                    inserted += conn.executemany(query, values[i:i + chunk_size]).rowcount
+
+        self._bump_write_generation(tbname)
+        return inserted
+
+    # ---------------------------------
+    # UPDATE
+    # ---------------------------------
+
+    @instrumented("sqlite", "update")
+    def update(self, tbname: str, data: Dict[str, Any], where: Dict[str, Any]) -> int:
+        self._validate_tbname(tbname)
+
+        if not data:
+            raise ValueError("update() requires data")
+        if not where:
+            raise ValueError("update() requires where")
+
+        set_parts = [f"{validate_column(k)}=?" for k in data.keys()]
+        where_sql, where_values = build_where(where, "?")
+        query = f"UPDATE {tbname} SET " + ", ".join(set_parts) + where_sql
+
+        cursor = self._write(query, self._params(list(data.values()) + where_values), tbname)
+        return int(cursor.rowcount)
+
+    # ---------------------------------
+    # DELETE
+    # ---------------------------------
+
+    @instrumented("sqlite", "delete")
+    def delete(self, tbname: str, where: Dict[str, Any]) -> int:
+        self._validate_tbname(tbname)
+
+        if not where:
+            raise ValueError("delete() requires where")
+
+        where_sql, values = build_where(where, "?")
+        cursor = self._write(f"DELETE FROM {tbname}{where_sql}", self._params(values), tbname)
+        return int(cursor.rowcount)
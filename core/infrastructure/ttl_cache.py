@@ -0,0 +1,105 @@
+# core/infrastructure/ttl_cache.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry expiry.
+
+    - set(key, value): positive entry, lives ttl seconds (or its own ttl)
+    - set_missing(key): negative entry ("not found"), lives negative_ttl seconds
+    - get(key) -> (hit, value); a negative hit returns (True, None)
+    - the least recently used entry is evicted past max_size
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be > 0")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            if value is _MISSING:
+                self._stats["negative_hits"] += 1
+                return True, None
+            self._stats["hits"] += 1
+            return True, value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._store(key, value, self.ttl if ttl is None else ttl)
+
+    def set_missing(self, key: Hashable) -> None:
+        self._store(key, _MISSING, self.negative_ttl)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Drop positive entries whose value matches predicate.
+        """
+        with self._lock:
+            keys = [k for k, (_, v) in self._entries.items() if v is not _MISSING and predicate(v)]
+            for k in keys:
+                del self._entries[k]
+            self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            result = dict(self._stats)
+            result["size"] = len(self._entries)
+        return result
+
+    def _store(self, key: Hashable, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
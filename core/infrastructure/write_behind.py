@@ -0,0 +1,262 @@
+# core/infrastructure/write_behind.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from core.interfaces.db import DB
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-process queue in front of DB.insert_many() for one table.
+
+    - put() acknowledges right away; rows are dropped (and counted) when the
+      queue is full instead of blocking the request
+    - a daemon thread flushes a batch when batch_size rows are queued or
+      flush_interval seconds passed, whichever comes first
+    - a batch that fails on its data (DB.is_data_error: a constraint, e.g.
+      an event for a deleted room) is retried, and on its last attempt
+      (max_attempts) split and written row by row, so a bad row drops only
+      itself
+    - a batch that fails on the connection or server is kept and retried
+      until it goes through; the row-by-row pass also stops (and keeps the
+      rest) at the first such failure. Meanwhile the thread backs off
+      (flush_interval, doubling up to max_backoff) however long the queue
+      is, so an outage fills the queue (dropped_full) instead of draining
+      it into dropped_failed
+    - close() stops the thread and flushes what is left, for at most
+      close_timeout seconds (checked between inserts); rows still queued
+      after that are counted in dropped_failed (call it on shutdown)
+    """
+
+    def __init__(
+        self,
+        db: DB,
+        tbname: str,
+        *,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_attempts: int = 3,
+        max_backoff: float = 30.0,
+        close_timeout: float = 10.0,
+        start: bool = True,
+    ) -> None:
+        if max_queue <= 0 or batch_size <= 0:
+            raise ValueError("max_queue and batch_size must be > 0")
+
+        self._db = db
+        self.tbname = tbname
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.close_timeout = close_timeout
+
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._retry: List[Dict[str, Any]] = []
+        self._retry_attempts = 0
+        self._failures = 0  # consecutive failed flushes
+        self._closed = False
+
+        self._stats: Dict[str, int] = {
+            "enqueued": 0,
+            "flushed": 0,
+            "batches": 0,
+            "dropped_full": 0,
+            "dropped_failed": 0,
+            "discarded": 0,
+            "flush_errors": 0,
+        }
+
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name=f"write-behind-{tbname}", daemon=True)
+            self._thread.start()
+
+    # -----------------------------
+    # PRODUCERS
+    # -----------------------------
+
+    def put(self, row: Dict[str, Any]) -> bool:
+        return self.put_many([row]) == 1
+
+    def put_many(self, rows: List[Dict[str, Any]]) -> int:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind buffer is closed")
+
+            free = self.max_queue - len(self._queue)
+            accepted = rows[:max(free, 0)]
+            self._queue.extend(accepted)
+
+            self._stats["enqueued"] += len(accepted)
+            self._stats["dropped_full"] += len(rows) - len(accepted)
+
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+        return len(accepted)
+
+    def discard_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """
+        Remove queued rows (e.g. events of a room that is being deleted).
+        """
+        with self._flush_lock, self._cond:
+            kept = [r for r in self._queue if not predicate(r)]
+            kept_retry = [r for r in self._retry if not predicate(r)]
+            removed = (len(self._queue) - len(kept)) + (len(self._retry) - len(kept_retry))
+
+            self._queue = deque(kept)
+            self._retry = kept_retry
+            self._stats["discarded"] += removed
+        return removed
+
+    # -----------------------------
+    # FLUSHING
+    # -----------------------------
+
+    def flush(self, deadline: Optional[float] = None) -> int:
+        """
+        Synchronously write everything queued so far, stopping at deadline
+        (a time.monotonic() value) when given. Returns rows written.
+        """
+        written = 0
+        while deadline is None or time.monotonic() < deadline:
+            progress = self._flush_once(deadline)
+            if progress is None:
+                break
+            written += progress
+        return written
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        deadline = time.monotonic() + self.close_timeout
+        while True:
+            self.flush(deadline)
+            remaining = deadline - time.monotonic()
+            if not self.depth() or remaining <= 0:
+                break
+            time.sleep(min(self.flush_interval, remaining))
+
+        with self._flush_lock, self._cond:
+            # lost at exit: make it visible in stats instead of vanishing
+            self._stats["dropped_failed"] += len(self._queue) + len(self._retry)
+            self._queue.clear()
+            self._retry = []
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._queue) + len(self._retry)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            result = dict(self._stats)
+            result["depth"] = len(self._queue) + len(self._retry)
+            result["max_queue"] = self.max_queue
+        return result
+
+    # -----------------------------
+    # INTERNAL
+    # -----------------------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self._wait_seconds()
+                # a full batch only cuts the wait short while the DB is healthy
+                while not self._closed and (self._failures or len(self._queue) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+
+            self.flush()
+
+    def _wait_seconds(self) -> float:
+        if not self._failures:
+            return self.flush_interval
+        return min(self.flush_interval * 2 ** (self._failures - 1), max(self.max_backoff, self.flush_interval))
+
+    def _flush_once(self, deadline: Optional[float] = None) -> Optional[int]:
+        # None: nothing to do (or the batch failed and will be retried later)
+        with self._flush_lock:
+            with self._cond:
+                if self._retry:
+                    batch = self._retry
+                else:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    self._retry_attempts = 0
+                self._retry = []
+
+            if not batch:
+                return None
+
+            try:
+                self._db.insert_many(self.tbname, batch)
+            except Exception as exc:
+                with self._cond:
+                    self._stats["flush_errors"] += 1
+                    data_error = self._db.is_data_error(exc)
+                    if data_error:
+                        self._retry_attempts += 1
+                    if not data_error or self._retry_attempts < self.max_attempts:
+                        # connection trouble never uses up the attempts
+                        self._failures += 1
+                        self._retry = batch
+                        return None
+                    self._retry_attempts = 0
+                return self._flush_rows(batch, deadline)
+
+            with self._cond:
+                self._failures = 0
+                self._stats["flushed"] += len(batch)
+                self._stats["batches"] += 1
+            return len(batch)
+
+    def _flush_rows(self, batch: List[Dict[str, Any]], deadline: Optional[float] = None) -> Optional[int]:
+        # last attempt: one row per insert, only rows with bad data are dropped
+        written = dropped = 0
+        for row in batch:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            try:
+                self._db.insert_many(self.tbname, [row])
+            except Exception as exc:
+                if not self._db.is_data_error(exc):
+                    break
+                dropped += 1
+                continue
+            written += 1
+        rest = batch[written + dropped:]
+
+        with self._cond:
+            self._stats["flushed"] += written
+            self._stats["dropped_failed"] += dropped
+            if rest:
+                # stopped early: the rest is retried after the backoff
+                self._retry = rest
+                self._retry_attempts = self.max_attempts - 1
+                self._failures += 1
+                return None
+            # every row was tried: the database is up
+            self._failures = 0
+            if written:
+                self._stats["batches"] += 1
+        return written
@@ -1,6 +1,66 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from core.unit_of_work import UnitOfWork
 
 class DB(ABC):
+    # bumped on every write; lets request-scoped memos detect stale reads
+    write_generation = 0
+    # {table: write_generation of its last write}; see table_generation()
+    _table_generations: Optional[Dict[str, int]] = None
+    _all_tables_generation = 0
+
+    def _bump_write_generation(self, tbname: Optional[str] = None) -> None:
+        # tbname=None: unknown table, count it as a write to every table
+        self.write_generation += 1
+        if tbname is None:
+            self._all_tables_generation = self.write_generation
+            return
+        if self._table_generations is None:
+            self._table_generations = {}
+        self._table_generations[tbname] = self.write_generation
+
+    def table_generation(self, *tbnames: str) -> int:
+        """
+        write_generation of the last write to any of tbnames (0: none yet).
+        Lets caches depend on a few tables only, e.g. not on motion events.
+        """
+        gens = self._table_generations or {}
+        return max([self._all_tables_generation] + [gens.get(t, 0) for t in tbnames])
+
+    def is_data_error(self, exc: BaseException) -> bool:
+        """
+        True when exc is about the rows written (constraint, bad value),
+        so the same write will keep failing; False for connection and
+        server trouble that a later retry may get past.
+        """
+        return isinstance(exc, (ValueError, TypeError, KeyError))
+
+    @contextmanager
+    def transaction(self) -> Iterator["DB"]:
+        """
+        Run the block's writes as one unit: all of them or none, one
+        commit. A nested call is a savepoint: an error inside it undoes
+        only the nested block (and propagates). Backends without
+        transactions run the block as is.
+        """
+        yield self
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[UnitOfWork]:
+        """
+        Queue writes and send them together when the block ends, in one
+        transaction (see core.unit_of_work). An error drops the queue.
+        """
+        uow = UnitOfWork(self)
+        try:
+            yield uow
+        except BaseException:
+            uow.rollback()
+            raise
+        uow.commit()
+
     @abstractmethod
     def select(self):
         pass
@@ -9,6 +69,22 @@ class DB(ABC):
     def insert(self):
         pass
 
+    @abstractmethod
+    def insert_many(self):
+        """
+        Insert many rows in as few round trips as possible.
+        Returns the number of inserted rows.
+        """
+        pass
+
     @abstractmethod
     def update(self):
         pass
+
+    @abstractmethod
+    def select_active_keys(self):
+        """
+        Distinct key_column values with a time_column in [since, until],
+        mapped to their latest time: {key: max(time_column)}.
+        """
+        pass
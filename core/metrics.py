@@ -0,0 +1,222 @@
+# core/metrics.py
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core.config import METRICS_ENABLED
+
+# seconds; the Prometheus client defaults
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNTAGGED = "-"
+
+
+class RequestTimings:
+    """
+    What one request cost: DB queries and DB time, tagged with the route
+    (controller, action) once Application.handle has resolved it.
+    """
+
+    def __init__(self, metrics: "Metrics") -> None:
+        self.metrics = metrics
+        self.controller = UNTAGGED
+        self.action = UNTAGGED
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def tag(self, controller: str, action: str) -> None:
+        self.controller = controller
+        self.action = action
+
+    @property
+    def tagged(self) -> bool:
+        return self.controller != UNTAGGED
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in milliseconds)."""
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_queries} queries", '
+            f"app;dur={self.elapsed() * 1000:.2f}"
+        )
+
+
+class Metrics:
+    """
+    Process-wide counters and timers, rendered as Prometheus text:
+
+    - freeclass_http_request_duration_seconds: latency histogram per route
+    - freeclass_http_requests_total: requests per route and status
+    - freeclass_db_queries_total / freeclass_db_query_seconds_total: DB
+      operations per backend, op and route ("-" outside a request, e.g.
+      the write-behind flusher or retention)
+
+    Routes are only the (controller, action) pairs Application.handle has
+    resolved, so label sets stay bounded whatever the URL says.
+    """
+
+    def __init__(self, *, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+
+        self._lock = threading.Lock()
+        # (controller, action) -> [per-bucket counts..., +Inf count], sum
+        self._latency: Dict[Tuple[str, str], List[Any]] = {}
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        # (backend, op, controller, action) -> [count, seconds]
+        self._db: Dict[Tuple[str, str, str, str], List[float]] = {}
+
+    # -----------------------------
+    # REQUESTS
+    # -----------------------------
+
+    @contextmanager
+    def track_request(self) -> Iterator[RequestTimings]:
+        timings = RequestTimings(self)
+        token = _current.set(timings)
+        try:
+            yield timings
+        finally:
+            _current.reset(token)
+
+    def observe_request(self, controller: str, action: str, status: int, seconds: float) -> None:
+        if not self.enabled:
+            return
+        route = (controller, action)
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._latency.get(route)
+            if entry is None:
+                entry = self._latency[route] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += seconds
+            key = (controller, action, int(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    # -----------------------------
+    # DB
+    # -----------------------------
+
+    def observe_db(self, backend: str, op: str, seconds: float, timings: Optional[RequestTimings] = None) -> None:
+        if not self.enabled:
+            return
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_seconds += seconds
+            key = (backend, op, timings.controller, timings.action)
+        else:
+            key = (backend, op, UNTAGGED, UNTAGGED)
+        with self._lock:
+            entry = self._db.get(key)
+            if entry is None:
+                entry = self._db[key] = [0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+
+    # -----------------------------
+    # EXPOSITION
+    # -----------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "latency": {k: ([*v[0]], v[1]) for k, v in self._latency.items()},
+                "requests": dict(self._requests),
+                "db": {k: tuple(v) for k, v in self._db.items()},
+            }
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        snap = self.snapshot()
+        lines: List[str] = []
+
+        name = "freeclass_http_request_duration_seconds"
+        lines.append(f"# HELP {name} Request latency per route.")
+        lines.append(f"# TYPE {name} histogram")
+        for (controller, action), (counts, total) in sorted(snap["latency"].items()):
+            route = _labels(controller=controller, action=action)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{{{route},le=\"{le}\"}} {cumulative}")
+            lines.append(f"{name}_sum{{{route}}} {total:.6f}")
+            lines.append(f"{name}_count{{{route}}} {cumulative}")
+
+        name = "freeclass_http_requests_total"
+        lines.append(f"# HELP {name} Requests per route and status.")
+        lines.append(f"# TYPE {name} counter")
+        for (controller, action, status), count in sorted(snap["requests"].items()):
+            lines.append(f"{name}{{{_labels(controller=controller, action=action, status=status)}}} {count}")
+
+        queries, seconds = "freeclass_db_queries_total", "freeclass_db_query_seconds_total"
+        lines.append(f"# HELP {queries} DB operations per backend, op and route.")
+        lines.append(f"# TYPE {queries} counter")
+        for (backend, op, controller, action), (count, _) in sorted(snap["db"].items()):
+            labels = _labels(backend=backend, op=op, controller=controller, action=action)
+            lines.append(f"{queries}{{{labels}}} {int(count)}")
+        lines.append(f"# HELP {seconds} Time spent in DB operations per backend, op and route.")
+        lines.append(f"# TYPE {seconds} counter")
+        for (backend, op, controller, action), (_, total) in sorted(snap["db"].items()):
+            labels = _labels(backend=backend, op=op, controller=controller, action=action)
+            lines.append(f"{seconds}{{{labels}}} {total:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latency.clear()
+            self._requests.clear()
+            self._db.clear()
+
+
+def _labels(**labels: Any) -> str:
+    def escape(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+
+
+# the process-wide registry; DB calls outside a tracked request land here
+METRICS = Metrics(enabled=METRICS_ENABLED)
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def db_timer(backend: str, op: str) -> Iterator[None]:
+    """Count and time one DB operation against the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current.get()
+        metrics = timings.metrics if timings is not None else METRICS
+        metrics.observe_db(backend, op, time.perf_counter() - start, timings)
+
+
+def instrumented(backend: str, op: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Method decorator: the call is one DB operation (see db_timer)."""
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with db_timer(backend, op):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
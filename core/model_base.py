@@ -2,11 +2,18 @@
 from __future__ import annotations
 from typing import Any, Dict, List, Optional
 
+from core.request_memo import current_memo, freeze, memoize
+
 
 class ModelBase:
     def __init__(self, _tbname) -> None:
         self.TABLE = _tbname
 
+    def _writer(self, uow=None):
+        # writes go to the caller's unit of work when given (see
+        # core.unit_of_work), else straight to the db; an empty one is falsy
+        return uow if uow is not None else self.db
+
     def filter(
         self,
         where: Optional[Dict[str, Any]] = None,
@@ -14,18 +21,44 @@ class ModelBase:
         order_by: Optional[str] = None,
         limit: Optional[int] = 200,
         offset: Optional[int] = None,
+        columns: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         ADT-style filter wrapper.
 
-        - where: equality AND only, e.g. {"id": 1}
+        - where: AND of predicates, e.g. {"id": 1}, {"id": [1, 2]},
+          {"category": None}, {"event_time >=": since}
+          (see core.infrastructure.filters)
+        - columns: projection, e.g. ["id", "room_id"] (default: all)
         - order_by: supports "id", "-id", "event_time DESC", "event_time DESC, id DESC"
         - limit/offset: pagination (offset requires limit)
+        - limit defaults to 200; pass limit=None to read every matching row
+        - identical calls are read once per request (see core.request_memo);
+          every call gets its own copies of the rows
         """
-        return self.db.select(
+        def read():
+            return self.db.select(
+                self.TABLE,
+                where or {},
+                order_by=order_by,
+                limit=limit,
+                offset=offset,
+                columns=columns,
+            )
+
+        if current_memo() is None:
+            return read()
+
+        key = (
+            "filter",
+            id(self.db),
             self.TABLE,
-            where or {},
-            order_by=order_by,
-            limit=limit,
-            offset=offset,
+            freeze(where or {}),
+            order_by,
+            limit,
+            offset,
+            freeze(columns),
+            self.db.write_generation,
         )
+        # the memo keeps the rows: hand out copies the caller may change
+        return [dict(r) for r in memoize(key, read)]
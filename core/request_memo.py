@@ -0,0 +1,71 @@
+# core/request_memo.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+
+class RequestMemo:
+    """
+    Per-request memo: identical reads are computed once per request.
+
+    - activate() binds the memo to the current context (thread / request)
+    - memoize() outside an active memo simply calls compute()
+    - cached values are shared: callers must treat them as read-only
+    - keys that depend on stored data should include db.write_generation,
+      so a write inside the request makes later reads miss
+    """
+
+    def __init__(self) -> None:
+        self._values: Dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]
+
+        self.misses += 1
+        value = compute()
+        self._values[key] = value
+        return value
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    @contextmanager
+    def activate(self) -> Iterator["RequestMemo"]:
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+
+_current: ContextVar[Optional[RequestMemo]] = ContextVar("request_memo", default=None)
+
+
+def current_memo() -> Optional[RequestMemo]:
+    return _current.get()
+
+
+def memoize(key: Hashable, compute: Callable[[], Any]) -> Any:
+    memo = _current.get()
+    if memo is None:
+        return compute()
+    return memo.get_or_compute(key, compute)
+
+
+def freeze(value: Any) -> Hashable:
+    """
+    Hashable form of filter dicts / lists, for use in memo keys.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((freeze(v) for v in value), key=repr))
+    return value
@@ -0,0 +1,94 @@
+# core/response_cache.py
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from core.infrastructure.ttl_cache import TTLCache
+from core.request_memo import freeze
+
+
+class ResponseCache:
+    """
+    Rendered responses, keyed by (controller, action, normalized params).
+
+    - controllers opt in per action with a class attribute:
+        CACHE = {"print": (ttl_seconds, ("catalog", "availability"))}
+    - invalidate(*tags) is O(1): it bumps the tag's version, and entries
+      stored under an older version miss on their next get()
+    - tag versions are taken before the action runs, so a write that lands
+      while a response renders still invalidates it
+    - deadline_fn(tags) -> seconds may shorten an entry's ttl (e.g. until
+      the next activity window runs out, for "availability")
+    - entries are per process: writes in other workers are only bounded
+      by the ttl
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        *,
+        enabled: bool = True,
+        deadline_fn: Optional[Callable[[Tuple[str, ...]], Optional[float]]] = None,
+        store: Optional[TTLCache] = None,
+    ) -> None:
+        self.enabled = enabled
+        self._deadline_fn = deadline_fn
+        self._store = store or TTLCache(max_size=max_size)
+
+        self._lock = threading.Lock()
+        self._tag_versions: Dict[str, int] = {}
+
+    # -----------------------------
+    # KEYS / VERSIONS
+    # -----------------------------
+
+    def key(self, controller: str, action: str, params: Dict[str, Any]) -> Hashable:
+        normalized = {str(k): (v.strip() if isinstance(v, str) else v) for k, v in (params or {}).items()}
+        return (controller, action, freeze(normalized))
+
+    def tag_versions(self, tags: Iterable[str]) -> Tuple[Tuple[str, int], ...]:
+        with self._lock:
+            return tuple((tag, self._tag_versions.get(tag, 0)) for tag in sorted(tags))
+
+    def invalidate(self, *tags: str) -> None:
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+
+    # -----------------------------
+    # ENTRIES
+    # -----------------------------
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        hit, entry = self._store.get(key)
+        if not hit:
+            return None
+
+        versions, payload = entry
+        if versions != self.tag_versions(tag for tag, _ in versions):
+            self._store.invalidate(key)
+            return None
+        return payload
+
+    def set(self, key: Hashable, payload: Any, ttl: float, versions: Tuple[Tuple[str, int], ...]) -> None:
+        if not self.enabled or ttl <= 0:
+            return
+
+        if self._deadline_fn is not None:
+            deadline = self._deadline_fn(tuple(tag for tag, _ in versions))
+            if deadline is not None:
+                ttl = min(ttl, deadline)
+                if ttl <= 0:
+                    return
+
+        self._store.set(key, (versions, payload), ttl=ttl)
+
+    def clear(self) -> None:
+        self._store.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._store.stats()
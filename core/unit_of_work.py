@@ -0,0 +1,121 @@
+# core/unit_of_work.py
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.infrastructure.filters import is_list_value, parse_filter_key
+
+
+class UnitOfWork:
+    """
+    Writes queued in memory and sent together by commit().
+
+    - consecutive inserts into one table go out as one insert_many()
+    - consecutive deletes on one table by the same "=" column merge into
+      one IN-list delete ({"id": 1}, {"id": 2} -> {"id": [1, 2]})
+    - everything runs in one db.transaction(): all or nothing, one commit
+    - nothing reaches the database before commit(); rollback() drops the
+      queue. Queued inserts have no id yet: use db.insert() when you need it
+    - after_commit(fn) callbacks run once the transaction has committed
+      (e.g. cache invalidation), and are dropped with the queue on rollback
+
+    Usage:
+        with db.unit_of_work() as uow:
+            uow.insert("sensors", {...})
+            uow.delete("classroom_motion_events", {"id": event_id})
+    """
+
+    def __init__(self, db) -> None:
+        self.db = db
+        # [op, tbname, payload]; payload: rows | (data, where) | where
+        self._ops: List[List[Any]] = []
+        self._after_commit: List[Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    # -----------------------------
+    # QUEUE
+    # -----------------------------
+
+    def insert(self, tbname: str, data: Dict[str, Any]) -> None:
+        if not data:
+            raise ValueError("insert() requires data")
+        self.insert_many(tbname, [data])
+
+    def insert_many(self, tbname: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        last = self._ops[-1] if self._ops else None
+        if last is not None and last[0] == "insert" and last[1] == tbname:
+            last[2].extend(dict(r) for r in rows)
+            return
+        self._ops.append(["insert", tbname, [dict(r) for r in rows]])
+
+    def update(self, tbname: str, data: Dict[str, Any], where: Dict[str, Any]) -> None:
+        if not data:
+            raise ValueError("update() requires data")
+        if not where:
+            raise ValueError("update() requires where")
+        self._ops.append(["update", tbname, (dict(data), dict(where))])
+
+    def delete(self, tbname: str, where: Dict[str, Any]) -> None:
+        if not where:
+            raise ValueError("delete() requires where")
+        last = self._ops[-1] if self._ops else None
+        if last is not None and last[0] == "delete" and last[1] == tbname:
+            merged = self._merge_in_list(last[2], where)
+            if merged is not None:
+                last[2] = merged
+                return
+        self._ops.append(["delete", tbname, dict(where)])
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        self._after_commit.append(callback)
+
+    def _merge_in_list(self, first: Dict[str, Any], second: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # {"col": a} + {"col": b} -> {"col": [a, b]}; anything else stays separate
+        if len(first) != 1 or len(second) != 1:
+            return None
+        (key_a, value_a), (key_b, value_b) = next(iter(first.items())), next(iter(second.items()))
+        col_a, op_a = parse_filter_key(key_a)
+        col_b, op_b = parse_filter_key(key_b)
+        if col_a != col_b or op_a != "=" or op_b != "=" or value_a is None or value_b is None:
+            return None
+
+        values: List[Any] = []
+        for value in (value_a, value_b):
+            values.extend(value if is_list_value(value) else [value])
+        return {col_a: list(dict.fromkeys(values))}
+
+    # -----------------------------
+    # COMMIT / ROLLBACK
+    # -----------------------------
+
+    def commit(self) -> Dict[str, int]:
+        """Send the queue in one transaction. Returns rows per kind of write."""
+        ops, self._ops = self._ops, []
+        callbacks, self._after_commit = self._after_commit, []
+        counts = {"inserted": 0, "updated": 0, "deleted": 0}
+
+        if ops:
+            with self.db.transaction():
+                for op, tbname, payload in ops:
+                    if op == "insert":
+                        counts["inserted"] += self.db.insert_many(tbname, payload)
+                    elif op == "update":
+                        data, where = payload
+                        counts["updated"] += self.db.update(tbname, data, where)
+                    else:
+                        counts["deleted"] += self.db.delete(tbname, payload)
+
+        for callback in callbacks:
+            callback()
+        return counts
+
+    def rollback(self) -> None:
+        self._ops = []
+        self._after_commit = []
+
+    def pending(self) -> List[Tuple[str, str]]:
+        return [(op, tbname) for op, tbname, _ in self._ops]
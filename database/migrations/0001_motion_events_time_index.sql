@@ -0,0 +1,6 @@
+-- Availability, retention and the recent-spaces list read motion events
+-- by time: WHERE event_time >= ? GROUP BY classroom_id, ORDER BY
+-- event_time DESC LIMIT n. (event_time, classroom_id) serves all of them
+-- as a covering range scan, in index order.
+ALTER TABLE classroom_motion_events
+  ADD KEY idx_cme_event_time_classroom (event_time, classroom_id);
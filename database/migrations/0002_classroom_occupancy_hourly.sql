@@ -0,0 +1,14 @@
+-- Hourly per-room rollups written by retention.py (RetentionService).
+CREATE TABLE IF NOT EXISTS classroom_occupancy_hourly (
+  id bigint unsigned NOT NULL AUTO_INCREMENT,
+  classroom_id int NOT NULL,
+  hour_start datetime NOT NULL,
+  event_count int unsigned NOT NULL DEFAULT '0',
+  busy_seconds int unsigned NOT NULL DEFAULT '0',
+  first_event datetime(3) DEFAULT NULL,
+  last_event datetime(3) DEFAULT NULL,
+  PRIMARY KEY (id),
+  UNIQUE KEY uq_coh_classroom_hour (classroom_id, hour_start),
+  KEY idx_coh_hour_start (hour_start),
+  CONSTRAINT fk_occupancy_hourly_classroom FOREIGN KEY (classroom_id) REFERENCES classrooms (id) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
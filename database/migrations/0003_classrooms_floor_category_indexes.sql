@@ -0,0 +1,8 @@
+-- list_by_floor(): WHERE id_building = ? AND floor = ?
+-- room type filters: WHERE category = ?
+-- (id_building, floor) also serves the building foreign key, so the
+-- single-column index on id_building goes.
+ALTER TABLE classrooms
+  ADD KEY idx_classrooms_building_floor (id_building, floor),
+  ADD KEY idx_classrooms_category (category),
+  DROP KEY idx_classrooms_building;
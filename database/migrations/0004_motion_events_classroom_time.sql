@@ -0,0 +1,6 @@
+-- Per-room history and room deletes: WHERE classroom_id = ?
+-- [ORDER BY event_time]. Replaces idx_cme_classroom_id, which it covers
+-- (including the classrooms foreign key).
+ALTER TABLE classroom_motion_events
+  ADD KEY idx_cme_classroom_time (classroom_id, event_time),
+  DROP KEY idx_cme_classroom_id;
@@ -0,0 +1,6 @@
+-- Highest classroom_motion_events.id counted into a rollup row, so a
+-- retention rerun can tell leftover (already counted) raw events from
+-- late ones that still have to be merged in. NULL: written before this
+-- column existed, counted as covering every event of its hour.
+ALTER TABLE classroom_occupancy_hourly
+  ADD COLUMN last_event_id bigint unsigned DEFAULT NULL;
@@ -0,0 +1,73 @@
+-- SQLite schema for ENV_MODE=local (core/infrastructure/sqlite.py).
+-- Mirrors database/schema.sql with every migration in database/migrations
+-- applied; keep both in step. Safe to run on every start.
+
+CREATE TABLE IF NOT EXISTS buildings (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  building_name TEXT NOT NULL,
+  floors INTEGER NOT NULL,
+  color TEXT NOT NULL DEFAULT '#000'
+);
+
+CREATE TABLE IF NOT EXISTS classroom_categories (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL UNIQUE,
+  description TEXT DEFAULT NULL,
+  color TEXT NOT NULL DEFAULT '#6c757d',
+  created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now')),
+  updated_at DATETIME DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS classrooms (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  id_building INTEGER NOT NULL REFERENCES buildings (id) ON DELETE RESTRICT ON UPDATE CASCADE,
+  floor INTEGER NOT NULL,
+  class_number INTEGER NOT NULL,
+  category TEXT DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_classrooms_building_floor ON classrooms (id_building, floor);
+CREATE INDEX IF NOT EXISTS idx_classrooms_category ON classrooms (category);
+
+CREATE TABLE IF NOT EXISTS sensors (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  room_id INTEGER NOT NULL REFERENCES classrooms (id) ON DELETE CASCADE ON UPDATE CASCADE,
+  private_key TEXT NOT NULL UNIQUE,
+  public_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sensors_room_id ON sensors (room_id);
+
+CREATE TABLE IF NOT EXISTS classroom_motion_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  classroom_id INTEGER NOT NULL REFERENCES classrooms (id) ON DELETE RESTRICT ON UPDATE CASCADE,
+  sensor_id TEXT NOT NULL,
+  event_time DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  received_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  event_type TEXT NOT NULL DEFAULT 'motion',
+  confidence INTEGER DEFAULT NULL,
+  payload TEXT DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cme_classroom_time ON classroom_motion_events (classroom_id, event_time);
+CREATE INDEX IF NOT EXISTS idx_cme_sensor_id ON classroom_motion_events (sensor_id);
+CREATE INDEX IF NOT EXISTS idx_cme_event_time_classroom ON classroom_motion_events (event_time, classroom_id);
+
+CREATE TABLE IF NOT EXISTS classroom_occupancy_hourly (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  classroom_id INTEGER NOT NULL REFERENCES classrooms (id) ON DELETE CASCADE ON UPDATE CASCADE,
+  hour_start DATETIME NOT NULL,
+  event_count INTEGER NOT NULL DEFAULT 0,
+  busy_seconds INTEGER NOT NULL DEFAULT 0,
+  first_event DATETIME DEFAULT NULL,
+  last_event DATETIME DEFAULT NULL,
+  last_event_id INTEGER DEFAULT NULL,
+  UNIQUE (classroom_id, hour_start)
+);
+CREATE INDEX IF NOT EXISTS idx_coh_hour_start ON classroom_occupancy_hourly (hour_start);
+
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  username TEXT NOT NULL UNIQUE,
+  password TEXT NOT NULL,
+  role TEXT NOT NULL DEFAULT 'user' CHECK (role IN ('admin', 'user', 'moderator')),
+  created_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+  updated_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+);
@@ -0,0 +1,47 @@
+# migrate.py
+"""
+Bring the MySQL schema up to date with database/migrations.
+
+    python migrate.py              # apply every pending migration
+    python migrate.py --status     # list applied / pending, change nothing
+    python migrate.py --to 3       # apply up to version 0003
+
+New databases: import database/schema.sql first, then run this.
+Uses the same ENV_MODE database as the app (MockJSONDB has no schema).
+"""
+import argparse
+import sys
+
+from core.create_database import db
+from core.infrastructure.migrations import MigrationError, MigrationRunner
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database migrations.")
+    parser.add_argument("--status", action="store_true", help="only list applied and pending migrations")
+    parser.add_argument("--to", type=int, default=None, help="apply up to this version")
+    args = parser.parse_args(argv)
+
+    try:
+        runner = MigrationRunner(db)
+        if args.status:
+            applied = runner.applied()
+            for migration in runner.discover():
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version:04d}_{migration.name}: {state}")
+            return 0
+
+        done = runner.migrate(target=args.to)
+    except MigrationError as err:
+        print(f"error: {err}", file=sys.stderr)
+        return 1
+
+    for migration in done:
+        print(f"applied {migration.version:04d}_{migration.name}")
+    if not done:
+        print("schema is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -45,5 +45,5 @@ class BuildingModel(ModelBase):
             raise ValueError("update_by_id() requires at least one field")
         return self.db.update(self.TABLE, filter=fields, where={"id": building_id})
 
-    def delete_build_by_id(self, building_id):
-        return self.db.delete(self.TABLE, {"id": building_id})
\ No newline at end of file
+    def delete_build_by_id(self, building_id, uow=None):
+        return self._writer(uow).delete(self.TABLE, {"id": building_id})
\ No newline at end of file
@@ -68,4 +68,9 @@ class ClassRoomsModel(ModelBase):
     def delete_room_by_id(self, classroom_id):
         return self.db.delete(self.TABLE,{"id": classroom_id})
 
+    def delete_by_ids(self, classroom_ids: List[int], uow=None) -> Optional[int]:
+        if not classroom_ids:
+            return 0
+        return self._writer(uow).delete(self.TABLE, {"id": list(classroom_ids)})
+
 
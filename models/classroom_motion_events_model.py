@@ -1,5 +1,6 @@
 # models/classroom_motion_events_model.py
 from __future__ import annotations
+from datetime import datetime
 from typing import Any, Dict, List, Optional
 from core.infrastructure.mysql import MySQL
 from core.model_base import ModelBase
@@ -22,9 +23,11 @@ class ClassroomMotionEventsModel(ModelBase):
 
     """
 
-    def __init__(self, db: MySQL) -> None:
+    def __init__(self, db: MySQL, write_buffer=None) -> None:
         super().__init__("classroom_motion_events")
         self.db = db
+        # optional WriteBehindBuffer: append()/append_many() queue instead of writing
+        self.write_buffer = write_buffer
 
     def create(self, data: Dict[str, Any]) -> int:
         if not data:
@@ -35,9 +38,122 @@ class ClassroomMotionEventsModel(ModelBase):
             raise RuntimeError("Insert succeeded but no lastrowid was returned")
         return int(new_id)
 
+    def create_many(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        return self.db.insert_many(self.TABLE, rows)
+
+    def append(self, data: Dict[str, Any]) -> Optional[int]:
+        """
+        Record one event: the new id when written synchronously,
+        None when it was queued in the write-behind buffer.
+        """
+        if self.write_buffer is None:
+            return self.create(data)
+
+        if not data:
+            raise ValueError("append() requires data")
+        self.write_buffer.put(data)
+        return None
+
+    def append_many(self, rows: List[Dict[str, Any]]) -> int:
+        if self.write_buffer is None:
+            return self.create_many(rows)
+        return self.write_buffer.put_many(rows)
+
     def get_by_id(self, event_id: int) -> Optional[Dict[str, Any]]:
         rows = self.db.select(self.TABLE, {"id": event_id})
         return rows[0] if rows else None
 
+    def list_active_classrooms(self, since: datetime, until: Optional[datetime] = None) -> Dict[int, datetime]:
+        """
+        {classroom_id: last event_time} for rooms with motion in [since, until].
+        Only the distinct ids leave the database, not the event rows.
+        """
+        return self.db.select_active_keys(self.TABLE, "classroom_id", "event_time", since, until)
+
+    def oldest_event_time(self, before: datetime) -> Optional[datetime]:
+        rows = self.db.select(
+            self.TABLE, {"event_time <": before}, order_by="event_time ASC", limit=1, columns=["event_time"]
+        )
+        return rows[0]["event_time"] if rows else None
+
+    def list_between(self, start: datetime, end: datetime, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Events with start <= event_time < end (an index range scan).
+        """
+        return self.db.select(
+            self.TABLE,
+            {"event_time >=": start, "event_time <": end},
+            order_by="event_time ASC",
+            columns=columns,
+        )
+
+    def list_after_id(self, last_id: int, *, limit: int = 10000, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Events stored after last_id, lowest id first (a primary key range
+        scan): what other writers added since a reader last looked.
+        """
+        return self.db.select(self.TABLE, {"id >": last_id}, order_by="id ASC", limit=limit, columns=columns)
+
+    def delete_by_ids(self, event_ids: List[int], chunk_size: int = 1000) -> int:
+        """
+        Delete in chunks of chunk_size ids, so no single statement holds
+        locks on a large range.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be > 0")
+        deleted = 0
+        for i in range(0, len(event_ids), chunk_size):
+            deleted += self.db.delete(self.TABLE, {"id": event_ids[i:i + chunk_size]})
+        return deleted
+
+    def delete_events_by_room_ids(self, classroom_ids: List[int], chunk_size: int = 1000) -> int:
+        """
+        Delete every event of classroom_ids, chunk_size events per
+        statement (ids first, then DELETE ... WHERE id IN), so each
+        statement is short and no single one locks the whole range.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be > 0")
+        if not classroom_ids:
+            return 0
+        self.discard_queued_by_room_ids(classroom_ids)
+
+        deleted = 0
+        while True:
+            rows = self.db.select(self.TABLE, {"classroom_id": list(classroom_ids)}, limit=chunk_size, columns=["id"])
+            if not rows:
+                return deleted
+            deleted += self.db.delete(self.TABLE, {"id": [r["id"] for r in rows]})
+            if len(rows) < chunk_size:
+                return deleted
+
+    def delete_by_room_ids(self, classroom_ids: List[int], uow=None) -> Optional[int]:
+        """
+        One IN-list DELETE for every event of classroom_ids. Meant for the
+        few rows left after delete_events_by_room_ids, inside a transaction.
+        With a unit of work the delete is queued there (returns None).
+        """
+        if not classroom_ids:
+            return 0
+        self.discard_queued_by_room_ids(classroom_ids)
+        return self._writer(uow).delete(self.TABLE, {"classroom_id": list(classroom_ids)})
+
+    def discard_queued_by_room_ids(self, classroom_ids: List[int]) -> int:
+        """
+        Drop write-behind events of classroom_ids that are not written yet.
+        Call it again once the rooms are gone: motion that arrived while
+        they were being deleted would otherwise be flushed against a
+        deleted classroom.
+        """
+        if self.write_buffer is None or not classroom_ids:
+            return 0
+        doomed = set(classroom_ids)
+        return self.write_buffer.discard_where(lambda row: row.get("classroom_id") in doomed)
+
     def delete_events_by_room_id(self, classroom_id):
+        if self.write_buffer is not None:
+            # queued events would otherwise be flushed after the room is gone
+            self.write_buffer.discard_where(lambda row: row.get("classroom_id") == classroom_id)
         return self.db.delete(self.TABLE,{"classroom_id": classroom_id})
\ No newline at end of file
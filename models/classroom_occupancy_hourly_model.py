@@ -0,0 +1,66 @@
+# models/classroom_occupancy_hourly_model.py
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from core.infrastructure.mysql import MySQL
+from core.model_base import ModelBase
+
+class ClassroomOccupancyHourlyModel(ModelBase):
+    """
+    Hourly per-room rollup of classroom_motion_events (see RetentionService).
+
++--------------+--------------+------+-----+---------+----------------+
+| Field        | Type         | Null | Key | Default | Extra          |
++--------------+--------------+------+-----+---------+----------------+
+| id           | bigint       | NO   | PRI | NULL    | auto_increment |
+| classroom_id | int          | NO   | MUL | NULL    |                |
+| hour_start   | datetime     | NO   | MUL | NULL    |                |
+| event_count  | int          | NO   |     | 0       |                |
+| busy_seconds | int          | NO   |     | 0       |                |
+| first_event  | datetime(3)  | YES  |     | NULL    |                |
+| last_event   | datetime(3)  | YES  |     | NULL    |                |
+| last_event_id| bigint       | YES  |     | NULL    |                |
++--------------+--------------+------+-----+---------+----------------+
+
+    busy_seconds: how long the room counted as BUSY inside the hour
+    (union of the activity windows of its events, clipped to the hour).
+    last_event_id: highest event id counted into the row (0: none, only
+    a window carried over; NULL: row predates the column).
+    """
+
+    def __init__(self, db: MySQL) -> None:
+        super().__init__("classroom_occupancy_hourly")
+        self.db = db
+
+    def create_many(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        return self.db.insert_many(self.TABLE, rows)
+
+    def update_by_id(self, row_id: int, fields: Dict[str, Any]) -> int:
+        if not fields:
+            raise ValueError("update_by_id() requires at least one field")
+        return self.db.update(self.TABLE, fields, {"id": row_id})
+
+    def list_for_hour(self, hour_start: datetime, classroom_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        where: Dict[str, Any] = {"hour_start": hour_start}
+        if classroom_ids is not None:
+            where["classroom_id"] = classroom_ids
+        return self.db.select(self.TABLE, where)
+
+    def list_by_room_id(self, classroom_id: int, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        where: Dict[str, Any] = {"classroom_id": classroom_id}
+        if since is not None:
+            where["hour_start >="] = since
+        return self.db.select(self.TABLE, where, order_by="hour_start ASC")
+
+    def list_since(self, since: datetime, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self.db.select(self.TABLE, {"hour_start >=": since}, columns=columns)
+
+    def delete_by_room_id(self, classroom_id):
+        return self.db.delete(self.TABLE, {"classroom_id": classroom_id})
+
+    def delete_by_room_ids(self, classroom_ids: List[int], uow=None) -> Optional[int]:
+        if not classroom_ids:
+            return 0
+        return self._writer(uow).delete(self.TABLE, {"classroom_id": list(classroom_ids)})
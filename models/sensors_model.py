@@ -22,11 +22,23 @@ class SensorsModel(ModelBase):
     Notes:
     - token should be UNIQUE (recommended).
     - room_id should reference classrooms(id).
+
+    Credential lookups (get_by_privateKey) can be served from:
+    - credential_cache: TTLCache of key -> sensor, including "not found"
+    - key_filter: RefreshingBloomFilter of valid keys, so unknown keys
+      are rejected without touching the database
+    Every write below invalidates the affected entries once it has
+    reached the database (after the commit when queued on a unit of
+    work), so a read in between cannot cache a row that is going away.
+    The cache is per process: other workers keep their positive entries
+    for up to its ttl (SENSOR_CACHE_TTL).
     """
 
-    def __init__(self, db: MySQL) -> None:
+    def __init__(self, db: MySQL, credential_cache=None, key_filter=None) -> None:
         super().__init__("sensors")
         self.db = db
+        self.credential_cache = credential_cache
+        self.key_filter = key_filter
 
     # ---------- Create ----------
     def create(self, data: Dict[str, Any]) -> int:
@@ -36,6 +48,13 @@ class SensorsModel(ModelBase):
         new_id = self.db.insert(self.TABLE, data)
         if new_id is None:
             raise RuntimeError("Insert succeeded but no lastrowid was returned")
+
+        private_key = data.get("private_key")
+        if private_key:
+            if self.credential_cache is not None:
+                self.credential_cache.invalidate(private_key)
+            if self.key_filter is not None:
+                self.key_filter.add(private_key)
         return int(new_id)
 
     # ---------- Read ----------
@@ -46,8 +65,67 @@ class SensorsModel(ModelBase):
     def get_by_privateKey(self, private_key: str) -> Optional[Dict[str, Any]]:
         if not private_key:
             raise ValueError("get_by_privateKey() requires private_key")
+
+        if self.credential_cache is not None:
+            hit, sensor = self.credential_cache.get(private_key)
+            if hit:
+                return dict(sensor) if sensor else None
+
+        if self.key_filter is not None and not self.key_filter.might_contain(private_key):
+            if self.credential_cache is not None:
+                self.credential_cache.set_missing(private_key)
+            return None
+
         rows = self.db.select(self.TABLE, {"private_key": private_key})
-        return rows[0] if rows else None
+        sensor = rows[0] if rows else None
+
+        if self.credential_cache is not None:
+            if sensor:
+                self.credential_cache.set(private_key, dict(sensor))
+            else:
+                self.credential_cache.set_missing(private_key)
+        return sensor
+
+    def list_private_keys(self) -> List[str]:
+        rows = self.db.select(self.TABLE, {}, columns=["private_key"])
+        return [row["private_key"] for row in rows if row.get("private_key")]
+
+    def get_by_privateKeys(self, private_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve many keys in one query: {private_key: sensor}.
+        Unknown keys are simply missing from the result.
+        """
+        keys = list({k for k in private_keys if k})
+        if not keys:
+            return {}
+
+        found: Dict[str, Dict[str, Any]] = {}
+        missing = keys
+        if self.credential_cache is not None:
+            missing = []
+            for key in keys:
+                hit, sensor = self.credential_cache.get(key)
+                if not hit:
+                    missing.append(key)
+                elif sensor:
+                    found[key] = dict(sensor)
+
+        if self.key_filter is not None:
+            missing = [k for k in missing if self.key_filter.might_contain(k)]
+
+        if missing:
+            rows = self.db.select(self.TABLE, {"private_key": missing}, limit=None)
+            for row in rows:
+                found[row["private_key"]] = row
+
+            if self.credential_cache is not None:
+                for key in missing:
+                    if key in found:
+                        self.credential_cache.set(key, dict(found[key]))
+                    else:
+                        self.credential_cache.set_missing(key)
+
+        return found
 
     def list_by_room_id(self, room_id: int) -> List[Dict[str, Any]]:
         return self.db.select(self.TABLE, {"room_id": room_id}) or []
@@ -64,21 +142,55 @@ class SensorsModel(ModelBase):
         if "public_key" in fields and not fields["public_key"]:
             raise ValueError("update_by_id() cannot set empty 'public_key'")
 
-        return self.db.update(self.TABLE, filter=fields, where={"id": sensor_id})
+        updated = self.db.update(self.TABLE, filter=fields, where={"id": sensor_id})
+        self._forget_cached(lambda s: str(s.get("id")) == str(sensor_id))
+        return updated
 
     def update_room_by_token(self, token: str, room_id: int) -> int:
         if not token:
             raise ValueError("update_room_by_token() requires token")
-        return self.db.update(self.TABLE, filter={"room_id": room_id}, where={"token": token})
+        updated = self.db.update(self.TABLE, filter={"room_id": room_id}, where={"token": token})
+        self._forget_key(token)
+        return updated
 
     # ---------- Delete ----------
     def delete_by_id(self, sensor_id: int) -> int:
-        return self.db.delete(self.TABLE, {"id": sensor_id})
+        deleted = self.db.delete(self.TABLE, {"id": sensor_id})
+        self._forget_cached(lambda s: str(s.get("id")) == str(sensor_id))
+        return deleted
 
     def delete_by_token(self, token: str) -> int:
         if not token:
             raise ValueError("delete_by_token() requires token")
-        return self.db.delete(self.TABLE, {"token": token})
+        deleted = self.db.delete(self.TABLE, {"token": token})
+        self._forget_key(token)
+        return deleted
 
     def delete_sensor_by_room_id(self, classroom_id):
-        return self.db.delete(self.TABLE,{"room_id": classroom_id})
\ No newline at end of file
+        deleted = self.db.delete(self.TABLE,{"room_id": classroom_id})
+        self._forget_cached(lambda s: str(s.get("room_id")) == str(classroom_id))
+        return deleted
+
+    def delete_by_room_ids(self, classroom_ids: List[int], uow=None) -> Optional[int]:
+        # one IN-list DELETE for every room; queued on uow when given
+        if not classroom_ids:
+            return 0
+        doomed = {str(i) for i in classroom_ids}
+        deleted = self._writer(uow).delete(self.TABLE, {"room_id": list(classroom_ids)})
+        forget = lambda: self._forget_cached(lambda s: str(s.get("room_id")) in doomed)
+        if uow is not None:
+            # the DELETE only runs at commit; forgetting now would let a
+            # read in between cache the doomed sensors again
+            uow.after_commit(forget)
+        else:
+            forget()
+        return deleted
+
+    # ---------- Cache invalidation ----------
+    def _forget_key(self, private_key: str) -> None:
+        if self.credential_cache is not None:
+            self.credential_cache.invalidate(private_key)
+
+    def _forget_cached(self, predicate) -> None:
+        if self.credential_cache is not None:
+            self.credential_cache.invalidate_where(predicate)
\ No newline at end of file
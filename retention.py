@@ -0,0 +1,38 @@
+# retention.py
+"""
+Roll classroom_motion_events older than the retention horizon into
+classroom_occupancy_hourly, then delete them.
+
+    python retention.py                     # RETENTION_DAYS from .env
+    python retention.py --days 7 --max-hours 48 --chunk-size 500
+
+Safe to run from cron; runs that overlap an unfinished one just repeat
+the deletes. Uses the same ENV_MODE database as the app.
+"""
+import argparse
+
+from container import AppContainer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll up and delete old motion events.")
+    parser.add_argument("--days", type=float, default=None, help="keep raw events this many days (default: RETENTION_DAYS)")
+    parser.add_argument("--max-hours", type=int, default=None, help="process at most this many hours in this run")
+    parser.add_argument("--chunk-size", type=int, default=None, help="ids per DELETE statement (default: RETENTION_DELETE_CHUNK)")
+    args = parser.parse_args(argv)
+
+    retention = AppContainer().retention_service
+    if args.days is not None:
+        retention.retention_days = args.days
+    if args.chunk_size is not None:
+        retention.delete_chunk_size = args.chunk_size
+
+    stats = retention.run_once(max_hours=args.max_hours)
+    print(
+        f"horizon {retention.horizon().isoformat()}: "
+        f"{stats['hours']} hours, {stats['rollup_rows']} rollup rows, {stats['events_deleted']} events deleted"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# services/availability_stream.py
+from __future__ import annotations
+
+import json
+import queue
+import threading
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+
+class _Client:
+    def __init__(self, max_queue: int) -> None:
+        self.queue: "queue.Queue[str]" = queue.Queue(max_queue)
+
+
+class AvailabilityStream:
+    """
+    Pushes room availability transitions to Server-Sent Events clients.
+
+    - stream() yields a compact snapshot first, then one "transition" event
+      per available<->busy change, and a keepalive comment when idle
+    - transitions come from OccupancyEngine.subscribe(): the engine only
+      appends them to a pending list; a dispatcher thread formats each
+      event once and hands the same string to every client queue
+    - while clients are connected the dispatcher also wakes up when the
+      next activity window runs out (and at least every heartbeat), so
+      rooms turn available without anyone loading a page
+    - a client whose queue is full (slow reader) gets a fresh snapshot
+      instead of the missed events
+    - serving many open streams needs a threaded/async worker class, each
+      stream holds its connection
+
+    Clients should apply transitions idempotently: a transition may also be
+    reflected in the snapshot sent right before it.
+    """
+
+    RESYNC = "__resync__"
+
+    def __init__(
+        self,
+        rooms_service,
+        occupancy_engine,
+        *,
+        heartbeat_seconds: float = 15.0,
+        client_queue_size: int = 256,
+    ) -> None:
+        self.rooms_service = rooms_service
+        self.occupancy_engine = occupancy_engine
+        self.heartbeat_seconds = heartbeat_seconds
+        self.client_queue_size = client_queue_size
+
+        self._cond = threading.Condition()
+        self._pending: Deque[Tuple[int, str, int]] = deque()
+        self._clients: Set[_Client] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        self._room_buildings: Dict[int, Any] = {}
+        self._room_buildings_key = None
+
+        occupancy_engine.subscribe(self._on_transition)
+
+    # -----------------------------
+    # CLIENTS
+    # -----------------------------
+
+    def stream(self) -> Iterator[str]:
+        # load the engine first, so its initial load is not replayed as transitions
+        self.rooms_service.availability_version()
+        client = self._subscribe()
+        try:
+            yield self._event("snapshot", self.snapshot())
+            while True:
+                try:
+                    message = client.queue.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if message == self.RESYNC:
+                    yield self._event("snapshot", self.snapshot())
+                else:
+                    yield message
+        finally:
+            self._unsubscribe(client)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        {"version", "available": [room ids], "buildings": {building id: available rooms}}
+        """
+        version = self.occupancy_engine.version
+        available = sorted(self.rooms_service.getAvailableRoomIds())
+        buildings = Counter(self._room_building_map().get(rid) for rid in available)
+        buildings.pop(None, None)
+        return {
+            "version": version,
+            "available": available,
+            "buildings": {str(bid): count for bid, count in buildings.items()},
+        }
+
+    def client_count(self) -> int:
+        with self._cond:
+            return len(self._clients)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _subscribe(self) -> _Client:
+        client = _Client(self.client_queue_size)
+        with self._cond:
+            self._clients.add(client)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="availability-stream", daemon=True)
+                self._thread.start()
+        return client
+
+    def _unsubscribe(self, client: _Client) -> None:
+        with self._cond:
+            self._clients.discard(client)
+            self._cond.notify_all()
+
+    # -----------------------------
+    # DISPATCH
+    # -----------------------------
+
+    def _on_transition(self, room_id: int, status: str, version: int) -> None:
+        # engine lock is held: only queue it
+        with self._cond:
+            if not self._clients:
+                return
+            self._pending.append((room_id, status, version))
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            # ask the engine before taking _cond: the engine calls
+            # _on_transition with its own lock held
+            timeout = self._seconds_until_next_change()
+            with self._cond:
+                if not self._pending and not self._closed and self._clients:
+                    self._cond.wait(timeout)
+                if self._closed or not self._clients:
+                    self._pending.clear()
+                    self._thread = None
+                    return
+                batch = list(self._pending)
+                self._pending.clear()
+
+            try:
+                if batch:
+                    self._fan_out(batch)
+                else:
+                    # retire expired rooms / resync; transitions come back via _on_transition
+                    self.rooms_service.availability_version()
+            except Exception:
+                # keep serving; the next wake-up retries
+                pass
+
+    def _fan_out(self, batch: List[Tuple[int, str, int]]) -> None:
+        buildings = self._room_building_map()
+        messages = [
+            self._event(
+                "transition",
+                {"room_id": rid, "building_id": buildings.get(rid), "status": status, "version": version},
+                event_id=version,
+            )
+            for rid, status, version in batch
+        ]
+
+        with self._cond:
+            clients = list(self._clients)
+
+        for client in clients:
+            for message in messages:
+                try:
+                    client.queue.put_nowait(message)
+                except queue.Full:
+                    self._resync(client)
+                    break
+
+    def _resync(self, client: _Client) -> None:
+        while True:
+            try:
+                client.queue.get_nowait()
+            except queue.Empty:
+                break
+        client.queue.put_nowait(self.RESYNC)
+
+    def _seconds_until_next_change(self) -> float:
+        next_expiry = self.occupancy_engine.next_expiry()
+        if next_expiry is None:
+            return self.heartbeat_seconds
+        seconds = (next_expiry - self.occupancy_engine.utcnow_fn()).total_seconds()
+        # expiry is strict (busy until the window has fully passed)
+        return min(max(seconds, 0) + 0.05, self.heartbeat_seconds)
+
+    def _room_building_map(self) -> Dict[int, Any]:
+        rooms_model = self.rooms_service.rooms_model
+        db = self.rooms_service.db
+        key = db.table_generation(rooms_model.TABLE) if db else None
+        if key is None or key != self._room_buildings_key:
+            rows = rooms_model.filter(columns=["id", "id_building"], limit=None)
+            mapping = {}
+            for r in rows:
+                rid = self.rooms_service._to_int(r.get("id"))
+                if rid is not None:
+                    mapping[rid] = r.get("id_building")
+            self._room_buildings = mapping
+            self._room_buildings_key = key
+        return self._room_buildings
+
+    def _event(self, name: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+        head = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{head}event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
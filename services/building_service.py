@@ -1,5 +1,6 @@
 # services/building_service.py
 from __future__ import annotations
+from core.request_memo import freeze, memoize
 
 class BuildingService:
     """
@@ -65,8 +66,7 @@ class BuildingService:
         if not ids:
             return []
 
-        all_buildings = self.building_model.filter()
-        return [b for b in all_buildings if self._to_int(b.get("id")) in ids]
+        return self.building_model.filter({"id": ids}, limit=None)
 
     def _attach_rooms_to_buildings(self, buildings, rooms, include_availability, available_ids):
         rooms_by_building = self._group_rooms_by_building(rooms)
@@ -90,27 +90,49 @@ class BuildingService:
             include_availability = building_ids
             building_ids = None
 
+        # home cards + "available now" ask for the same tree: build it once per request
+        key = (
+            "buildings_with_rooms",
+            id(self),
+            freeze(building_ids),
+            include_availability,
+            self.db.write_generation if self.db else 0,
+        )
+        return memoize(key, lambda: self._build_buildings_with_rooms(building_ids, include_availability))
+
+    def _build_buildings_with_rooms(self, building_ids, include_availability):
         if building_ids is None:
             buildings = self.building_model.filter()
         else:
             buildings = self.get_buildings_by_ids(building_ids)
 
-        rooms = self.classrooms_model.filter()
+        rooms = self.classrooms_model.filter(limit=None)
         available_ids = self.rooms_service.getAvailableRoomIds() if include_availability else []
 
         return self._attach_rooms_to_buildings(buildings, rooms, include_availability, available_ids)
 
     def delete_building_by_id(self, building_id):
+        """
+        The building and everything in it: room events are purged in
+        chunks first, outside the transaction, then rooms, sensors, rollups
+        and the building are queued on one unit of work and go in one
+        transaction (see RoomsService.delete_rooms_by_ids).
+        """
         check_building = self.building_model.get_by_id(building_id)
         if check_building == None:
             return False
-        else:
-            rooms =self.classrooms_model.filter({"id_building": building_id})
-            for room in rooms:
-                self.rooms_service.delete_room_by_id(room['id'])
 
-            self.building_model.delete_build_by_id(building_id)
-            return True
+        rooms = self.classrooms_model.filter({"id_building": building_id}, limit=None, columns=["id"])
+        room_ids = [room["id"] for room in rooms]
+        if room_ids:
+            self.rooms_service.purge_room_events(room_ids)
+
+        with self.db.unit_of_work() as uow:
+            if room_ids:
+                self.rooms_service.delete_purged_rooms(room_ids, uow)
+            self.building_model.delete_build_by_id(building_id, uow=uow)
+        self.rooms_service.forget_rooms(room_ids)
+        return True
 
 
 
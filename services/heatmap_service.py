@@ -0,0 +1,314 @@
+# services/heatmap_service.py
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+SLOTS = 7 * 24
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+class HeatmapService:
+    """
+    Weekly occupancy heatmap: a 7x24 matrix per room (rows Monday..Sunday,
+    columns hours), each cell the share of that weekday-hour in the last
+    `weeks` weeks in which the room had motion.
+
+    - the first load reads the whole window at once into NumPy arrays (room
+      ids, hour numbers) and bins them with np.unique / np.add.at, no
+      per-row Python loop
+    - hours already rolled up by RetentionService come from
+      classroom_occupancy_hourly, so history survives event deletion
+    - record()/record_many() add new motion incrementally: one counter per
+      newly seen (room, hour), nothing is re-read
+    - after that nothing is reloaded whole: every resync_seconds only the
+      events stored since the last load (other workers' motion) are read,
+      and at local midnight the expired day is subtracted from the counters
+    - ids are not committed in order (concurrent transactions, other
+      workers' write-behind batches), so each resync starts
+      resync_overlap_ids below the highest id seen: an event with a lower
+      id that committed after the last resync is still picked up
+    - the (room, hour) pairs already counted are kept per hour bucket (at
+      most one entry per room) and a bucket is dropped when its hour
+      leaves the window
+    - utc_offset_minutes shifts the stored UTC event times to campus time
+    """
+
+    def __init__(
+        self,
+        motion_events_model=None,
+        occupancy_hourly_model=None,
+        rooms_model=None,
+        *,
+        weeks: int = 8,
+        utc_offset_minutes: int = 0,
+        resync_seconds: Optional[float] = 300,
+        resync_page_size: int = 10000,
+        resync_overlap_ids: int = 1000,
+        utcnow_fn: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.motion_events_model = motion_events_model
+        self.occupancy_hourly_model = occupancy_hourly_model
+        self.rooms_model = rooms_model
+
+        self.weeks = int(weeks)
+        self.utc_offset = timedelta(minutes=utc_offset_minutes)
+        self.resync_seconds = resync_seconds
+        self.resync_page_size = resync_page_size
+        self.resync_overlap_ids = resync_overlap_ids
+        self.utcnow_fn = utcnow_fn
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+        # row per room in _counts (rows of forgotten rooms are reused);
+        # _seen: local hour number -> rooms counted
+        self._rows: Dict[int, int] = {}
+        self._free_rows: List[int] = []
+        self._counts = np.zeros((0, SLOTS), dtype=np.int32)
+        self._seen: Dict[int, Set[int]] = {}
+        self._window_start: Optional[datetime] = None
+        self._loaded_at: Optional[datetime] = None
+        self._last_event_id = 0
+
+    # -----------------------------
+    # READS
+    # -----------------------------
+
+    def room_heatmap(self, room_id: int) -> Dict[str, Any]:
+        self.ensure_fresh()
+        with self._lock:
+            row = self._rows.get(int(room_id))
+            counts = self._counts[row].copy() if row is not None else np.zeros(SLOTS, dtype=np.int32)
+            window_start = self._window_start
+        return self._payload(counts[np.newaxis, :], window_start, room_id=int(room_id))
+
+    def building_heatmap(self, building_id: int) -> Dict[str, Any]:
+        """
+        Mean of the building's rooms (a cell of 0.5: half the rooms, or
+        every room half of the weeks).
+        """
+        room_ids = [int(r["id"]) for r in self.rooms_model.list_by_building(building_id) if r.get("id") is not None]
+
+        self.ensure_fresh()
+        with self._lock:
+            rows = [self._rows[rid] for rid in room_ids if rid in self._rows]
+            counts = self._counts[rows]
+            window_start = self._window_start
+
+        # rooms without any motion still count (as zeros)
+        missing = len(room_ids) - len(rows)
+        if missing:
+            counts = np.vstack([counts, np.zeros((missing, SLOTS), dtype=np.int32)])
+        return self._payload(counts, window_start, building_id=int(building_id), rooms=len(room_ids))
+
+    # -----------------------------
+    # WRITES
+    # -----------------------------
+
+    def record(self, room_id: int, event_time: datetime) -> None:
+        self.record_many([room_id], [event_time])
+
+    def record_many(self, room_ids: Iterable[int], event_times: Iterable[Any]) -> None:
+        if self._loaded_at is None:
+            return  # the first load reads them from the database
+
+        rooms = np.asarray(list(room_ids), dtype=np.int64)
+        if rooms.size == 0:
+            return
+        hours = self._local_hours(list(event_times))
+
+        with self._lock:
+            start = self._hour_number(self._window_start)
+            keep = hours >= start
+            self._add(rooms[keep], hours[keep])
+
+    def forget_room(self, room_id: int) -> None:
+        with self._lock:
+            row = self._rows.pop(int(room_id), None)
+            if row is not None:
+                self._counts[row] = 0
+                self._free_rows.append(row)
+            for rooms in self._seen.values():
+                rooms.discard(int(room_id))
+
+    # -----------------------------
+    # LOADING
+    # -----------------------------
+
+    def ensure_fresh(self) -> None:
+        # single-flight like OccupancyEngine: only the first load blocks readers
+        if not self._is_stale():
+            return
+        first_load = self._loaded_at is None
+        if not self._load_lock.acquire(blocking=first_load):
+            return
+        try:
+            if self._loaded_at is None:
+                self.rebuild()
+            elif self._is_stale():
+                self.refresh()
+        finally:
+            self._load_lock.release()
+
+    def rebuild(self) -> None:
+        """Full load of the window (first use)."""
+        now = self.utcnow_fn()
+        window_start = self._current_window_start(now)
+        since = window_start - self.utc_offset  # back to UTC for the queries
+
+        events = self.motion_events_model.list_between(
+            since, now + timedelta(days=1), columns=["id", "classroom_id", "event_time"]
+        )
+        rooms, hours, last_id = self._event_arrays(events)
+
+        if self.occupancy_hourly_model is not None:
+            rollups = [r for r in self.occupancy_hourly_model.list_since(since) if int(r.get("event_count") or 0) > 0]
+            rooms = np.concatenate([rooms, np.fromiter((int(r["classroom_id"]) for r in rollups), dtype=np.int64, count=len(rollups))])
+            hours = np.concatenate([hours, self._local_hours([r["hour_start"] for r in rollups])])
+
+        keep = hours >= self._hour_number(window_start)
+        rooms, hours = rooms[keep], hours[keep]
+
+        with self._lock:
+            self._rows = {}
+            self._free_rows = []
+            self._counts = np.zeros((0, SLOTS), dtype=np.int32)
+            self._seen = {}
+            self._window_start = window_start
+            self._add(rooms, hours)
+            self._last_event_id = last_id
+            self._loaded_at = now
+
+    def refresh(self) -> None:
+        """
+        Slide the window to today and add the events stored since the
+        last load, a page of resync_page_size ids at a time. The last
+        resync_overlap_ids ids are read again; hours already counted are
+        skipped (see _add).
+        """
+        now = self.utcnow_fn()
+        window_start = self._current_window_start(now)
+
+        last_id = max(self._last_event_id - self.resync_overlap_ids, 0)
+        batches = []
+        while True:
+            events = self.motion_events_model.list_after_id(
+                last_id, limit=self.resync_page_size, columns=["id", "classroom_id", "event_time"]
+            )
+            if not events:
+                break
+            rooms, hours, last_id = self._event_arrays(events, last_id)
+            batches.append((rooms, hours))
+            if len(events) < self.resync_page_size:
+                break
+
+        with self._lock:
+            if window_start != self._window_start:
+                self._expire_before(window_start)
+            start = self._hour_number(window_start)
+            for rooms, hours in batches:
+                keep = hours >= start
+                self._add(rooms[keep], hours[keep])
+            self._last_event_id = max(self._last_event_id, last_id)
+            self._loaded_at = now
+
+    # -----------------------------
+    # INTERNAL
+    # -----------------------------
+
+    def _event_arrays(self, events: List[Dict[str, Any]], last_id: int = 0) -> Tuple[np.ndarray, np.ndarray, int]:
+        rooms = np.fromiter((int(e["classroom_id"]) for e in events), dtype=np.int64, count=len(events))
+        hours = self._local_hours([e["event_time"] for e in events])
+        last_id = max([last_id] + [int(e["id"]) for e in events if e.get("id") is not None])
+        return rooms, hours, last_id
+
+    def _expire_before(self, window_start: datetime) -> None:
+        # lock held: take the hours that left the window out of the counters
+        start = self._hour_number(window_start)
+        for hour in [h for h in self._seen if h < start]:
+            rows = [self._rows[r] for r in self._seen.pop(hour) if r in self._rows]
+            if rows:
+                self._counts[rows, int(self._slots(np.int64(hour)))] -= 1
+        self._window_start = window_start
+
+    def _is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        now = self.utcnow_fn()
+        if self._current_window_start(now) != self._window_start:
+            return True
+        if self.resync_seconds is None:
+            return False
+        return (now - self._loaded_at).total_seconds() >= self.resync_seconds
+
+    def _current_window_start(self, now: datetime) -> datetime:
+        today = (now + self.utc_offset).replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=7 * self.weeks)
+
+    def _local_hours(self, times: List[Any]) -> np.ndarray:
+        # datetimes or ISO strings -> hours since the epoch, campus time
+        if not times:
+            return np.zeros(0, dtype=np.int64)
+        stamps = np.array(times, dtype="datetime64[s]")
+        offset = int(self.utc_offset.total_seconds())
+        return (stamps.astype(np.int64) + offset) // 3600
+
+    def _hour_number(self, value: datetime) -> int:
+        return int(np.datetime64(value, "s").astype(np.int64) // 3600)
+
+    def _add(self, rooms: np.ndarray, hours: np.ndarray) -> None:
+        # lock held; counts each (room, hour) once
+        if rooms.size == 0:
+            return
+        keys = np.unique((rooms << 32) | hours)
+        key_rooms = keys >> 32
+        key_hours = keys & 0xFFFFFFFF
+
+        if self._seen:
+            # incremental batches are small: a set lookup per distinct key
+            fresh = np.fromiter(
+                (r not in self._seen.get(h, ()) for r, h in zip(key_rooms.tolist(), key_hours.tolist())),
+                dtype=bool,
+                count=keys.size,
+            )
+            key_rooms, key_hours = key_rooms[fresh], key_hours[fresh]
+            if key_rooms.size == 0:
+                return
+        for r, h in zip(key_rooms.tolist(), key_hours.tolist()):
+            self._seen.setdefault(h, set()).add(r)
+
+        new_rooms = [int(r) for r in np.unique(key_rooms) if int(r) not in self._rows]
+        while new_rooms and self._free_rows:
+            self._rows[new_rooms.pop()] = self._free_rows.pop()  # zeroed by forget_room
+        if new_rooms:
+            base = self._counts.shape[0]
+            self._rows.update({rid: base + i for i, rid in enumerate(new_rooms)})
+            self._counts = np.vstack([self._counts, np.zeros((len(new_rooms), SLOTS), dtype=np.int32)])
+
+        row_of = np.vectorize(self._rows.__getitem__, otypes=[np.int64])
+        np.add.at(self._counts, (row_of(key_rooms), self._slots(key_hours)), 1)
+
+    def _slots(self, hours: np.ndarray) -> np.ndarray:
+        # 1970-01-01 was a Thursday (weekday 3)
+        days = hours // 24
+        return ((days + 3) % 7) * 24 + hours % 24
+
+    def _payload(self, counts: np.ndarray, window_start: datetime, **head: Any) -> Dict[str, Any]:
+        # how often each weekday-hour occurred in the window so far
+        first = self._hour_number(window_start)
+        last = int(self._local_hours([self.utcnow_fn()])[0])
+        occurrences = np.bincount(self._slots(np.arange(first, last + 1)), minlength=SLOTS)
+
+        mean = counts.mean(axis=0) if counts.shape[0] else np.zeros(SLOTS)
+        share = np.divide(mean, occurrences, out=np.zeros(SLOTS), where=occurrences > 0)
+        return {
+            **head,
+            "weeks": self.weeks,
+            "since": window_start.date().isoformat(),
+            "days": DAYS,
+            "matrix": np.round(share, 3).reshape(7, 24).tolist(),
+        }
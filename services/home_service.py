@@ -1,5 +1,8 @@
 # services/home_service.py
 from __future__ import annotations
+import threading
+import time
+from datetime import datetime
 
 class HomeService:
     """
@@ -10,15 +13,29 @@ class HomeService:
       - buildings cards
       - recent spaces
       - available now
+    - Keep them materialized (get_home_snapshot()): the DTOs are rebuilt
+      only when buildings/rooms are written, room availability changes
+      (motion, or an activity window running out), or snapshot_max_age
+      seconds passed (catches writes made by other worker processes).
+      Motion on an already busy room does not rebuild, so recent spaces
+      may lag by up to snapshot_max_age.
     """
 
-    def __init__(self, db_instance=None, building_service=None, rooms_service=None ,building_model = None ,class_room_model = None ,class_room_motion_events_model = None):
+    # writes to these tables invalidate the home snapshot
+    CATALOG_TABLES = ("buildings", "classrooms")
+
+    def __init__(self, db_instance=None, building_service=None, rooms_service=None ,building_model = None ,class_room_model = None ,class_room_motion_events_model = None, snapshot_max_age=30):
         self.db = db_instance
         self.building_service = building_service
         self.rooms_service = rooms_service
         self.building_model = building_model
         self.class_room_model = class_room_model
         self.class_room_motion_events_model =class_room_motion_events_model
+
+        self.snapshot_max_age = snapshot_max_age
+        self.utcnow_fn = datetime.utcnow
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
     # -------------------------
     # helpers
     # -------------------------
@@ -35,6 +52,61 @@ class HomeService:
         bid = b.get("id")
         return b.get("building_name") or b.get("name") or (f"Building {bid}" if bid is not None else "Unknown")
 
+    # -------------------------
+    # materialized snapshot
+    # -------------------------
+
+    def get_home_snapshot(self, recent_limit=10, available_limit=6):
+        """
+        {"buildings", "recentSpaces", "availableNow"} for the home page.
+        The same dict is shared by every request until it is rebuilt:
+        treat it as read-only.
+        """
+        token = self._snapshot_token(recent_limit, available_limit)
+        snapshot = self._snapshot
+        if self._snapshot_is_valid(snapshot, token):
+            return snapshot["data"]
+
+        # single-flight: one thread rebuilds, the others reuse its result
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if self._snapshot_is_valid(snapshot, token):
+                return snapshot["data"]
+
+            valid_until = None
+            if self.rooms_service is not None:
+                valid_until = self.rooms_service.next_availability_change()
+
+            data = {
+                "buildings": self.getHomeBuildingsCards(),
+                "recentSpaces": self.getHomeRecentSpaces(limit=recent_limit),
+                "availableNow": self.getHomeAvailableNow(limit=available_limit),
+            }
+            # token was taken before the build: a write during it forces a rebuild
+            self._snapshot = {
+                "token": token,
+                "built_at": time.monotonic(),
+                "valid_until": valid_until,
+                "data": data,
+            }
+            return data
+
+    def invalidate_home_snapshot(self):
+        self._snapshot = None
+
+    def _snapshot_token(self, recent_limit, available_limit):
+        catalog = self.db.table_generation(*self.CATALOG_TABLES) if self.db else 0
+        availability = self.rooms_service.availability_version() if self.rooms_service else None
+        return (recent_limit, available_limit, catalog, availability)
+
+    def _snapshot_is_valid(self, snapshot, token):
+        if snapshot is None or snapshot["token"] != token:
+            return False
+        if self.snapshot_max_age is not None and time.monotonic() - snapshot["built_at"] >= self.snapshot_max_age:
+            return False
+        valid_until = snapshot["valid_until"]
+        return valid_until is None or self.utcnow_fn() < valid_until
+
     # -------------------------
     # DTOs for /home
     # -------------------------
@@ -72,11 +144,16 @@ class HomeService:
 
         batch_limit = max(20, limit_int * 10)
 
-        events = self.class_room_motion_events_model.filter(order_by="event_time DESC", limit=batch_limit)
+        events = self.class_room_motion_events_model.filter(
+            order_by="event_time DESC", limit=batch_limit, columns=["classroom_id", "event_time"]
+        )
+
+        # Lookups: only the rooms/buildings referenced by those events
+        room_ids = list({cid for cid in (self._to_int(e.get("classroom_id")) for e in events) if cid is not None})
+        rooms = self.class_room_model.filter({"id": room_ids}, limit=None) if room_ids else []
 
-        # Lookups
-        rooms = self.class_room_model.filter()
-        buildings = self.building_model.filter()
+        building_ids = list({bid for bid in (self._to_int(r.get("id_building")) for r in rooms) if bid is not None})
+        buildings = self.building_model.filter({"id": building_ids}, limit=None) if building_ids else []
 
         rooms_by_id = {}
         for r in rooms:
@@ -149,6 +226,7 @@ class HomeService:
 
                 available.append(
                     {
+                        "id": r.get("id"),
                         "name": f"כיתה {class_number}",
                         "building": b_name,
                         "floor": floor_int,
@@ -0,0 +1,261 @@
+# services/occupancy_engine.py
+from __future__ import annotations
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+class OccupancyEngine:
+    """
+    Long-lived, in-memory occupancy state (one instance per process).
+
+    Rule (same as RoomsService):
+    - Room is BUSY if its last motion is within activity_seconds.
+    - Otherwise it's AVAILABLE.
+
+    How it stays cheap:
+    - last_seen: {room_id: datetime of last motion}
+    - a min-heap of (expires_at, room_id), one entry per busy room,
+      retires rooms back to AVAILABLE lazily on read
+    - the set of available ids is a frozen snapshot that is rebuilt only
+      when a room changes state, so reads are O(1) when nothing expired
+    - version is bumped whenever that set changes, so callers can cache
+      anything derived from availability (see HomeService)
+    - subscribe() listeners hear every transition (see AvailabilityStream)
+
+    Notes:
+    - Every worker process has its own engine, so state is re-synced from the
+      database every resync_seconds (see ensure_fresh()).
+    """
+
+    def __init__(
+        self,
+        activity_seconds: int,
+        *,
+        resync_seconds: Optional[int] = 30,
+        utcnow_fn: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.activity_seconds = int(activity_seconds)
+        self.resync_seconds = resync_seconds
+        self.utcnow_fn = utcnow_fn
+
+        self._window = timedelta(seconds=self.activity_seconds)
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+
+        self._rooms: set = set()
+        self._last_seen: Dict[int, datetime] = {}
+        self._busy: set = set()
+        self._heap: List[Tuple[datetime, int]] = []
+        self._available: FrozenSet[int] = frozenset()
+        self.version = 0
+        self._listeners: List[Callable[[int, str, int], None]] = []
+        self._loaded_at: Optional[datetime] = None
+
+    # -----------------------------
+    # LOADING
+    # -----------------------------
+
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        if self.resync_seconds is None:
+            return False
+        age = (self.utcnow_fn() - self._loaded_at).total_seconds()
+        return age >= self.resync_seconds
+
+    def ensure_fresh(self, loader: Callable[[], Tuple[Iterable[int], Dict[int, datetime]]]) -> None:
+        """
+        (Re)load state through loader() -> (room_ids, {room_id: last_motion}).
+
+        - first load blocks every caller until it is done
+        - later re-syncs are single-flight: other threads keep reading the
+          current snapshot instead of waiting
+        """
+        if not self.is_stale():
+            return
+
+        first_load = not self.is_loaded()
+        if not self._load_lock.acquire(blocking=first_load):
+            return
+        try:
+            if not self.is_stale():
+                return
+            room_ids, last_seen = loader()
+            self.load(room_ids, last_seen)
+        finally:
+            self._load_lock.release()
+
+    def load(self, room_ids: Iterable[int], last_seen: Dict[int, datetime]) -> None:
+        """
+        Replace the known rooms and merge last-motion times.
+        Merging (max per room) keeps motion recorded while the loader ran.
+        """
+        with self._lock:
+            self._rooms = set(int(r) for r in room_ids)
+
+            now = self.utcnow_fn()
+            merged: Dict[int, datetime] = {}
+            for rid in self._rooms:
+                current = self._last_seen.get(rid)
+                loaded = last_seen.get(rid)
+                if loaded is not None and loaded > now:
+                    loaded = None  # stored from a fast clock: would hide later motion
+                if current is None or (loaded is not None and loaded > current):
+                    current = loaded
+                if current is not None:
+                    merged[rid] = current
+            self._last_seen = merged
+
+            self._busy = set()
+            self._heap = []
+            for rid, seen in merged.items():
+                if self._is_recent(seen, now):
+                    self._busy.add(rid)
+                    self._heap.append((seen + self._window, rid))
+            heapq.heapify(self._heap)
+
+            self._loaded_at = now
+            self._rebuild_snapshot()
+
+    # -----------------------------
+    # WRITES
+    # -----------------------------
+
+    def record_motion(self, room_id: int, event_time: Optional[datetime] = None) -> None:
+        rid = int(room_id)
+        seen = event_time or self.utcnow_fn()
+
+        with self._lock:
+            self._rooms.add(rid)
+            if not self._is_recent(seen, self.utcnow_fn()):
+                # too old, or in the future: keeping a future time would
+                # make every real motion until then look older
+                return
+
+            previous = self._last_seen.get(rid)
+            if previous is not None and previous >= seen:
+                return
+            self._last_seen[rid] = seen
+
+            if rid in self._busy:
+                # already busy: its heap entry is re-armed when it pops
+                return
+
+            self._busy.add(rid)
+            heapq.heappush(self._heap, (seen + self._window, rid))
+            self._rebuild_snapshot()
+
+    def add_room(self, room_id: int) -> None:
+        with self._lock:
+            rid = int(room_id)
+            if rid in self._rooms:
+                return
+            self._rooms.add(rid)
+            self._rebuild_snapshot()
+
+    def remove_room(self, room_id: int) -> None:
+        with self._lock:
+            rid = int(room_id)
+            self._rooms.discard(rid)
+            self._last_seen.pop(rid, None)
+            self._busy.discard(rid)
+            self._rebuild_snapshot()
+
+    def subscribe(self, listener: Callable[[int, str, int], None]) -> None:
+        """
+        listener(room_id, status, version) on every transition:
+        "available", "busy", or "removed" (room deleted).
+        Called with the engine lock held: it must be quick and must not
+        call back into the engine.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    # -----------------------------
+    # READS
+    # -----------------------------
+
+    def available_ids(self) -> FrozenSet[int]:
+        self._expire()
+        return self._available
+
+    def busy_ids(self) -> FrozenSet[int]:
+        self._expire()
+        with self._lock:
+            return frozenset(self._busy)
+
+    def last_seen(self, room_id: int) -> Optional[datetime]:
+        with self._lock:
+            return self._last_seen.get(int(room_id))
+
+    def next_expiry(self) -> Optional[datetime]:
+        """
+        Earliest time a busy room may turn AVAILABLE (None: nothing busy).
+        Heap entries of removed rooms are dropped and those of rooms with
+        newer motion re-armed first, so the answer is never early.
+        """
+        with self._lock:
+            while self._heap:
+                expires_at, rid = self._heap[0]
+                seen = self._last_seen.get(rid)
+                if rid not in self._busy or rid not in self._rooms or seen is None:
+                    heapq.heappop(self._heap)
+                    continue
+                if seen + self._window != expires_at:
+                    heapq.heapreplace(self._heap, (seen + self._window, rid))
+                    continue
+                return expires_at
+            return None
+
+    # -----------------------------
+    # INTERNAL
+    # -----------------------------
+
+    def _is_recent(self, seen: datetime, now: datetime) -> bool:
+        delta = (now - seen).total_seconds()
+        return 0 <= delta <= self.activity_seconds
+
+    def _expire(self) -> None:
+        now = self.utcnow_fn()
+        if not self._heap or self._heap[0][0] >= now:
+            return
+
+        with self._lock:
+            changed = False
+            while self._heap and self._heap[0][0] < now:
+                _, rid = heapq.heappop(self._heap)
+                if rid not in self._busy:
+                    continue
+
+                seen = self._last_seen.get(rid)
+                if seen is not None and self._is_recent(seen, now):
+                    # newer motion arrived while busy: re-arm
+                    heapq.heappush(self._heap, (seen + self._window, rid))
+                    continue
+
+                self._busy.discard(rid)
+                changed = True
+
+            if changed:
+                self._rebuild_snapshot()
+
+    def _rebuild_snapshot(self) -> None:
+        available = frozenset(self._rooms - self._busy)
+        if available == self._available:
+            return
+
+        previous = self._available
+        self._available = available
+        self.version += 1
+
+        for listener in self._listeners:
+            for rid in available - previous:
+                listener(rid, "available", self.version)
+            for rid in previous - available:
+                listener(rid, "busy" if rid in self._rooms else "removed", self.version)
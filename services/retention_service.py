@@ -0,0 +1,264 @@
+# services/retention_service.py
+from __future__ import annotations
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RetentionService:
+    """
+    Keeps classroom_motion_events small.
+
+    Raw events older than retention_days are rolled into
+    classroom_occupancy_hourly (one row per room and hour) and then
+    deleted in chunks of delete_chunk_size ids.
+
+    - works one whole hour at a time, oldest first, and only for hours that
+      ended before the horizon
+    - an hour's events are read and its rollup rows written in one
+      transaction; the raw events are deleted after that commit, each
+      chunk committed on its own so no lock outlives one chunk
+    - an hour that already has rollup rows is not recomputed. Each row
+      keeps the highest event id it counted (last_event_id): leftover raw
+      events up to it were counted before (a crash between the rollup and
+      the deletes) and are only deleted; later ones (late or backfilled
+      events, e.g. a write-behind flush after the first run) are merged
+      into the rows first, so a run is safe to repeat and loses nothing
+    - busy_seconds carries the activity window over from the previous
+      hour's rollup (motion at 10:55 keeps the room busy past 11:00)
+    - run_once() is what the CLI (retention.py) calls; start() runs it
+      every interval_seconds on a daemon thread. Enable the schedule in
+      one process only.
+    """
+
+    def __init__(
+        self,
+        db_instance=None,
+        motion_events_model=None,
+        occupancy_hourly_model=None,
+        *,
+        activity_seconds: int = 900,
+        retention_days: float = 30,
+        delete_chunk_size: int = 1000,
+    ):
+        self.db = db_instance
+        self.motion_events_model = motion_events_model
+        self.occupancy_hourly_model = occupancy_hourly_model
+
+        self.activity_seconds = int(activity_seconds)
+        self.retention_days = retention_days
+        self.delete_chunk_size = delete_chunk_size
+        self.utcnow_fn = datetime.utcnow
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------
+    # run
+    # -------------------------
+
+    def horizon(self) -> datetime:
+        # hours are processed whole: round the cutoff down to an hour
+        cutoff = self.utcnow_fn() - timedelta(days=self.retention_days)
+        return self._hour_of(cutoff)
+
+    def run_once(self, max_hours: Optional[int] = None) -> Dict[str, int]:
+        """
+        Roll up and delete every whole hour before the horizon
+        (at most max_hours of them). Returns counters.
+        """
+        stats = {"hours": 0, "rollup_rows": 0, "events_deleted": 0}
+        horizon = self.horizon()
+
+        while max_hours is None or stats["hours"] < max_hours:
+            oldest = self.motion_events_model.oldest_event_time(horizon)
+            oldest = self._to_datetime(oldest)
+            if oldest is None:
+                break
+
+            rows, deleted = self._roll_hour(self._hour_of(oldest))
+            stats["hours"] += 1
+            stats["rollup_rows"] += rows
+            stats["events_deleted"] += deleted
+            if deleted == 0:
+                break  # nothing could be removed; do not spin
+
+        return stats
+
+    def start(self, interval_seconds: float) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval_seconds,), name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval_seconds: float) -> None:
+        while not self._stop.wait(interval_seconds):
+            try:
+                self.run_once()
+            except Exception:
+                # keep the schedule alive; the next run retries
+                pass
+
+    # -------------------------
+    # one hour
+    # -------------------------
+
+    def _roll_hour(self, hour_start: datetime) -> Tuple[int, int]:
+        hour_end = hour_start + timedelta(hours=1)
+
+        with self._transaction():
+            events = self.motion_events_model.list_between(
+                hour_start, hour_end, columns=["id", "classroom_id", "event_time"]
+            )
+            existing = self.occupancy_hourly_model.list_for_hour(hour_start)
+            if existing:
+                written = self._merge_late_events(hour_start, events, existing)
+            else:
+                written = self.occupancy_hourly_model.create_many(self._build_rollups(hour_start, events))
+
+        # outside the transaction: every chunk commits (and unlocks) alone
+        deleted = self.motion_events_model.delete_by_ids([e["id"] for e in events], self.delete_chunk_size)
+        return written, deleted
+
+    def _transaction(self):
+        return self.db.transaction() if self.db is not None else nullcontext()
+
+    def _build_rollups(self, hour_start: datetime, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        hour_end = hour_start + timedelta(hours=1)
+        times_by_room, last_id_by_room = self._group_by_room(events)
+        carried = self._carried_windows(hour_start)
+
+        rollups = []
+        for rid in sorted(set(times_by_room) | set(carried)):
+            times = sorted(times_by_room.get(rid, []))
+            starts = ([carried[rid]] if rid in carried else []) + times
+            rollups.append(
+                {
+                    "classroom_id": rid,
+                    "hour_start": hour_start,
+                    "event_count": len(times),
+                    "busy_seconds": self._busy_seconds(starts, hour_start, hour_end),
+                    "first_event": times[0] if times else None,
+                    "last_event": times[-1] if times else carried.get(rid),
+                    "last_event_id": last_id_by_room.get(rid, 0),
+                }
+            )
+        return rollups
+
+    def _merge_late_events(
+        self, hour_start: datetime, events: List[Dict[str, Any]], existing: List[Dict[str, Any]]
+    ) -> int:
+        # events not counted by the hour's rollup rows yet: add them in
+        rows = {self._to_int(r.get("classroom_id")): r for r in existing}
+        late = [e for e in events if not self._counted(e, rows.get(self._to_int(e.get("classroom_id"))))]
+        if not late:
+            return 0
+
+        hour_end = hour_start + timedelta(hours=1)
+        window = timedelta(seconds=self.activity_seconds)
+        times_by_room, last_id_by_room = self._group_by_room(late)
+        carried = self._carried_windows(hour_start)
+
+        # rooms without a row for the hour get one, as on the first run
+        new_rooms = set(times_by_room) - set(rows)
+        written = self.occupancy_hourly_model.create_many(
+            [r for r in self._build_rollups(hour_start, late) if r["classroom_id"] in new_rooms]
+        )
+
+        for rid in sorted(set(times_by_room) & set(rows)):
+            row = rows[rid]
+            times = sorted(times_by_room[rid])
+            first = self._to_datetime(row.get("first_event"))
+            last = self._to_datetime(row.get("last_event"))
+
+            # the row's busy time lies within [first (or the hour start when a
+            # window was carried in), last + window]; only add what is outside
+            covered_from = hour_start if first is None or rid in carried else first
+            covered_to = min((last or covered_from) + window, hour_end)
+            extra = self._busy_seconds(times, hour_start, covered_from) + self._busy_seconds(times, covered_to, hour_end)
+
+            self.occupancy_hourly_model.update_by_id(row["id"], {
+                "event_count": int(row.get("event_count") or 0) + len(times),
+                "busy_seconds": min(int(row.get("busy_seconds") or 0) + extra, int((hour_end - hour_start).total_seconds())),
+                "first_event": min(times[0], first) if first is not None else times[0],
+                "last_event": max(times[-1], last) if last is not None else times[-1],
+                "last_event_id": max(last_id_by_room[rid], self._to_int(row.get("last_event_id")) or 0),
+            })
+            written += 1
+        return written
+
+    def _counted(self, event: Dict[str, Any], row: Optional[Dict[str, Any]]) -> bool:
+        if row is None:
+            return False
+        last_id = self._to_int(row.get("last_event_id"))
+        if last_id is None:
+            return True  # row predates last_event_id: it covered the whole hour
+        return (self._to_int(event.get("id")) or 0) <= last_id
+
+    def _group_by_room(self, events: List[Dict[str, Any]]) -> Tuple[Dict[int, List[datetime]], Dict[int, int]]:
+        # {room: [event_time]}, {room: highest event id}
+        times_by_room: Dict[int, List[datetime]] = {}
+        last_id_by_room: Dict[int, int] = {}
+        for e in events:
+            rid = self._to_int(e.get("classroom_id"))
+            t = self._to_datetime(e.get("event_time"))
+            if rid is None or t is None:
+                continue
+            times_by_room.setdefault(rid, []).append(t)
+            last_id_by_room[rid] = max(last_id_by_room.get(rid, 0), self._to_int(e.get("id")) or 0)
+        return times_by_room, last_id_by_room
+
+    def _carried_windows(self, hour_start: datetime) -> Dict[int, datetime]:
+        # activity windows that started in the previous hour
+        carried: Dict[int, datetime] = {}
+        for row in self.occupancy_hourly_model.list_for_hour(hour_start - timedelta(hours=1)):
+            rid = self._to_int(row.get("classroom_id"))
+            last = self._to_datetime(row.get("last_event"))
+            if rid is not None and last is not None and last + timedelta(seconds=self.activity_seconds) > hour_start:
+                carried[rid] = last
+        return carried
+
+    def _busy_seconds(self, starts: List[datetime], hour_start: datetime, hour_end: datetime) -> int:
+        # union of [t, t + activity window] clipped to the hour; starts are sorted
+        window = timedelta(seconds=self.activity_seconds)
+        total = 0.0
+        covered_until = hour_start
+        for t in starts:
+            begin = max(t, covered_until)
+            end = min(t + window, hour_end)
+            if end > begin:
+                total += (end - begin).total_seconds()
+                covered_until = end
+        return int(round(total))
+
+    # -------------------------
+    # helpers
+    # -------------------------
+
+    def _hour_of(self, value: datetime) -> datetime:
+        return value.replace(minute=0, second=0, microsecond=0)
+
+    def _to_int(self, value):
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except Exception:
+            return None
+
+    def _to_datetime(self, value):
+        # MySQL returns datetime, MockJSONDB returns ISO strings after a reload
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        return value
@@ -1,7 +1,9 @@
 # services/rooms_service.py
 from __future__ import annotations
-from datetime import datetime
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 from core.config import SENSORE_LOG_ACTIVITY
+from core.request_memo import memoize
 
 
 class RoomsService:
@@ -17,10 +19,15 @@ class RoomsService:
     - getRoomsAvilable()  (legacy typo alias)
     - getAvailableRoomIds()
     - filterEventsBySec()
+
+    When an OccupancyEngine is injected, availability is read from its
+    in-memory snapshot instead of scanning the events table per call.
+    Motion must then be written through record_motion() so the engine sees it.
     """
 
-    def __init__(self, db_instance=None, rooms_model=None, motion_events_model=None ,sensor_model = None):
+    def __init__(self, db_instance=None, rooms_model=None, motion_events_model=None ,sensor_model = None, occupancy_engine=None, occupancy_hourly_model=None, heatmap_service=None, delete_chunk_size=1000):
         self.db = db_instance
+        self.delete_chunk_size = delete_chunk_size
 
         self.activity_seconds = int(SENSORE_LOG_ACTIVITY)
         self.utcnow_fn = datetime.utcnow
@@ -29,14 +36,19 @@ class RoomsService:
         self.motion_events_model = motion_events_model
 
         self.sensor_model = sensor_model
+        self.occupancy_engine = occupancy_engine
+        self.occupancy_hourly_model = occupancy_hourly_model
+        self.heatmap_service = heatmap_service
     # ---- ADT: public API (keep names) ----
 
     def getRoomsAvailable(self):
-        rooms = self.rooms_model.filter()  # [{id, id_building, floor, class_number, ...}, ...]
-        events = self.motion_events_model.filter()  # [{classroom_id, event_time, ...}, ...]
+        rooms = self.rooms_model.filter(limit=None)  # [{id, id_building, floor, class_number, ...}, ...]
+
+        if self.occupancy_engine is not None:
+            available_ids = self.getAvailableRoomIds()
+            return [r for r in rooms if self._to_int(r.get("id")) in available_ids]
 
-        recent_events = self.filterEventsBySec(events, self.activity_seconds)
-        busy_ids = self._extract_busy_classroom_ids(recent_events)
+        busy_ids = set(self._list_active_classrooms())
 
         if not busy_ids:
             return list(rooms)
@@ -60,6 +72,15 @@ class RoomsService:
         return available_rooms
 
     def getAvailableRoomIds(self):
+        # one availability snapshot per request
+        key = ("available_room_ids", id(self), self.db.write_generation if self.db else 0)
+        return memoize(key, self._compute_available_room_ids)
+
+    def _compute_available_room_ids(self):
+        if self.occupancy_engine is not None:
+            self.occupancy_engine.ensure_fresh(self._load_occupancy)
+            return self.occupancy_engine.available_ids()
+
         rooms = self.getRoomsAvailable()
         ids = set()
 
@@ -74,13 +95,39 @@ class RoomsService:
 
         return ids
 
+    def availability_version(self):
+        """
+        Token that changes whenever the set of available rooms may have
+        changed (with an engine: only on real transitions).
+        """
+        if self.occupancy_engine is not None:
+            self.occupancy_engine.ensure_fresh(self._load_occupancy)
+            self.occupancy_engine.available_ids()  # retires expired rooms
+            return ("engine", self.occupancy_engine.version)
+
+        return ("events", self.db.table_generation(self.motion_events_model.TABLE) if self.db else 0)
+
+    def next_availability_change(self):
+        """
+        Earliest time a busy room turns AVAILABLE on its own, i.e. when its
+        activity window runs out (None: no room is busy).
+        """
+        if self.occupancy_engine is not None:
+            return self.occupancy_engine.next_expiry()
+
+        active = self._list_active_classrooms()
+        times = [t for t in active.values() if t is not None]
+        if not times:
+            return None
+        return min(times) + timedelta(seconds=self.activity_seconds)
+
     def filterEventsBySec(self, _events, _sec):
         now = self.utcnow_fn()
         sec = int(_sec)
 
         filtered = []
         for ev in _events or []:
-            t = ev.get("event_time")
+            t = self._to_datetime(ev.get("event_time"))
             if not t:
                 continue
             try:
@@ -93,29 +140,151 @@ class RoomsService:
 
         return filtered
 
+    def record_motion(self, sensor):
+        """
+        Store a motion event for the sensor's room and mark the room busy.
+        Returns the event id, or None when the write was queued (write-behind).
+        The engine is updated right away either way.
+        """
+        event_time = self.utcnow_fn()
+        new_id = self.motion_events_model.append(
+            {"classroom_id": sensor["room_id"], "sensor_id": sensor["id"], "event_time": event_time}
+        )
+
+        if self.occupancy_engine is not None:
+            self.occupancy_engine.record_motion(sensor["room_id"], event_time)
+        if self.heatmap_service is not None:
+            self.heatmap_service.record(sensor["room_id"], event_time)
+
+        return new_id
+
+    def record_motion_batch(self, readings):
+        """
+        Store many motion events in one multi-row insert.
+
+        readings: [(sensor, event_time or None), ...]
+        - event_time=None means "now"; a time ahead of now (a sensor clock
+          running fast) is stored as now
+        """
+        now = self.utcnow_fn()
+        rows = []
+        for sensor, event_time in readings:
+            rows.append(
+                {"classroom_id": sensor["room_id"], "sensor_id": sensor["id"], "event_time": min(event_time or now, now)}
+            )
+
+        inserted = self.motion_events_model.append_many(rows)
+
+        if self.occupancy_engine is not None:
+            for row in rows:
+                self.occupancy_engine.record_motion(row["classroom_id"], row["event_time"])
+        if self.heatmap_service is not None:
+            self.heatmap_service.record_many([r["classroom_id"] for r in rows], [r["event_time"] for r in rows])
+
+        return inserted
+
+    def register_room(self, classroom_id):
+        if self.occupancy_engine is not None:
+            self.occupancy_engine.add_room(classroom_id)
+
     # ---- Internals (not part of ADT) ----
 
-    def _extract_busy_classroom_ids(self, events):
-        busy = set()
-        for ev in events or []:
-            cid = ev.get("classroom_id")
-            if cid is None:
-                continue
+    def _to_int(self, value):
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except Exception:
+            return None
+
+    def _to_datetime(self, value):
+        # MySQL returns datetime, MockJSONDB returns ISO strings after a reload
+        if isinstance(value, str):
             try:
-                busy.add(int(cid))
-            except Exception:
-                continue
-        return busy
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return None
+        return value
+
+    def _list_active_classrooms(self):
+        # {classroom_id: last event_time}, computed by the database
+        now = self.utcnow_fn()
+        since = now - timedelta(seconds=self.activity_seconds)
+        active = self.motion_events_model.list_active_classrooms(since, now)
 
+        result = {}
+        for cid, t in active.items():
+            cid_int = self._to_int(cid)
+            if cid_int is not None:
+                result[cid_int] = self._to_datetime(t)
+        return result
 
+    def _load_occupancy(self):
+        room_ids = [rid for rid in (self._to_int(r.get("id")) for r in self.rooms_model.filter(limit=None)) if rid is not None]
+        return room_ids, self._list_active_classrooms()
 
     def delete_room_by_id(self, classroom_id):
-        check_room = self.rooms_model.get_by_id(classroom_id)
-        if check_room == None:
-            return False
-        else:
-            self.sensor_model.delete_sensor_by_room_id(classroom_id)
-            self.motion_events_model.delete_events_by_room_id(classroom_id)
-            self.rooms_model.delete_room_by_id(classroom_id)
-            return True
+        return self.delete_rooms_by_ids([classroom_id]) > 0
+
+    def delete_rooms_by_ids(self, classroom_ids):
+        """
+        Set-based cascade: sensors, motion events, hourly rollups and the
+        rooms, with one IN-list DELETE per table. Returns the number of
+        rooms deleted (unknown ids are skipped).
+
+        - events go first, in chunks and outside any transaction
+          (purge_room_events); they are history only, so a failure there
+          leaves every room intact and a retry finishes the job
+        - the rest is queued on one unit of work (delete_purged_rooms) and
+          sent in one transaction: all rooms go, or none
+        - callers that add their own writes to that unit of work (e.g.
+          BuildingService) run the three steps themselves
+        """
+        ids = self.existing_room_ids(classroom_ids)
+        if not ids:
+            return 0
+
+        self.purge_room_events(ids)
+        with self._unit_of_work() as uow:
+            self.delete_purged_rooms(ids, uow)
+        self.forget_rooms(ids)
+        return len(ids)
+
+    def existing_room_ids(self, classroom_ids):
+        ids = [i for i in (self._to_int(c) for c in classroom_ids) if i is not None]
+        if not ids:
+            return []
+        return [r["id"] for r in self.rooms_model.filter({"id": ids}, limit=None, columns=["id"])]
+
+    def purge_room_events(self, classroom_ids):
+        # delete_chunk_size events per statement, so the table is never locked for long
+        return self.motion_events_model.delete_events_by_room_ids(classroom_ids, self.delete_chunk_size)
+
+    def delete_purged_rooms(self, classroom_ids, uow=None):
+        """
+        Sensors, leftover events, rollups and the rooms: one IN-list DELETE
+        each, queued on uow (the caller's unit of work) after
+        purge_room_events. Without uow they run right away.
+        """
+        self.sensor_model.delete_by_room_ids(classroom_ids, uow=uow)
+        # events recorded between the purge and the sensors going away
+        self.motion_events_model.delete_by_room_ids(classroom_ids, uow=uow)
+        if self.occupancy_hourly_model is not None:
+            self.occupancy_hourly_model.delete_by_room_ids(classroom_ids, uow=uow)
+        self.rooms_model.delete_by_ids(classroom_ids, uow=uow)
+
+    def forget_rooms(self, classroom_ids):
+        # after the commit: in-memory views stop tracking the rooms, and
+        # motion queued while they were being deleted is never flushed
+        if classroom_ids:
+            self.motion_events_model.discard_queued_by_room_ids(classroom_ids)
+        for classroom_id in classroom_ids:
+            if self.occupancy_engine is not None:
+                self.occupancy_engine.remove_room(classroom_id)
+            if self.heatmap_service is not None:
+                self.heatmap_service.forget_room(classroom_id)
+
+    def _unit_of_work(self):
+        # without a db handle the models write directly (uow=None)
+        return self.db.unit_of_work() if self.db is not None else nullcontext()
 
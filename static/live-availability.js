@@ -0,0 +1,20 @@
+// Live room availability over Server-Sent Events (GET /live).
+//
+// handlers.onSnapshot({version, available: [roomId], buildings: {buildingId: count}})
+//   sent on (re)connect, and when the client fell behind
+// handlers.onTransition({room_id, building_id, status, version})
+//   status: "available" | "busy" | "removed"
+//
+// EventSource reconnects by itself; every reconnect starts with a snapshot.
+function subscribeAvailability(handlers) {
+  if (!window.EventSource) return null;
+
+  const source = new EventSource('live');
+  source.addEventListener('snapshot', e => {
+    if (handlers.onSnapshot) handlers.onSnapshot(JSON.parse(e.data));
+  });
+  source.addEventListener('transition', e => {
+    if (handlers.onTransition) handlers.onTransition(JSON.parse(e.data));
+  });
+  return source;
+}
@@ -0,0 +1,38 @@
+// Weekly occupancy heatmap (GET /heatmap?method=room|building&id=...).
+//
+// The JSON "msg" is {weeks, since, days: ["mon".."sun"], matrix: 7x24}
+// where every cell is the share of that weekday-hour with motion (0..1).
+const HEATMAP_DAY_LABELS = {
+  sun: 'א׳', mon: 'ב׳', tue: 'ג׳', wed: 'ד׳', thu: 'ה׳', fri: 'ו׳', sat: 'ש׳',
+};
+const HEATMAP_DAY_ORDER = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'];
+
+function renderOccupancyHeatmap(container, kind, id) {
+  return fetch(`heatmap?method=${kind}&id=${encodeURIComponent(id)}`)
+    .then(r => r.json())
+    .then(body => {
+      if (!body.flag) return;
+      const data = body.msg;
+
+      const header = Array.from({ length: 24 }, (_, h) =>
+        `<div class="text-[10px] text-slate-400 text-center">${h % 3 === 0 ? h : ''}</div>`
+      ).join('');
+
+      const rows = HEATMAP_DAY_ORDER.map(day => {
+        const values = data.matrix[data.days.indexOf(day)];
+        const cells = values.map((v, h) => `
+          <div class="h-5 rounded-sm" title="${String(h).padStart(2, '0')}:00 · ${Math.round(v * 100)}%"
+               style="background: rgba(2, 132, 199, ${Math.max(v, 0.04)})"></div>
+        `).join('');
+        return `<div class="text-xs text-slate-500">${HEATMAP_DAY_LABELS[day]}</div>${cells}`;
+      }).join('');
+
+      container.innerHTML = `
+        <div class="grid gap-0.5" style="grid-template-columns: 2rem repeat(24, minmax(0, 1fr)); direction: ltr">
+          <div></div>${header}${rows}
+        </div>
+        <p class="text-xs text-slate-500 mt-2">${data.weeks} שבועות אחרונים (מ־${data.since})</p>
+      `;
+    })
+    .catch(() => {});
+}
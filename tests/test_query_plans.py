@@ -0,0 +1,195 @@
+"""
+Query-plan regression suite: EXPLAIN every SELECT the models generate
+against a seeded MySQL database and fail on full table scans and
+filesorts.
+
+Needs a scratch database (its tables are dropped and recreated):
+
+    MYSQL_TEST_DATABASE=freeclass_plans MYSQL_TEST_HOST=127.0.0.1 \\
+    MYSQL_TEST_USER=root MYSQL_TEST_PASSWORD=... python -m pytest tests/test_query_plans.py
+
+Skipped when MYSQL_TEST_DATABASE is not set.
+"""
+import os
+import unittest
+from datetime import datetime, timedelta
+
+from core.infrastructure.migrations import MigrationRunner, split_statements
+from core.infrastructure.mysql import MySQL
+
+from models.building_model import BuildingModel
+from models.class_rooms_model import ClassRoomsModel
+from models.classroom_motion_events_model import ClassroomMotionEventsModel
+from models.classroom_occupancy_hourly_model import ClassroomOccupancyHourlyModel
+from models.sensors_model import SensorsModel
+from models.users_model import UsersModel
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "database", "schema.sql")
+
+BUILDINGS = 40
+FLOORS = 5
+ROOMS_PER_FLOOR = 10
+EVENTS = 20000
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+class RecordingMySQL(MySQL):
+    # every SELECT the models send, with its parameters
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recording = None
+
+    def _execute_with_retry(self, query, params, **kwargs):
+        if self.recording is not None and query.startswith("SELECT"):
+            self.recording.append((query, params))
+        return super()._execute_with_retry(query, params, **kwargs)
+
+
+@unittest.skipUnless(os.getenv("MYSQL_TEST_DATABASE"), "set MYSQL_TEST_DATABASE to run the query-plan suite")
+class TestsQueryPlans(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = RecordingMySQL(
+            host=os.getenv("MYSQL_TEST_HOST", "127.0.0.1"),
+            user=os.getenv("MYSQL_TEST_USER", "root"),
+            password=os.getenv("MYSQL_TEST_PASSWORD", ""),
+            database=os.getenv("MYSQL_TEST_DATABASE"),
+            port=int(os.getenv("MYSQL_TEST_PORT", 3306)),
+            ssl_required=os.getenv("MYSQL_TEST_SSL_REQUIRED", "false").lower() == "true",
+        )
+
+        # baseline + migrations, exactly like a deployment
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as fh:
+            statements = split_statements(fh.read())
+        cls.db.execute_statements(
+            ["SET FOREIGN_KEY_CHECKS=0", "DROP TABLE IF EXISTS schema_migrations, classroom_occupancy_hourly"] + statements
+        )
+        MigrationRunner(cls.db).migrate()
+
+        cls.seed()
+        cls.db.execute_statements(
+            ["ANALYZE TABLE buildings, classrooms, sensors, classroom_motion_events, classroom_occupancy_hourly, users"]
+        )
+
+        cls.buildings = BuildingModel(cls.db)
+        cls.rooms = ClassRoomsModel(cls.db)
+        cls.events = ClassroomMotionEventsModel(cls.db)
+        cls.hourly = ClassroomOccupancyHourlyModel(cls.db)
+        cls.sensors = SensorsModel(cls.db)
+        cls.users = UsersModel(cls.db)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+
+    @classmethod
+    def seed(cls):
+        db = cls.db
+        db.insert_many("buildings", [{"id": b, "building_name": f"B{b}", "floors": FLOORS} for b in range(1, BUILDINGS + 1)])
+
+        rooms = []
+        for b in range(1, BUILDINGS + 1):
+            for floor in range(1, FLOORS + 1):
+                for n in range(ROOMS_PER_FLOOR):
+                    rooms.append(
+                        {
+                            "id": len(rooms) + 1,
+                            "id_building": b,
+                            "floor": floor,
+                            "class_number": floor * 100 + n,
+                            "category": f"type-{n}",  # 10% of the rooms each
+                        }
+                    )
+        db.insert_many("classrooms", rooms)
+        room_count = len(rooms)
+
+        db.insert_many(
+            "sensors",
+            [{"room_id": r, "private_key": f"key-{r}", "public_key": f"pub-{r}"} for r in range(1, room_count + 1)],
+        )
+
+        start = NOW - timedelta(days=14)
+        step = (NOW - start) / EVENTS
+        db.insert_many(
+            "classroom_motion_events",
+            [
+                {"classroom_id": i % room_count + 1, "sensor_id": str(i % room_count + 1), "event_time": start + step * i}
+                for i in range(EVENTS)
+            ],
+        )
+
+        hourly = []
+        for h in range(24 * 7):
+            hour = start - timedelta(hours=h + 1)
+            for r in range(1, room_count + 1, 25):
+                hourly.append({"classroom_id": r, "hour_start": hour, "event_count": 1, "busy_seconds": 900})
+        db.insert_many("classroom_occupancy_hourly", hourly)
+
+        db.insert_many("users", [{"username": f"user{u}", "password": "x"} for u in range(200)])
+
+    # -----------------------------
+    # cases: (label, call, full scan allowed)
+    # -----------------------------
+
+    def cases(self):
+        since = NOW - timedelta(minutes=15)
+        return [
+            ("buildings.get_by_id", lambda: self.buildings.get_by_id(3), False),
+            ("buildings.filter(all)", lambda: self.buildings.filter(limit=None), True),
+            ("classrooms.get_by_id", lambda: self.rooms.get_by_id(7), False),
+            ("classrooms.list_by_building", lambda: self.rooms.list_by_building(3), False),
+            ("classrooms.list_by_floor", lambda: self.rooms.list_by_floor(3, 2), False),
+            ("classrooms.filter(category)", lambda: self.rooms.filter({"category": "type-3"}, limit=None), False),
+            ("classrooms.filter(ids)", lambda: self.rooms.filter({"id": [1, 5, 9]}, limit=None), False),
+            ("classrooms.filter(all)", lambda: self.rooms.filter(limit=None), True),
+            ("events.get_by_id", lambda: self.events.get_by_id(10), False),
+            ("events.list_active_classrooms", lambda: self.events.list_active_classrooms(since, NOW), False),
+            ("events.oldest_event_time", lambda: self.events.oldest_event_time(NOW - timedelta(days=7)), False),
+            ("events.list_between", lambda: self.events.list_between(since, NOW, columns=["id", "classroom_id", "event_time"]), False),
+            (
+                "events.recent (home)",
+                lambda: self.events.filter(order_by="event_time DESC", limit=40, columns=["classroom_id", "event_time"]),
+                False,
+            ),
+            (
+                "events.by_room",
+                lambda: self.events.filter({"classroom_id": 5}, order_by="event_time DESC", limit=20),
+                False,
+            ),
+            ("hourly.list_for_hour", lambda: self.hourly.list_for_hour(NOW - timedelta(days=15)), False),
+            ("hourly.list_by_room_id", lambda: self.hourly.list_by_room_id(26, NOW - timedelta(days=16)), False),
+            ("hourly.list_since", lambda: self.hourly.list_since(NOW - timedelta(days=14, hours=3)), False),
+            ("sensors.get_by_id", lambda: self.sensors.get_by_id(4), False),
+            ("sensors.get_by_privateKey", lambda: self.sensors.get_by_privateKey("key-4"), False),
+            ("sensors.get_by_privateKeys", lambda: self.sensors.get_by_privateKeys(["key-1", "key-2"]), False),
+            ("sensors.list_by_room_id", lambda: self.sensors.list_by_room_id(4), False),
+            ("sensors.list_private_keys", lambda: self.sensors.list_private_keys(), True),
+            ("sensors.list_all", lambda: self.sensors.list_all(), True),
+            ("users.get_by_id", lambda: self.users.get_by_id(2), False),
+        ]
+
+    def test_model_queries_use_indexes(self):
+        problems = []
+        for label, call, full_scan_allowed in self.cases():
+            self.db.recording = []
+            try:
+                call()
+                recorded = self.db.recording
+            finally:
+                self.db.recording = None
+            self.assertTrue(recorded, f"{label}: no SELECT recorded")
+
+            for query, params in recorded:
+                for row in self.db.fetch_all("EXPLAIN " + query, params):
+                    extra = row.get("Extra") or ""
+                    if row.get("type") == "ALL" and not full_scan_allowed:
+                        problems.append(f"{label}: full scan of {row.get('table')} in {query}")
+                    if "Using filesort" in extra:
+                        problems.append(f"{label}: filesort in {query}")
+
+        self.assertEqual(problems, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,41 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
-from datetime import datetime
+from types import SimpleNamespace
+from datetime import datetime, timedelta
 from core.infrastructure.mock_json_db import MockJSONDB
+from core.infrastructure.mysql import MySQL
+from core.infrastructure.sqlite import SQLite
+from core.infrastructure.connection_pool import ConnectionPool, PoolTimeoutError
+from core.infrastructure.slow_query_log import SlowQueryLog, fingerprint
+from core.infrastructure.write_behind import WriteBehindBuffer
+from core.infrastructure.ttl_cache import TTLCache
+from core.infrastructure.bloom_filter import BloomFilter, RefreshingBloomFilter
+from core.request_memo import RequestMemo
+from core.response_cache import ResponseCache
+from core.metrics import Metrics
+from core.controller_loader import ControllerLoader
+from core.infrastructure.migrations import MigrationError, MigrationRunner, split_statements
 
 # מודלים ושירותים
 from models.building_model import BuildingModel
 from models.class_rooms_model import ClassRoomsModel
 from models.classroom_motion_events_model import ClassroomMotionEventsModel
+from models.classroom_occupancy_hourly_model import ClassroomOccupancyHourlyModel
 from models.sensors_model import SensorsModel
 from models.users_model import UsersModel
 
 from services.rooms_service import RoomsService
 from services.building_service import BuildingService
 from services.home_service import HomeService
+from services.occupancy_engine import OccupancyEngine
+from services.availability_stream import AvailabilityStream
+from services.retention_service import RetentionService
+from services.heatmap_service import HeatmapService
+from controllers.dashboardadmin_controller import DashboardadminController
+from benchmarks.campus import CampusSpec, generate_campus
 
 class TestsFreeClass(unittest.TestCase):
 
@@ -85,5 +109,1562 @@ class TestsFreeClass(unittest.TestCase):
         user = self.db.select("users", {"username": "admin"})[0]
         self.assertEqual(user['role'], "admin", "רק משתמש עם רול אדמין יורשה להיכנס")
 
+    def test_busy_rooms_come_from_the_activity_window_only(self):
+        now = datetime(2026, 1, 1, 12, 0, 0)
+        self.rs.utcnow_fn = lambda: now
+        r1 = self.rooms.create({"class_number": 1})
+        r2 = self.rooms.create({"class_number": 2})
+        self.events.create({"classroom_id": r1, "sensor_id": 1, "event_time": now - timedelta(seconds=30)})
+        self.events.create({"classroom_id": r2, "sensor_id": 2, "event_time": (now - timedelta(hours=2)).isoformat()})
+
+        active = self.events.list_active_classrooms(now - timedelta(seconds=900), now)
+        self.assertEqual(list(active.keys()), [r1])
+        self.assertEqual(self.rs.getAvailableRoomIds(), {r2})
+
+
+class TestsQueryFilters(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MockJSONDB()
+        self.rooms = ClassRoomsModel(self.db)
+        for n, cat in ((1, None), (2, 5), (3, 6), (4, 6)):
+            self.rooms.create({"class_number": n, "floor": n, "category": cat})
+
+    def test_in_range_and_null_predicates(self):
+        self.assertEqual([r["class_number"] for r in self.rooms.filter({"id": [1, 3]})], [1, 3])
+        self.assertEqual([r["class_number"] for r in self.rooms.filter({"floor >=": 2, "floor <": 4})], [2, 3])
+        self.assertEqual([r["class_number"] for r in self.rooms.filter({"category": None})], [1])
+        self.assertEqual([r["class_number"] for r in self.rooms.filter({"category !=": None, "id !=": [4]})], [2, 3])
+        self.assertEqual(self.rooms.filter({"id": []}), [])
+
+    def test_columns_projection(self):
+        rows = self.rooms.filter({"id": 2}, columns=["id", "floor"])
+        self.assertEqual(rows, [{"id": 2, "floor": 2}])
+
+    def test_mysql_where_builder(self):
+        sql = MySQL.__new__(MySQL)
+        where_sql, values = sql._build_where({"id": [1, 2], "category": None, "event_time >=": "x"})
+        self.assertEqual(where_sql, " WHERE id IN (%s, %s) AND category IS NULL AND event_time>=%s")
+        self.assertEqual(values, [1, 2, "x"])
+
+        with self.assertRaises(ValueError):
+            sql._build_where({"id; DROP TABLE x": 1})
+
+
+class FakeCursor:
+    def __init__(self, rows, log=None):
+        self.rows = rows
+        self.rowcount = len(rows)
+        self.lastrowid = None
+        self.log = log if log is not None else []
+        self.params = []
+
+    def execute(self, query, params):
+        self.log.append(query)
+        self.params.append(params)
+
+    def executemany(self, query, params):
+        self.log.append(query)
+        self.params.append(list(params))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeMySQLConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.log = []
+        self.prepared = []
+
+    def cursor(self, dictionary=False, prepared=False):
+        cursor = FakeCursor(self.rows, self.log)
+        if prepared:
+            self.prepared.append(cursor)
+        return cursor
+
+    def start_transaction(self):
+        self.log.append("begin")
+
+    def commit(self):
+        self.log.append("commit")
+
+    def rollback(self):
+        self.log.append("rollback")
+
+    def is_connected(self):
+        return True
+
+
+class FakeMySQL(MySQL):
+    rows = [{"id": 1}, {"id": 2}]
+
+    def _connect(self):
+        return FakeMySQLConnection(self.rows)
+
+
+class TestsSlowQueryLog(unittest.TestCase):
+
+    def test_fingerprints_normalize_literals_and_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM classrooms WHERE id_building=%s"),
+            "SELECT * FROM classrooms WHERE id_building=?",
+        )
+        self.assertEqual(
+            fingerprint("DELETE FROM sensors  WHERE room_id IN (%s, %s, %s)"),
+            fingerprint("DELETE FROM sensors WHERE room_id IN (%s)"),
+        )
+        self.assertEqual(
+            fingerprint("SELECT id FROM users WHERE username = 'bob' LIMIT 10"),
+            "SELECT id FROM users WHERE username = ? LIMIT ?",
+        )
+        self.assertEqual(fingerprint("SELECT * FROM idx_1"), "SELECT * FROM idx_1")
+
+    def test_threshold_sampling_and_percentiles(self):
+        log = SlowQueryLog(10, sample_rate=1.0)
+        self.assertFalse(log.record("SELECT * FROM buildings", 0.001))
+        for ms in range(11, 111):
+            log.record("SELECT * FROM classrooms WHERE id=%s", ms / 1000, rows=1)
+
+        (entry,) = log.dump()
+        self.assertEqual(entry["fingerprint"], "SELECT * FROM classrooms WHERE id=?")
+        self.assertEqual((entry["count"], entry["rows"]), (100, 100))
+        self.assertEqual((entry["p50_ms"], entry["p99_ms"], entry["max_ms"]), (60.0, 109.0, 110.0))
+
+        none_sampled = SlowQueryLog(0, sample_rate=0.0)
+        self.assertFalse(none_sampled.record("SELECT 1", 1.0))
+        self.assertEqual(none_sampled.dump(), [])
+
+    def test_mysql_records_rows_per_fingerprint(self):
+        log = SlowQueryLog(0)
+        sql = FakeMySQL("h", "u", "p", "d", slow_query_log=log)
+
+        sql.select("classrooms", {"id_building": 3})
+        sql.select("classrooms", {"id_building": 4})
+
+        (entry,) = log.dump()
+        self.assertEqual(entry["fingerprint"], "SELECT * FROM classrooms WHERE id_building=?")
+        self.assertEqual((entry["count"], entry["rows"]), (2, 4))
+
+
+class TestsMySQLTransaction(unittest.TestCase):
+
+    def test_statements_share_one_connection_and_commit_once(self):
+        sql = FakeMySQL("h", "u", "p", "d", pool_size=2)
+        with sql.transaction():
+            sql.delete("sensors", {"room_id": [1, 2]})
+            with sql.transaction():
+                sql.delete("classrooms", {"id": [1, 2]})
+        conn = sql._pool.checkout()
+        self.assertEqual(conn.log, [
+            "begin",
+            "DELETE FROM sensors WHERE room_id IN (%s, %s)",
+            "SAVEPOINT sp_1",
+            "DELETE FROM classrooms WHERE id IN (%s, %s)",
+            "RELEASE SAVEPOINT sp_1",
+            "commit",
+        ])
+        self.assertEqual(sql.pool_stats()["size"], 1)
+        sql._pool.checkin(conn)
+
+    def test_error_rolls_back_to_the_savepoint_or_the_start(self):
+        sql = FakeMySQL("h", "u", "p", "d", pool_size=1)
+        with self.assertRaises(RuntimeError):
+            with sql.transaction():
+                try:
+                    with sql.transaction():
+                        raise KeyError("nested")
+                except KeyError:
+                    pass
+                sql.delete("classrooms", {"id": 1})
+                raise RuntimeError("boom")
+        conn = sql._pool.checkout()
+        self.assertEqual(conn.log, [
+            "begin",
+            "SAVEPOINT sp_1",
+            "ROLLBACK TO SAVEPOINT sp_1",
+            "DELETE FROM classrooms WHERE id=%s",
+            "rollback",
+        ])
+
+
+class TestsMySQLStatements(unittest.TestCase):
+
+    def test_same_shape_compiles_once_and_binds_values_in_order(self):
+        sql = FakeMySQL("h", "u", "p", "d", pool_size=1)
+        sql.select("classrooms", {"id_building": 3, "floor >=": 1}, order_by="-id", limit=5, offset=10)
+        sql.select("classrooms", {"id_building": 4, "floor >=": 2}, order_by="-id", limit=6, offset=20)
+        sql.select("classrooms", {"id_building": [1, 2], "floor >=": 2}, order_by="-id", limit=6, offset=20)
+
+        stats = sql.statement_stats()["compiled"]
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 2, 2))
+
+        conn = sql._pool.checkout()
+        self.assertEqual(conn.log[0], "SELECT * FROM classrooms WHERE id_building=%s AND floor>=%s ORDER BY id DESC LIMIT %s OFFSET %s")
+        self.assertEqual(conn.log[2], "SELECT * FROM classrooms WHERE id_building IN (%s, %s) AND floor>=%s ORDER BY id DESC LIMIT %s OFFSET %s")
+        self.assertEqual(conn.prepared[0].params, [(3, 1, 5, 10), (4, 2, 6, 20)])
+        sql._pool.checkin(conn)
+
+        # IN lists vary in length: plain cursors, no prepared statement per length
+        for ids in ([1], [1, 2], [1, 2, 3]):
+            sql.delete("sensors", {"room_id": ids})
+        self.assertEqual(len(conn.prepared), 1)
+        self.assertEqual(sql.statement_stats()["prepared"]["open"], 1)
+
+        with self.assertRaises(ValueError):
+            sql.select("classrooms; DROP TABLE x")
+        with self.assertRaises(ValueError):
+            sql.select("classrooms", limit=5, offset=-1)
+
+    def test_prepared_cursors_are_reused_per_connection_and_evicted(self):
+        sql = FakeMySQL("h", "u", "p", "d", pool_size=1, prepared_per_connection=2)
+        sql.delete("sensors", {"room_id": 1})
+        sql.delete("sensors", {"room_id": 2})
+        sql.update("classrooms", {"floor": 2}, {"id": 1})
+        sql.insert("buildings", {"building_name": "A", "floors": 1})
+
+        conn = sql._pool.checkout()
+        self.assertEqual(len(conn.prepared), 3)
+        self.assertEqual(conn.prepared[0].params, [(1,), (2,)])
+        self.assertEqual(conn.prepared[1].params, [(2, 1)])
+        sql._pool.checkin(conn)
+        self.assertEqual(sql.statement_stats()["prepared"], {"prepared": 3, "reused": 1, "closed": 1, "open": 2})
+
+        off = FakeMySQL("h", "u", "p", "d", pool_size=1, prepared_per_connection=0)
+        off.delete("sensors", {"room_id": 1})
+        conn = off._pool.checkout()
+        self.assertEqual((conn.prepared, conn.log), ([], ["DELETE FROM sensors WHERE room_id=%s", "commit"]))
+
+    def test_insert_many_uses_the_cached_insert_statement(self):
+        sql = FakeMySQL("h", "u", "p", "d", pool_size=1)
+        sql.insert("classroom_motion_events", {"classroom_id": 1, "sensor_id": 1})
+        sql.insert_many("classroom_motion_events", [{"classroom_id": n, "sensor_id": n} for n in (2, 3)])
+        sql.insert_many("classroom_motion_events", [{"classroom_id": 4, "sensor_id": 4}])
+
+        stats = sql.statement_stats()
+        self.assertEqual((stats["compiled"]["misses"], stats["compiled"]["hits"]), (1, 2))
+        # several rows: one executemany on a plain cursor; one row: the prepared cursor
+        self.assertEqual((stats["prepared"]["prepared"], stats["prepared"]["reused"]), (1, 1))
+        conn = sql._pool.checkout()
+        self.assertEqual(conn.prepared[0].params, [(1, 1), (4, 4)])
+        insert = "INSERT INTO classroom_motion_events (classroom_id, sensor_id) VALUES (%s, %s)"
+        self.assertEqual([q for q in conn.log if q not in ("begin", "commit")], [insert] * 3)
+        sql._pool.checkin(conn)
+
+
+class TestsSQLite(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = SQLite(os.path.join(tmp.name, "campus.sqlite3"))
+        self.addCleanup(self.db.close)
+
+        self.building = self.db.insert("buildings", {"building_name": "A", "floors": 2})
+        self.rooms = ClassRoomsModel(self.db)
+        self.room_ids = [
+            self.rooms.create({"id_building": self.building, "floor": n % 2 + 1, "class_number": n, "category": cat})
+            for n, cat in ((1, None), (2, "lab"), (3, "lab"), (4, "hall"))
+        ]
+
+    def test_transaction_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.rooms.delete_by_ids(self.room_ids)
+                raise RuntimeError("boom")
+        self.assertEqual(len(self.rooms.filter()), 4)
+
+    def test_nested_transaction_is_a_savepoint(self):
+        with self.db.transaction():
+            self.rooms.delete_by_ids(self.room_ids[:1])
+            with self.assertRaises(RuntimeError):
+                with self.db.transaction():
+                    self.rooms.delete_by_ids(self.room_ids[1:])
+                    raise RuntimeError("boom")
+        self.assertEqual([r["id"] for r in self.rooms.filter()], self.room_ids[1:])
+
+    def test_filters_order_limit_offset_projection(self):
+        self.assertEqual([r["class_number"] for r in self.rooms.filter({"category": "lab"})], [2, 3])
+        self.assertEqual([r["class_number"] for r in self.rooms.filter({"category": None})], [1])
+        self.assertEqual([r["class_number"] for r in self.rooms.filter({"id !=": self.room_ids[:2], "floor >=": 1})], [3, 4])
+        self.assertEqual(self.rooms.filter({"id": []}), [])
+        self.assertEqual(
+            [r["class_number"] for r in self.rooms.filter(order_by="floor DESC, class_number", limit=2, offset=1)],
+            [3, 2],
+        )
+        self.assertEqual(self.rooms.filter({"id": self.room_ids[0]}, columns=["class_number"]), [{"class_number": 1}])
+        self.assertEqual(self.rooms.list_by_floor(self.building, 1), self.rooms.filter({"floor": 1}))
+
+    def test_bulk_insert_update_delete_and_datetimes(self):
+        start = datetime(2026, 1, 1, 10, 0, 0)
+        events = ClassroomMotionEventsModel(self.db)
+        inserted = events.create_many([
+            {"classroom_id": self.room_ids[i % 2], "sensor_id": "s", "event_time": start + timedelta(minutes=i, microseconds=i)}
+            for i in range(5)
+        ])
+        self.assertEqual(inserted, 5)
+
+        active = events.list_active_classrooms(start + timedelta(minutes=2), start + timedelta(minutes=10))
+        self.assertEqual(active, {self.room_ids[0]: start + timedelta(minutes=4, microseconds=4), self.room_ids[1]: start + timedelta(minutes=3, microseconds=3)})
+        self.assertEqual(events.oldest_event_time(start + timedelta(hours=1)), start)
+
+        generation = self.db.table_generation("classrooms")
+        self.assertEqual(self.db.update("classrooms", {"category": "hall"}, {"category": "lab"}), 2)
+        self.assertGreater(self.db.table_generation("classrooms"), generation)
+        self.assertEqual(events.delete_by_ids([1, 2, 3], chunk_size=2), 3)
+        self.assertEqual(len(events.list_between(start, start + timedelta(hours=1))), 2)
+
+    def test_wal_and_one_connection_per_thread(self):
+        self.assertEqual(self.db._conn().execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertIs(self.db._conn(), self.db._conn())
+
+        seen = []
+        worker = threading.Thread(target=lambda: seen.append((self.db._conn(), len(self.rooms.filter()))))
+        worker.start()
+        worker.join()
+        self.assertIsNot(seen[0][0], self.db._conn())
+        self.assertEqual(seen[0][1], 4)
+
+    def test_foreign_keys_are_enforced(self):
+        import sqlite3
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.insert("classrooms", {"id_building": 999, "floor": 1, "class_number": 1})
+
+
+class TestsBatchIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MockJSONDB()
+        self.rooms = ClassRoomsModel(self.db)
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.sensors = SensorsModel(self.db)
+        self.engine = OccupancyEngine(900, resync_seconds=None)
+        self.rs = RoomsService(self.db, self.rooms, self.events, self.sensors, self.engine)
+
+        container = SimpleNamespace(
+            sensors_model=self.sensors,
+            class_rooms_model=self.rooms,
+            categories_model=None,
+            motion_events_model=self.events,
+            building_model=BuildingModel(self.db),
+            home_service=None,
+            rooms_service=self.rs,
+            building_service=None,
+            response_cache=ResponseCache(),
+        )
+        self.controller = DashboardadminController(container)
+
+    def test_batch_resolves_keys_once_and_inserts_all_rows(self):
+        r1 = self.rooms.create({"class_number": 1})
+        r2 = self.rooms.create({"class_number": 2})
+        self.sensors.create({"room_id": r1, "private_key": "k1", "public_key": "p1"})
+        self.sensors.create({"room_id": r2, "private_key": "k2", "public_key": "p2"})
+
+        result = self.controller.createNewActivities({"events": [
+            {"private_key": "k1"},
+            {"private_key": "k2", "event_time": "2020-01-01T10:00:00+02:00"},
+            {"private_key": "unknown"},
+            {"private_key": "k1", "event_time": "not a date"},
+        ]})
+
+        self.assertEqual(result["json"]["msg"]["accepted"], 2)
+        self.assertEqual([r["index"] for r in result["json"]["msg"]["rejected"]], [2, 3])
+        self.assertEqual(len(self.events.filter(limit=None)), 2)
+        self.assertEqual(self.events.filter({"classroom_id": r2})[0]["event_time"], datetime(2020, 1, 1, 8, 0, 0))
+        # only the fresh reading makes a room busy
+        self.assertEqual(self.rs.getAvailableRoomIds(), {r2})
+
+    def test_future_event_time_does_not_hide_later_motion(self):
+        r1 = self.rooms.create({"class_number": 1})
+        self.sensors.create({"room_id": r1, "private_key": "k1", "public_key": "p1"})
+        soon = (datetime.utcnow() + timedelta(seconds=5)).isoformat()
+        later = (datetime.utcnow() + timedelta(days=1)).isoformat()
+
+        result = self.controller.createNewActivities({"events": [
+            {"private_key": "k1", "event_time": later},
+            {"private_key": "k1", "event_time": soon},
+        ]})
+        self.assertEqual(result["json"]["msg"]["accepted"], 1)
+        self.assertEqual(result["json"]["msg"]["rejected"], [{"index": 0, "error": "event_time is in the future"}])
+        self.assertLessEqual(self.events.filter()[0]["event_time"], datetime.utcnow())
+        self.assertNotIn(r1, self.rs.getAvailableRoomIds())
+
+        # the engine itself ignores a future time instead of remembering it
+        r2 = self.rooms.create({"class_number": 2})
+        self.rs.register_room(r2)
+        self.engine.record_motion(r2, datetime.utcnow() + timedelta(days=1))
+        self.assertIsNone(self.engine.last_seen(r2))
+        self.engine.record_motion(r2)
+        self.assertNotIn(r2, self.rs.getAvailableRoomIds())
+
+    def test_batch_rejects_empty_payload(self):
+        result = self.controller.createNewActivities({"events": []})
+        self.assertFalse(result["json"]["flag"])
+
+
+class TestsCascadeDelete(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MockJSONDB()
+        self.buildings = BuildingModel(self.db)
+        self.rooms = ClassRoomsModel(self.db)
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.sensors = SensorsModel(self.db, TTLCache())
+        self.hourly = ClassroomOccupancyHourlyModel(self.db)
+        self.rs = RoomsService(self.db, self.rooms, self.events, self.sensors, occupancy_hourly_model=self.hourly, delete_chunk_size=4)
+        self.bs = BuildingService(self.db, self.buildings, self.rooms, self.rs)
+
+        self.b1 = self.buildings.create({"building_name": "A"})
+        self.b2 = self.buildings.create({"building_name": "B"})
+        now = datetime(2026, 3, 3, 10, 0, 0)
+        for building in (self.b1, self.b1, self.b1, self.b2):
+            rid = self.rooms.create({"id_building": building, "class_number": 1})
+            self.sensors.create({"room_id": rid, "private_key": f"k{rid}", "public_key": f"p{rid}"})
+            self.events.create_many([{"classroom_id": rid, "sensor_id": rid, "event_time": now} for _ in range(5)])
+            self.hourly.create_many([{"classroom_id": rid, "hour_start": now}])
+
+    def test_building_cascade_is_set_based(self):
+        self.sensors.get_by_privateKey("k1")  # cached credential
+        deletes = []
+        delete = self.db.delete
+        self.db.delete = lambda tbname, where: deletes.append(tbname) or delete(tbname, where)
+
+        self.assertTrue(self.bs.delete_building_by_id(self.b1))
+
+        self.assertEqual([r["class_number"] for r in self.rooms.filter()], [1])
+        self.assertEqual({r["classroom_id"] for r in self.db.select("classroom_motion_events")}, {4})
+        self.assertEqual([s["room_id"] for s in self.sensors.list_all()], [4])
+        self.assertEqual({r["classroom_id"] for r in self.db.select("classroom_occupancy_hourly")}, {4})
+        self.assertIsNone(self.sensors.get_by_privateKey("k1"))
+        # 15 events in chunks of 4, then one IN-list delete per table
+        self.assertEqual(deletes, ["classroom_motion_events"] * 4 + [
+            "sensors", "classroom_motion_events", "classroom_occupancy_hourly", "classrooms", "buildings",
+        ])
+
+    def test_sensor_read_before_the_commit_is_not_cached(self):
+        self.sensors.get_by_privateKey("k1")  # cached credential
+        read = []
+
+        def read_then_delete(classroom_ids, uow=None):
+            # sensors DELETE is queued, not sent: a lookup still finds the row
+            read.append(self.sensors.get_by_privateKey("k1"))
+            return self.rooms.__class__.delete_by_ids(self.rooms, classroom_ids, uow=uow)
+
+        self.rooms.delete_by_ids = read_then_delete
+        self.assertTrue(self.bs.delete_building_by_id(self.b1))
+
+        self.assertIsNotNone(read[0])
+        self.assertIsNone(self.sensors.get_by_privateKey("k1"))
+
+    def test_failed_cascade_leaves_rooms_intact(self):
+        queued = []
+
+        def fail(classroom_ids, uow=None):
+            # sensors, events and rollups are still only queued
+            queued.extend(uow.pending())
+            self.assertEqual(len(self.sensors.list_all()), 4)
+            raise RuntimeError("boom")
+
+        self.rooms.delete_by_ids = fail
+        with self.assertRaises(RuntimeError):
+            self.bs.delete_building_by_id(self.b1)
+        self.assertEqual([t for _, t in queued], ["sensors", "classroom_motion_events", "classroom_occupancy_hourly"])
+
+        self.assertEqual(len(self.rooms.filter()), 4)
+        self.assertEqual(len(self.sensors.list_all()), 4)
+        self.assertEqual(len(self.buildings.filter()), 2)
+
+
+class TestsUnitOfWork(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MockJSONDB()
+        self.db.insert_many("sensors", [{"room_id": n} for n in range(1, 6)])
+        self.calls = []
+        for name in ("insert_many", "update", "delete"):
+            self._spy(name)
+
+    def _spy(self, name):
+        real = getattr(self.db, name)
+
+        def spy(tbname, *args, **kwargs):
+            self.calls.append((name, tbname))
+            return real(tbname, *args, **kwargs)
+
+        setattr(self.db, name, spy)
+
+    def test_writes_are_coalesced_and_sent_on_exit(self):
+        with self.db.unit_of_work() as uow:
+            uow.insert("classrooms", {"class_number": 1})
+            uow.insert("classrooms", {"class_number": 2})
+            uow.delete("sensors", {"id": 1})
+            uow.delete("sensors", {"id": [2, 3]})
+            uow.update("sensors", {"room_id": 9}, {"id": 4})
+            self.assertEqual(len(self.db.select("classrooms")), 0)
+
+        self.assertEqual(self.calls, [("insert_many", "classrooms"), ("delete", "sensors"), ("update", "sensors")])
+        self.assertEqual(len(self.db.select("classrooms")), 2)
+        self.assertEqual([(r["id"], r["room_id"]) for r in self.db.select("sensors")], [(4, 9), (5, 5)])
+
+    def test_error_drops_the_queue(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.unit_of_work() as uow:
+                uow.delete("sensors", {"room_id !=": None})
+                raise RuntimeError("boom")
+        self.assertEqual(self.calls, [])
+        self.assertEqual(len(self.db.select("sensors")), 5)
+
+    def test_nested_transaction_failure_is_undone_alone(self):
+        with self.db.transaction():
+            self.db.delete("sensors", {"id": 1})
+            with self.assertRaises(RuntimeError):
+                with self.db.transaction():
+                    self.db.delete("sensors", {"id": 2})
+                    self.db.insert("sensors", {"room_id": 6})
+                    raise RuntimeError("boom")
+        self.assertEqual([r["id"] for r in self.db.select("sensors")], [2, 3, 4, 5])
+
+
+class TestsWriteBehind(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MockJSONDB()
+        self.rooms = ClassRoomsModel(self.db)
+        self.sensors = SensorsModel(self.db)
+
+    def test_events_are_acknowledged_then_flushed_in_batches(self):
+        buffer = WriteBehindBuffer(self.db, "classroom_motion_events", batch_size=2, start=False)
+        events = ClassroomMotionEventsModel(self.db, buffer)
+        engine = OccupancyEngine(900, resync_seconds=None)
+        rs = RoomsService(self.db, self.rooms, events, self.sensors, engine)
+
+        r_id = self.rooms.create({"class_number": 1})
+        s_id = self.sensors.create({"room_id": r_id, "private_key": "k", "public_key": "p"})
+        for _ in range(3):
+            self.assertIsNone(rs.record_motion(self.sensors.get_by_id(s_id)))
+
+        # not written yet, but already visible to the occupancy view
+        self.assertEqual(events.filter(limit=None), [])
+        self.assertNotIn(r_id, rs.getAvailableRoomIds())
+        self.assertEqual(buffer.stats()["depth"], 3)
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(len(events.filter(limit=None)), 3)
+        self.assertEqual(buffer.stats()["batches"], 2)
+
+    def test_full_queue_drops_and_background_thread_flushes_on_close(self):
+        buffer = WriteBehindBuffer(self.db, "classroom_motion_events", max_queue=2, flush_interval=60)
+        self.assertEqual(buffer.put_many([{"classroom_id": 1}, {"classroom_id": 2}, {"classroom_id": 3}]), 2)
+        self.assertEqual(buffer.stats()["dropped_full"], 1)
+
+        buffer.close()
+        self.assertEqual(len(self.db.select("classroom_motion_events")), 2)
+        self.assertEqual(buffer.depth(), 0)
+
+    def test_deleting_a_room_discards_its_queued_events(self):
+        buffer = WriteBehindBuffer(self.db, "classroom_motion_events", start=False)
+        events = ClassroomMotionEventsModel(self.db, buffer)
+        events.append_many([{"classroom_id": 1}, {"classroom_id": 2}])
+
+        events.delete_events_by_room_id(1)
+        buffer.flush()
+        self.assertEqual([e["classroom_id"] for e in events.filter(limit=None)], [2])
+
+    def test_motion_during_a_room_delete_is_discarded_after_the_commit(self):
+        buffer = WriteBehindBuffer(self.db, "classroom_motion_events", start=False)
+        events = ClassroomMotionEventsModel(self.db, buffer)
+        rs = RoomsService(self.db, self.rooms, events, self.sensors)
+        r_id = self.rooms.create({"class_number": 1})
+        keep_id = self.rooms.create({"class_number": 2})
+
+        delete_by_ids = self.rooms.delete_by_ids
+
+        def motion_then_delete(classroom_ids, uow=None):
+            # the sensor is still there until the commit
+            events.append_many([{"classroom_id": r_id}, {"classroom_id": keep_id}])
+            return delete_by_ids(classroom_ids, uow=uow)
+
+        self.rooms.delete_by_ids = motion_then_delete
+        self.assertTrue(rs.delete_room_by_id(r_id))
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual([e["classroom_id"] for e in events.filter(limit=None)], [keep_id])
+
+    def test_failed_flush_backs_off_instead_of_dropping_the_backlog(self):
+        failed = threading.Event()
+
+        def insert_many(tbname, rows):
+            failed.set()
+            raise RuntimeError("db down")
+
+        self.db.insert_many = insert_many
+        buffer = WriteBehindBuffer(self.db, "classroom_motion_events", batch_size=2, flush_interval=0.5)
+        buffer.put_many([{"classroom_id": n} for n in range(6)])
+
+        self.assertTrue(failed.wait(1))
+        time.sleep(0.2)
+        stats = buffer.stats()
+        self.assertEqual((stats["flush_errors"], stats["dropped_failed"], stats["depth"]), (1, 0, 6))
+
+        del self.db.insert_many
+        buffer.close()
+        self.assertEqual(len(self.db.select("classroom_motion_events")), 6)
+
+    def test_last_attempt_drops_only_the_bad_rows(self):
+        insert_many = self.db.insert_many
+
+        def reject_room_9(tbname, rows):
+            if any(r["classroom_id"] == 9 for r in rows):
+                raise ValueError("foreign key")
+            return insert_many(tbname, rows)
+
+        self.db.insert_many = reject_room_9
+        buffer = WriteBehindBuffer(self.db, "classroom_motion_events", max_attempts=2, start=False)
+        buffer.put_many([{"classroom_id": n} for n in (1, 9, 2, 9, 3)])
+
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.flush(), 3)
+        stats = buffer.stats()
+        self.assertEqual((stats["flushed"], stats["dropped_failed"], stats["depth"]), (3, 2, 0))
+        self.assertEqual([e["classroom_id"] for e in self.db.select("classroom_motion_events")], [1, 2, 3])
+
+    def test_outage_keeps_the_batch_and_stops_the_row_pass(self):
+        insert_many = self.db.insert_many
+        state = {"down": True, "calls": 0, "drop_at_2": True}
+
+        def flaky(tbname, rows):
+            state["calls"] += 1
+            if state["down"]:
+                raise RuntimeError("lost connection")
+            if len(rows) > 1:
+                raise ValueError("foreign key")
+            if rows[0]["classroom_id"] == 2 and state["drop_at_2"]:
+                state["down"], state["drop_at_2"] = True, False  # the server goes away mid-pass
+                raise RuntimeError("lost connection")
+            return insert_many(tbname, rows)
+
+        self.db.insert_many = flaky
+        buffer = WriteBehindBuffer(self.db, "classroom_motion_events", max_attempts=1, start=False)
+        buffer.put_many([{"classroom_id": n} for n in (1, 2, 3)])
+
+        for _ in range(5):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual((buffer.stats()["dropped_failed"], buffer.depth()), (0, 3))
+
+        state["down"] = False
+        state["calls"] = 0
+        buffer.flush()
+        self.assertEqual(state["calls"], 3)  # batch, row 1, row 2: row 3 is not tried
+        self.assertEqual((buffer.stats()["dropped_failed"], buffer.depth()), (0, 2))
+
+        state["down"] = False
+        buffer.flush()
+        self.assertEqual([e["classroom_id"] for e in self.db.select("classroom_motion_events")], [1, 2, 3])
+
+    def test_close_stops_a_slow_row_pass_at_its_timeout(self):
+        def slow_bad_rows(tbname, rows):
+            time.sleep(0.02)
+            raise ValueError("bad row")
+
+        self.db.insert_many = slow_bad_rows
+        buffer = WriteBehindBuffer(
+            self.db, "classroom_motion_events", max_attempts=1, close_timeout=0.1, start=False,
+        )
+        buffer.put_many([{"classroom_id": n} for n in range(100)])
+
+        started = time.monotonic()
+        buffer.close()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual((buffer.stats()["dropped_failed"], buffer.depth()), (100, 0))
+
+    def test_close_counts_what_it_could_not_write(self):
+        def insert_many(tbname, rows):
+            raise RuntimeError("db down")
+
+        self.db.insert_many = insert_many
+        buffer = WriteBehindBuffer(
+            self.db, "classroom_motion_events",
+            batch_size=2, flush_interval=0.01, max_attempts=1000, close_timeout=0.05, start=False,
+        )
+        buffer.put_many([{"classroom_id": n} for n in range(5)])
+
+        buffer.close()
+        stats = buffer.stats()
+        self.assertGreater(stats["flush_errors"], 1)
+        self.assertEqual((stats["dropped_failed"], stats["depth"]), (5, 0))
+
+
+class CountingDB(MockJSONDB):
+    def __init__(self):
+        super().__init__()
+        self.selects = 0
+        self.deletes = 0
+
+    def select(self, *args, **kwargs):
+        self.selects += 1
+        return super().select(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self.deletes += 1
+        return super().delete(*args, **kwargs)
+
+
+class TestsSensorCredentialCache(unittest.TestCase):
+
+    def setUp(self):
+        self.db = CountingDB()
+        self.cache = TTLCache(max_size=100, ttl=300, negative_ttl=30)
+        self.sensors = SensorsModel(self.db, self.cache)
+        self.s_id = self.sensors.create({"room_id": 7, "private_key": "good", "public_key": "p"})
+
+    def test_positive_and_negative_lookups_hit_the_db_once(self):
+        for _ in range(3):
+            self.assertEqual(self.sensors.get_by_privateKey("good")["id"], self.s_id)
+            self.assertIsNone(self.sensors.get_by_privateKey("bad"))
+        self.assertEqual(self.db.selects, 2)
+
+    def test_writes_invalidate_cached_entries(self):
+        self.assertIsNone(self.sensors.get_by_privateKey("new"))
+        self.sensors.create({"room_id": 8, "private_key": "new", "public_key": "p2"})
+        self.assertIsNotNone(self.sensors.get_by_privateKey("new"))
+
+        self.sensors.get_by_privateKey("good")
+        self.sensors.delete_sensor_by_room_id(7)
+        self.assertIsNone(self.sensors.get_by_privateKey("good"))
+
+    def test_bloom_filter_rejects_unknown_keys_without_a_query(self):
+        sensors = SensorsModel(self.db, None, RefreshingBloomFilter(lambda: ["good"]))
+        self.db.selects = 0
+        self.assertIsNone(sensors.get_by_privateKey("bad"))
+        self.assertEqual(self.db.selects, 0)
+
+        bloom = BloomFilter(1000)
+        bloom.add("a")
+        self.assertTrue(bloom.might_contain("a"))
+        self.assertFalse(bloom.might_contain("b"))
+
+    def test_bloom_rebuild_does_not_block_readers(self):
+        now = [0.0]
+        loading, release = threading.Event(), threading.Event()
+        keys = [["old"]]
+
+        def loader():
+            if now[0]:
+                loading.set()
+                release.wait(1)
+            return list(keys[0])
+
+        bloom = RefreshingBloomFilter(loader, refresh_seconds=10, clock=lambda: now[0])
+        self.assertTrue(bloom.might_contain("old"))
+
+        now[0] = 11
+        keys[0] = ["old", "new"]
+        rebuild = threading.Thread(target=bloom.might_contain, args=("old",))
+        rebuild.start()
+        self.assertTrue(loading.wait(1))
+
+        # answered from the previous filter while the loader is stuck
+        self.assertTrue(bloom.might_contain("old"))
+        self.assertFalse(bloom.might_contain("new"))
+        bloom.add("added-meanwhile")
+
+        release.set()
+        rebuild.join(1)
+        self.assertTrue(bloom.might_contain("new"))
+        self.assertTrue(bloom.might_contain("added-meanwhile"))
+
+    def test_lru_eviction_and_expiry(self):
+        now = [0.0]
+        cache = TTLCache(max_size=2, ttl=10, negative_ttl=1, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("a"), (True, 1))
+
+        now[0] = 11
+        self.assertEqual(cache.get("a"), (False, None))
+
+
+class TestsRequestMemo(unittest.TestCase):
+
+    def setUp(self):
+        self.db = CountingDB()
+        self.buildings = BuildingModel(self.db)
+        self.rooms = ClassRoomsModel(self.db)
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.rs = RoomsService(self.db, self.rooms, self.events, SensorsModel(self.db))
+        self.bs = BuildingService(self.db, self.buildings, self.rooms, self.rs)
+        self.hs = HomeService(self.db, self.bs, self.rs, self.buildings, self.rooms, self.events)
+
+        b_id = self.buildings.create({"building_name": "A"})
+        self.rooms.create({"id_building": b_id, "class_number": 1})
+
+    def _home_page(self):
+        self.hs.getHomeBuildingsCards()
+        self.hs.getHomeRecentSpaces(limit=10)
+        self.hs.getHomeAvailableNow(limit=6)
+
+    def test_home_page_reads_are_shared_within_a_request(self):
+        self.db.selects = 0
+        self._home_page()
+        unmemoized = self.db.selects
+
+        self.db.selects = 0
+        with RequestMemo().activate():
+            self._home_page()
+        self.assertLess(self.db.selects, unmemoized)
+
+    def test_writes_inside_the_request_invalidate_memoized_reads(self):
+        with RequestMemo().activate():
+            self.assertEqual(len(self.rooms.filter()), 1)
+            self.assertEqual(len(self.rooms.filter()), 1)
+            self.rooms.create({"class_number": 2})
+            self.assertEqual(len(self.rooms.filter()), 2)
+        self.assertEqual(self.db.selects, 2)
+
+    def test_memoized_rows_are_per_db_and_safe_to_change(self):
+        other_rooms = ClassRoomsModel(CountingDB())
+        with RequestMemo().activate():
+            self.assertEqual(len(self.rooms.filter()), 1)
+            self.assertEqual(other_rooms.filter(), [])
+
+            self.rooms.filter()[0]["class_number"] = 99
+            self.assertEqual(self.rooms.filter()[0]["class_number"], 1)
+
+
+class TestsResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = ResponseCache(store=TTLCache(max_size=10, clock=lambda: self.now))
+
+    def test_params_are_normalized_into_the_key(self):
+        self.assertEqual(
+            self.cache.key("building_details", "print", {"id": " 1", "b": "x"}),
+            self.cache.key("building_details", "print", {"b": "x", "id": "1 "}),
+        )
+        self.assertNotEqual(
+            self.cache.key("building_details", "print", {"id": "1"}),
+            self.cache.key("building_details", "print", {"id": "2"}),
+        )
+
+    def test_tag_invalidation_and_ttl(self):
+        versions = self.cache.tag_versions(("catalog", "availability"))
+        self.cache.set("search", b"page", 30, versions)
+        self.cache.set("live", b"snapshot", 30, self.cache.tag_versions(("availability",)))
+        self.assertEqual(self.cache.get("search"), b"page")
+
+        self.cache.invalidate("catalog")
+        self.assertIsNone(self.cache.get("search"))
+        self.assertEqual(self.cache.get("live"), b"snapshot")
+
+        self.now += 31
+        self.assertIsNone(self.cache.get("live"))
+
+    def test_invalidation_during_render_is_not_lost(self):
+        versions = self.cache.tag_versions(("catalog",))
+        self.cache.invalidate("catalog")  # a write while the page rendered
+        self.cache.set("search", b"stale", 30, versions)
+        self.assertIsNone(self.cache.get("search"))
+
+    def test_deadline_shortens_ttl(self):
+        cache = ResponseCache(store=TTLCache(clock=lambda: self.now), deadline_fn=lambda tags: 5 if "availability" in tags else None)
+        cache.set("search", b"page", 30, cache.tag_versions(("availability",)))
+        self.now += 6
+        self.assertIsNone(cache.get("search"))
+
+
+class TestsMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.01, 0.1))
+        self.db = MockJSONDB()
+        self.rooms = ClassRoomsModel(self.db)
+
+    def test_db_operations_are_counted_against_the_route(self):
+        with self.metrics.track_request() as timings:
+            timings.tag("search", "print")
+            self.rooms.create({"class_number": 1})
+            self.rooms.filter()
+            self.rooms.filter()
+
+        self.assertEqual(timings.db_queries, 3)
+        self.assertIn('desc="3 queries"', timings.server_timing())
+        db = self.metrics.snapshot()["db"]
+        self.assertEqual(db[("mock", "select", "search", "print")][0], 2)
+        self.assertEqual(db[("mock", "insert", "search", "print")][0], 1)
+
+    def test_latency_histogram_is_cumulative(self):
+        self.metrics.observe_request("home", "print", 200, 0.005)
+        self.metrics.observe_request("home", "print", 200, 0.05)
+        self.metrics.observe_request("home", "print", 500, 3.0)
+
+        text = self.metrics.render()
+        self.assertIn('freeclass_http_request_duration_seconds_bucket{controller="home",action="print",le="0.01"} 1', text)
+        self.assertIn('freeclass_http_request_duration_seconds_bucket{controller="home",action="print",le="0.1"} 2', text)
+        self.assertIn('freeclass_http_request_duration_seconds_bucket{controller="home",action="print",le="+Inf"} 3', text)
+        self.assertIn('freeclass_http_requests_total{controller="home",action="print",status="500"} 1', text)
+
+    def test_disabled_registry_records_nothing(self):
+        metrics = Metrics(enabled=False)
+        with metrics.track_request() as timings:
+            timings.tag("home", "print")
+            self.rooms.filter()
+        metrics.observe_request("home", "print", 200, 0.1)
+        self.assertEqual(metrics.snapshot(), {"latency": {}, "requests": {}, "db": {}})
+
+
+class TestsIndexedMockDB(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MockJSONDB()
+        for i in range(1, 7):
+            self.db.insert("classroom_motion_events", {"classroom_id": i % 3, "event_time": f"2026-01-0{i}T00:00:00", "payload": {"n": i}})
+
+    def test_index_lookups_follow_updates_and_deletes(self):
+        self.assertEqual([r["id"] for r in self.db.select("classroom_motion_events", {"classroom_id": 1})], [1, 4])
+        self.assertEqual([r["id"] for r in self.db.select("classroom_motion_events", {"id": [5, 2, 9]})], [2, 5])
+
+        self.db.update("classroom_motion_events", {"classroom_id": 1}, {"id": 2})
+        self.assertEqual([r["id"] for r in self.db.select("classroom_motion_events", {"classroom_id": 1})], [1, 2, 4])
+
+        self.assertEqual(self.db.delete("classroom_motion_events", {"classroom_id": [1, 2]}), 4)
+        self.assertEqual([r["id"] for r in self.db.select("classroom_motion_events")], [3, 6])
+        self.assertEqual(self.db.select("classroom_motion_events", {"id": 1}), [])
+
+    def test_returned_rows_are_copies(self):
+        row = self.db.select("classroom_motion_events", {"id": 1})[0]
+        row["payload"]["n"] = 100
+        row["classroom_id"] = 99
+        self.assertEqual(self.db.select("classroom_motion_events", {"id": 1})[0]["payload"], {"n": 1})
+        self.assertEqual(self.db.select("classroom_motion_events", {"classroom_id": 99}), [])
+
+    def test_order_by_uses_mysql_syntax(self):
+        rows = self.db.select("classroom_motion_events", order_by="classroom_id DESC, event_time ASC", limit=3)
+        self.assertEqual([r["id"] for r in rows], [2, 5, 1])
+        rows = self.db.select("classroom_motion_events", order_by="-id", limit=2)
+        self.assertEqual([r["id"] for r in rows], [6, 5])
+
+
+class TestsMockDBJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "db.json")
+        with open(self.path, "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_db(self):
+        return MockJSONDB(self.path, compact_interval=None)
+
+    def test_writes_append_to_journal_and_replay_on_load(self):
+        db = self.open_db()
+        db.insert_many("class_rooms", [{"name": "A"}, {"name": "B"}, {"name": "C"}])
+        db.update("class_rooms", {"name": "B2"}, {"id": 2})
+        db.delete("class_rooms", {"id": 3})
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "{}")
+        with open(self.path + ".journal") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        reopened = self.open_db()
+        self.assertEqual([r["name"] for r in reopened.select("class_rooms")], ["A", "B2"])
+        self.assertEqual(reopened.insert("class_rooms", {"name": "D"}), 4)
+
+    def test_transaction_journals_on_commit_and_undoes_on_error(self):
+        db = self.open_db()
+        db.insert_many("class_rooms", [{"name": "A"}, {"name": "B"}])
+
+        with self.assertRaises(RuntimeError):
+            with db.transaction():
+                db.insert("class_rooms", {"name": "C"})
+                db.update("class_rooms", {"name": "A2"}, {"id": 1})
+                db.delete("class_rooms", {"id": 2})
+                raise RuntimeError("boom")
+        self.assertEqual([(r["id"], r["name"]) for r in db.select("class_rooms")], [(1, "A"), (2, "B")])
+
+        with db.transaction():
+            db.delete("class_rooms", {"id": 1})
+            db.insert("class_rooms", {"name": "D"})
+
+        with open(self.path + ".journal") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual([r["name"] for r in self.open_db().select("class_rooms")], ["B", "D"])
+
+    def test_torn_last_line_is_ignored(self):
+        db = self.open_db()
+        db.insert("class_rooms", {"name": "A"})
+        db._fsync_journal()
+        with open(self.path + ".journal", "a") as f:
+            f.write('{"op": "insert", "table": "class_rooms", "rows": [{"id": 2')
+
+        self.assertEqual([r["id"] for r in self.open_db().select("class_rooms")], [1])
+
+    def test_compact_folds_journal_into_snapshot(self):
+        db = self.open_db()
+        db.insert_many("class_rooms", [{"name": "A"}, {"name": "B"}])
+        db.close()
+
+        self.assertEqual(os.path.getsize(self.path + ".journal"), 0)
+        reopened = self.open_db()
+        self.assertEqual([r["name"] for r in reopened.select("class_rooms")], ["A", "B"])
+
+    def test_replay_over_compacted_snapshot_is_idempotent(self):
+        db = self.open_db()
+        db.insert_many("class_rooms", [{"name": "A"}, {"name": "B"}])
+        db.delete("class_rooms", {"id": 1})
+        with open(self.path + ".journal") as f:
+            journal = f.read()
+        db.compact()
+
+        # simulate a crash between the snapshot rename and the truncate
+        with open(self.path + ".journal", "w") as f:
+            f.write(journal)
+        self.assertEqual([r["name"] for r in self.open_db().select("class_rooms")], ["B"])
+
+    def test_instances_sharing_a_file_see_each_others_writes(self):
+        # two instances on one path behave like two worker processes
+        a, b = self.open_db(), self.open_db()
+        self.assertEqual(a.insert("class_rooms", {"name": "A"}), 1)
+        self.assertEqual(b.insert("class_rooms", {"name": "B"}), 2)
+        self.assertEqual([r["name"] for r in a.select("class_rooms")], ["A", "B"])
+
+        generation = b.write_generation
+        a.delete("class_rooms", {"id": 1})
+        a.compact()
+        self.assertEqual([r["name"] for r in b.select("class_rooms")], ["B"])
+        self.assertGreater(b.write_generation, generation)
+        self.assertEqual(b.insert("class_rooms", {"name": "C"}), 3)
+        self.assertEqual([r["id"] for r in a.select("class_rooms")], [2, 3])
+
+    def test_concurrent_writers_do_not_lose_rows(self):
+        dbs = [self.open_db(), self.open_db()]
+
+        def worker(db):
+            for i in range(50):
+                db.insert("classroom_motion_events", {"classroom_id": i})
+
+        threads = [threading.Thread(target=worker, args=(dbs[i % 2],)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        ids = [r["id"] for r in self.open_db().select("classroom_motion_events")]
+        self.assertEqual(ids, list(range(1, 201)))
+
+
+class ScriptDB(MockJSONDB):
+    def __init__(self):
+        super().__init__()
+        self.executed = []
+
+    def execute_statements(self, statements):
+        self.executed.extend(s for s in statements if not s.startswith("CREATE TABLE IF NOT EXISTS schema_migrations"))
+
+
+class TestsMigrations(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.write("0002_second.sql", "ALTER TABLE b ADD KEY k (x);\n")
+        self.write("0001_first.sql", "-- comment; not a statement\nALTER TABLE a\n  ADD KEY k (x);\nSET @x = 1;\n")
+        self.write("notes.txt", "ignored")
+        self.db = ScriptDB()
+
+    def write(self, name, text):
+        with open(os.path.join(self.tmp.name, name), "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+    def test_split_statements(self):
+        self.assertEqual(
+            split_statements("-- a;\nSELECT 1;\n/*!40101 SET x=1 */;\nSELECT ';'\n;"),
+            ["SELECT 1", "/*!40101 SET x=1 */", "SELECT ';'"],
+        )
+
+    def test_applies_pending_migrations_once_in_order(self):
+        runner = MigrationRunner(self.db, self.tmp.name)
+        self.assertEqual([m.version for m in runner.migrate(target=1)], [1])
+        self.assertEqual([m.version for m in runner.migrate()], [2])
+        self.assertEqual(runner.migrate(), [])
+        self.assertEqual(self.db.executed, ["ALTER TABLE a\n  ADD KEY k (x)", "SET @x = 1", "ALTER TABLE b ADD KEY k (x)"])
+
+    def test_editing_an_applied_migration_is_an_error(self):
+        runner = MigrationRunner(self.db, self.tmp.name)
+        runner.migrate()
+        self.write("0001_first.sql", "ALTER TABLE a ADD KEY other (y);\n")
+        with self.assertRaises(MigrationError):
+            runner.migrate()
+
+    def test_repo_migrations_are_well_formed(self):
+        migrations = MigrationRunner(self.db).discover()
+        self.assertEqual([m.version for m in migrations], list(range(1, len(migrations) + 1)))
+        self.assertTrue(all(m.statements for m in migrations))
+
+
+class TestsControllerLoader(unittest.TestCase):
+
+    def test_controllers_are_resolved_once_into_a_dispatch_table(self):
+        loader = ControllerLoader()
+        self.assertIn("dashboardadmin", loader.controller_names())
+        self.assertTrue(loader.is_controller_exist("building_details"))
+        self.assertFalse(loader.is_controller_exist("_private"))
+        self.assertFalse(loader.is_controller_exist("missing"))
+
+        container = SimpleNamespace(users_model=UsersModel(MockJSONDB()))
+        controller = loader.get_controller("adminlogin", container)
+        self.assertIs(controller.users_model, container.users_model)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestsConnectionPool(unittest.TestCase):
+
+    def test_connections_are_reused_and_bounded(self):
+        pool = ConnectionPool(FakeConnection, max_size=2, checkout_timeout=0.05)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertIs(first, second)
+
+        a = pool.checkout()
+        b = pool.checkout()
+        with self.assertRaises(PoolTimeoutError):
+            pool.checkout()
+
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["in_use"], stats["timeouts"]), (2, 2, 1))
+        pool.checkin(a)
+        pool.checkin(b)
+
+    def test_waiting_checkout_gets_released_connection(self):
+        pool = ConnectionPool(FakeConnection, max_size=1, checkout_timeout=2)
+        held = pool.checkout()
+        threading.Timer(0.05, pool.checkin, args=(held,)).start()
+
+        self.assertIs(pool.checkout(), held)
+        self.assertEqual(pool.stats()["waits"], 1)
+
+    def test_idle_connections_are_health_checked(self):
+        pool = ConnectionPool(
+            FakeConnection, max_size=1, health_check_idle_seconds=0, is_alive=lambda c: c.alive
+        )
+        dead = pool.checkout()
+        dead.alive = False
+        pool.checkin(dead)
+
+        fresh = pool.checkout()
+        self.assertIsNot(fresh, dead)
+        self.assertTrue(dead.closed)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+
+class TestsOccupancyEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2026, 1, 1, 12, 0, 0)
+        self.db = MockJSONDB()
+        self.rooms = ClassRoomsModel(self.db)
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.sensors = SensorsModel(self.db)
+
+        self.engine = OccupancyEngine(900, resync_seconds=None, utcnow_fn=lambda: self.now)
+        self.rs = RoomsService(self.db, self.rooms, self.events, self.sensors, self.engine)
+        self.rs.utcnow_fn = lambda: self.now
+
+    def test_motion_marks_room_busy_until_window_expires(self):
+        r_id = self.rooms.create({"class_number": 101})
+        s_id = self.sensors.create({"room_id": r_id, "private_key": "k1", "public_key": "p1"})
+
+        self.assertIn(r_id, self.rs.getAvailableRoomIds())
+
+        self.rs.record_motion(self.sensors.get_by_id(s_id))
+        self.assertNotIn(r_id, self.rs.getAvailableRoomIds())
+        self.assertEqual(len(self.events.filter({"classroom_id": r_id})), 1)
+
+        self.now += timedelta(seconds=901)
+        self.assertIn(r_id, self.rs.getAvailableRoomIds())
+
+    def test_new_motion_while_busy_extends_the_window(self):
+        self.engine.load([1], {})
+        self.engine.record_motion(1, self.now)
+
+        self.now += timedelta(seconds=600)
+        self.engine.record_motion(1, self.now)
+
+        self.now += timedelta(seconds=600)
+        self.assertIn(1, self.engine.busy_ids())
+
+        self.now += timedelta(seconds=301)
+        self.assertIn(1, self.engine.available_ids())
+
+    def test_next_expiry_skips_removed_and_re_armed_rooms(self):
+        start = self.now
+        self.engine.load([1, 2], {})
+        self.engine.record_motion(1, start - timedelta(seconds=60))
+        self.engine.record_motion(2, start)
+        self.assertEqual(self.engine.next_expiry(), start + timedelta(seconds=840))
+
+        self.engine.remove_room(1)
+        self.assertEqual(self.engine.next_expiry(), start + timedelta(seconds=900))
+
+        self.now += timedelta(seconds=60)
+        self.engine.record_motion(2, self.now)
+        self.assertEqual(self.engine.next_expiry(), start + timedelta(seconds=960))
+        self.assertEqual(self.engine.busy_ids(), frozenset({2}))
+
+        self.now = start + timedelta(seconds=961)
+        self.assertEqual(self.engine.busy_ids(), frozenset())
+        self.assertIsNone(self.engine.next_expiry())
+
+    def test_load_reads_recent_events_and_deleted_rooms_drop_out(self):
+        r1 = self.rooms.create({"class_number": 1})
+        r2 = self.rooms.create({"class_number": 2})
+        self.events.create({"classroom_id": r1, "sensor_id": 1, "event_time": self.now - timedelta(seconds=60)})
+        self.events.create({"classroom_id": r2, "sensor_id": 2, "event_time": self.now - timedelta(seconds=5000)})
+
+        self.assertEqual(self.rs.getAvailableRoomIds(), {r2})
+
+        self.rs.delete_room_by_id(r2)
+        self.assertEqual(self.rs.getAvailableRoomIds(), set())
+
+    def test_subscribers_hear_transitions_with_versions(self):
+        heard = []
+        self.engine.subscribe(lambda rid, status, version: heard.append((rid, status, version)))
+        self.engine.load([1, 2], {})
+        self.engine.record_motion(1, self.now)
+        self.engine.record_motion(1, self.now)  # already busy
+        self.now += timedelta(seconds=901)
+        self.engine.available_ids()
+        self.engine.remove_room(2)
+
+        self.assertEqual(heard, [(1, "available", 1), (2, "available", 1), (1, "busy", 2), (1, "available", 3), (2, "removed", 4)])
+
+
+class TestsAvailabilityStream(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MockJSONDB()
+        self.buildings = BuildingModel(self.db)
+        self.rooms = ClassRoomsModel(self.db)
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.sensors = SensorsModel(self.db)
+
+        self.engine = OccupancyEngine(900, resync_seconds=None)
+        self.rs = RoomsService(self.db, self.rooms, self.events, self.sensors, self.engine)
+        self.stream = AvailabilityStream(self.rs, self.engine, heartbeat_seconds=5)
+
+        b_id = self.buildings.create({"building_name": "Main"})
+        self.r1 = self.rooms.create({"id_building": b_id, "class_number": 1})
+        self.r2 = self.rooms.create({"id_building": b_id, "class_number": 2})
+        self.b_id = b_id
+        self.sensor = self.sensors.get_by_id(self.sensors.create({"room_id": self.r1, "private_key": "k1", "public_key": "p1"}))
+
+    def tearDown(self):
+        self.stream.close()
+
+    def test_snapshot_then_transitions(self):
+        events = self.stream.stream()
+        first = next(events)
+        self.assertTrue(first.startswith("event: snapshot\n"))
+        self.assertIn('"available":[%d,%d]' % (self.r1, self.r2), first)
+        self.assertIn('"buildings":{"%d":2}' % self.b_id, first)
+
+        self.rs.record_motion(self.sensor)
+        transition = next(events)
+        self.assertIn("event: transition\n", transition)
+        self.assertIn('"room_id":%d,"building_id":%d,"status":"busy"' % (self.r1, self.b_id), transition)
+
+        self.assertEqual(self.stream.client_count(), 1)
+        events.close()
+        self.assertEqual(self.stream.client_count(), 0)
+
+    def test_slow_client_gets_a_fresh_snapshot(self):
+        self.stream.client_queue_size = 1
+        events = self.stream.stream()
+        next(events)
+
+        self.stream._fan_out([(self.r1, "busy", 1), (self.r2, "busy", 1)])
+        self.assertTrue(next(events).startswith("event: snapshot\n"))
+        events.close()
+
+
+class TestsRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2026, 3, 1, 12, 30, 0)
+        self.db = CountingDB()
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.hourly = ClassroomOccupancyHourlyModel(self.db)
+        self.retention = RetentionService(self.db, self.events, self.hourly, activity_seconds=900, retention_days=1, delete_chunk_size=2)
+        self.retention.utcnow_fn = lambda: self.now
+
+        old = datetime(2026, 2, 27, 10, 0, 0)
+        self.events.create_many([
+            {"classroom_id": 1, "sensor_id": 1, "event_time": old + timedelta(minutes=5)},
+            {"classroom_id": 1, "sensor_id": 1, "event_time": old + timedelta(minutes=10)},
+            {"classroom_id": 1, "sensor_id": 1, "event_time": (old + timedelta(minutes=55)).isoformat()},
+            {"classroom_id": 2, "sensor_id": 2, "event_time": old + timedelta(hours=1, minutes=20)},
+            {"classroom_id": 1, "sensor_id": 1, "event_time": self.now - timedelta(hours=2)},
+        ])
+
+    def rollups(self):
+        return {(r["classroom_id"], r["hour_start"].hour): r for r in self.db.select("classroom_occupancy_hourly")}
+
+    def test_old_hours_are_rolled_up_then_deleted_in_chunks(self):
+        stats = self.retention.run_once()
+        self.assertEqual(stats, {"hours": 2, "rollup_rows": 3, "events_deleted": 4})
+        self.assertEqual(self.db.deletes, 3)  # 3 + 1 events, 2 ids per statement
+
+        rollups = self.rollups()
+        self.assertEqual(rollups[(1, 10)]["event_count"], 3)
+        self.assertEqual(rollups[(1, 10)]["busy_seconds"], 20 * 60 + 5 * 60)  # 10:05-10:25, 10:55-11:00
+        self.assertEqual(rollups[(1, 11)]["event_count"], 0)
+        self.assertEqual(rollups[(1, 11)]["busy_seconds"], 10 * 60)  # carried over until 11:10
+        self.assertEqual(rollups[(2, 11)]["busy_seconds"], 15 * 60)
+
+        remaining = self.db.select("classroom_motion_events")
+        self.assertEqual(len(remaining), 1)
+
+    def test_rerun_merges_late_events_into_the_rollup(self):
+        self.retention.run_once(max_hours=1)
+        self.events.create({"classroom_id": 1, "sensor_id": 1, "event_time": datetime(2026, 2, 27, 10, 2)})
+        self.events.create({"classroom_id": 3, "sensor_id": 3, "event_time": datetime(2026, 2, 27, 10, 40)})
+
+        self.assertEqual(self.retention.run_once(max_hours=1), {"hours": 1, "rollup_rows": 2, "events_deleted": 2})
+        rollup = self.rollups()[(1, 10)]
+        self.assertEqual(rollup["event_count"], 4)
+        self.assertEqual(rollup["busy_seconds"], 23 * 60 + 5 * 60)  # 10:02-10:25, 10:55-11:00
+        self.assertEqual(rollup["first_event"], datetime(2026, 2, 27, 10, 2))
+        self.assertEqual(self.rollups()[(3, 10)]["event_count"], 1)
+        self.assertEqual(self.retention.run_once(), {"hours": 1, "rollup_rows": 2, "events_deleted": 1})
+
+    def test_rollup_is_committed_before_the_chunked_deletes(self):
+        def failing_delete(tbname, where):
+            raise RuntimeError("lock wait timeout")
+
+        self.db.delete = failing_delete
+        with self.assertRaises(RuntimeError):
+            self.retention.run_once(max_hours=1)
+        self.assertEqual(self.rollups()[(1, 10)]["event_count"], 3)
+        self.assertEqual(len(self.db.select("classroom_motion_events")), 5)
+
+        del self.db.delete
+        self.assertEqual(self.retention.run_once(max_hours=1), {"hours": 1, "rollup_rows": 0, "events_deleted": 3})
+        self.assertEqual(self.rollups()[(1, 10)]["event_count"], 3)
+
+
+class TestsHeatmap(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2026, 3, 11, 12, 30, 0)  # a Wednesday
+        self.db = CountingDB()
+        self.rooms = ClassRoomsModel(self.db)
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.hourly = ClassroomOccupancyHourlyModel(self.db)
+        for _ in range(3):
+            self.rooms.create({"id_building": 1, "floor": 1, "class_number": 1})
+
+        self.events.create_many([
+            {"classroom_id": 1, "sensor_id": 1, "event_time": datetime(2026, 3, 2, 10, 5)},
+            {"classroom_id": 1, "sensor_id": 1, "event_time": datetime(2026, 3, 2, 10, 40)},
+            {"classroom_id": 1, "sensor_id": 1, "event_time": datetime(2026, 3, 9, 10, 15).isoformat()},
+            {"classroom_id": 1, "sensor_id": 1, "event_time": datetime(2026, 2, 16, 10, 15)},  # before the window
+        ])
+        self.hourly.create_many([
+            {"classroom_id": 2, "hour_start": datetime(2026, 2, 26, 8), "event_count": 3, "busy_seconds": 1800},
+            {"classroom_id": 2, "hour_start": datetime(2026, 2, 26, 9), "event_count": 0, "busy_seconds": 300},
+        ])
+        self.heatmap = HeatmapService(self.events, self.hourly, self.rooms, weeks=2, resync_seconds=None, utcnow_fn=lambda: self.now)
+
+    def test_share_of_weeks_per_weekday_hour(self):
+        room = self.heatmap.room_heatmap(1)
+        self.assertEqual(room["since"], "2026-02-25")
+        self.assertEqual(room["matrix"][0][10], 1.0)  # both Mondays, the same hour counted once
+        self.assertEqual(sum(map(sum, room["matrix"])), 1.0)
+
+        rolled = self.heatmap.room_heatmap(2)["matrix"]
+        self.assertEqual(rolled[3][8], 0.5)  # one Thursday of two, from the hourly rollup
+        self.assertEqual(rolled[3][9], 0.0)
+
+        building = self.heatmap.building_heatmap(1)
+        self.assertEqual(building["rooms"], 3)
+        self.assertEqual(building["matrix"][0][10], 0.333)
+
+    def test_new_motion_is_added_without_reloading(self):
+        self.heatmap.room_heatmap(1)
+        selects = self.db.selects
+
+        self.heatmap.record(1, datetime(2026, 3, 11, 9, 10))
+        self.heatmap.record_many([1, 1], [datetime(2026, 3, 11, 9, 50), datetime(2026, 3, 2, 10, 59)])
+
+        matrix = self.heatmap.room_heatmap(1)["matrix"]
+        self.assertEqual(matrix[2][9], 0.333)  # 1 of 3 Wednesdays so far
+        self.assertEqual(matrix[0][10], 1.0)
+        self.assertEqual(self.db.selects, selects)
+
+    def test_resync_reads_only_new_events_and_counts_each_hour_once(self):
+        heatmap = HeatmapService(self.events, self.hourly, self.rooms, weeks=2, resync_seconds=60, utcnow_fn=lambda: self.now)
+        heatmap.room_heatmap(1)
+        heatmap.record(1, datetime(2026, 3, 11, 9, 10))
+        self.events.create_many([
+            {"classroom_id": 1, "sensor_id": 1, "event_time": datetime(2026, 3, 11, 9, 10)},  # the one recorded above
+            {"classroom_id": 3, "sensor_id": 3, "event_time": datetime(2026, 3, 11, 11, 0)},  # another worker's
+        ])
+
+        def full_scan(*args, **kwargs):
+            raise AssertionError("window reloaded")
+
+        self.events.list_between = full_scan
+        self.now += timedelta(seconds=61)
+        self.assertEqual(heatmap.room_heatmap(1)["matrix"][2][9], 0.333)
+        self.assertEqual(heatmap.room_heatmap(3)["matrix"][2][11], 0.333)
+
+    def test_resync_picks_up_a_lower_id_committed_late(self):
+        heatmap = HeatmapService(self.events, self.hourly, self.rooms, weeks=2, resync_seconds=60, utcnow_fn=lambda: self.now)
+        heatmap.room_heatmap(1)
+        late_id = self.events.create({"classroom_id": 3, "sensor_id": 3, "event_time": datetime(2026, 3, 11, 8, 0)})
+        self.events.create({"classroom_id": 1, "sensor_id": 1, "event_time": datetime(2026, 3, 11, 9, 0)})
+
+        list_after_id = self.events.list_after_id
+
+        def uncommitted(last_id, **kwargs):
+            # the lower id is still inside another transaction
+            return [e for e in list_after_id(last_id, **kwargs) if e["id"] != late_id]
+
+        self.events.list_after_id = uncommitted
+        self.now += timedelta(seconds=61)
+        self.assertEqual(heatmap.room_heatmap(1)["matrix"][2][9], 0.333)
+        self.assertEqual(heatmap.room_heatmap(3)["matrix"][2][8], 0.0)
+
+        self.events.list_after_id = list_after_id
+        self.now += timedelta(seconds=61)
+        self.assertEqual(heatmap.room_heatmap(3)["matrix"][2][8], 0.333)
+        self.assertEqual(heatmap.room_heatmap(1)["matrix"][2][9], 0.333)  # re-read, counted once
+
+    def test_midnight_expires_the_oldest_day_without_reloading(self):
+        self.events.create({"classroom_id": 3, "sensor_id": 3, "event_time": datetime(2026, 2, 25, 10, 0)})
+        self.assertEqual(self.heatmap.room_heatmap(3)["matrix"][2][10], 0.333)
+
+        self.events.list_between = None  # a reload would fail
+        self.now = datetime(2026, 3, 12, 0, 30)
+        room = self.heatmap.room_heatmap(3)
+        self.assertEqual(room["since"], "2026-02-26")
+        self.assertEqual(sum(map(sum, room["matrix"])), 0.0)
+        self.assertEqual(self.heatmap.room_heatmap(2)["matrix"][3][8], 0.5)  # 2026-02-26 is still in
+        self.assertNotIn(self.heatmap._hour_number(datetime(2026, 2, 25, 10)), self.heatmap._seen)
+
+    def test_rows_of_forgotten_rooms_are_reused(self):
+        self.heatmap.room_heatmap(1)
+        rows = self.heatmap._counts.shape[0]
+
+        for room_id in range(10, 20):
+            self.heatmap.record(room_id, datetime(2026, 3, 11, 9, 0))
+            self.heatmap.forget_room(room_id)
+        self.assertEqual(self.heatmap._counts.shape[0], rows + 1)
+
+        self.heatmap.record(20, datetime(2026, 3, 11, 10, 0))
+        matrix = self.heatmap.room_heatmap(20)["matrix"]
+        self.assertEqual(sum(map(sum, matrix)), 0.333)
+        self.assertEqual(matrix[2][10], 0.333)
+
+    def test_utc_offset_moves_the_hours(self):
+        heatmap = HeatmapService(self.events, self.hourly, self.rooms, weeks=2, utc_offset_minutes=120, resync_seconds=None, utcnow_fn=lambda: self.now)
+        matrix = heatmap.room_heatmap(1)["matrix"]
+        self.assertEqual(matrix[0][12], 1.0)
+        self.assertEqual(matrix[0][10], 0.0)
+
+
+class TestsSyntheticCampus(unittest.TestCase):
+
+    def test_same_seed_same_campus(self):
+        spec = CampusSpec(buildings=2, floors=2, rooms_per_floor=3, days=2)
+        now = datetime(2026, 3, 3, 11, 0, 0)
+        campuses = []
+        for _ in range(2):
+            db = MockJSONDB()
+            counts = generate_campus(db, spec, seed=7, now=now)
+            campuses.append(db.select("classroom_motion_events", columns=["classroom_id", "sensor_id", "event_time"]))
+
+        self.assertEqual(campuses[0], campuses[1])
+        self.assertEqual(counts["classrooms"], 12)
+        self.assertEqual(counts["classroom_motion_events"], len(campuses[0]))
+        self.assertTrue(all(e["event_time"] <= now for e in campuses[0]))
+
+
+class TestsHomeSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2026, 1, 1, 12, 0, 0)
+        self.db = MockJSONDB()
+        self.buildings = BuildingModel(self.db)
+        self.rooms = ClassRoomsModel(self.db)
+        self.events = ClassroomMotionEventsModel(self.db)
+        self.sensors = SensorsModel(self.db)
+
+        self.engine = OccupancyEngine(900, resync_seconds=None, utcnow_fn=lambda: self.now)
+        self.rs = RoomsService(self.db, self.rooms, self.events, self.sensors, self.engine)
+        self.rs.utcnow_fn = lambda: self.now
+        self.bs = BuildingService(self.db, self.buildings, self.rooms, self.rs)
+        self.hs = HomeService(self.db, self.bs, self.rs, self.buildings, self.rooms, self.events, snapshot_max_age=None)
+        self.hs.utcnow_fn = lambda: self.now
+
+        self.builds = 0
+        build_cards = self.hs.getHomeBuildingsCards
+
+        def counting_build():
+            self.builds += 1
+            return build_cards()
+        self.hs.getHomeBuildingsCards = counting_build
+
+        b_id = self.buildings.create({"building_name": "Main", "floors": 2})
+        self.r1 = self.rooms.create({"id_building": b_id, "floor": 1, "class_number": 101})
+        self.sensor = self.sensors.get_by_id(self.sensors.create({"room_id": self.r1, "private_key": "k1", "public_key": "p1"}))
+
+    def test_page_views_reuse_the_snapshot_until_the_catalog_changes(self):
+        first = self.hs.get_home_snapshot()
+        self.assertIs(self.hs.get_home_snapshot(), first)
+        self.assertEqual(first["buildings"][0]["totalRooms"], 1)
+
+        self.sensors.create({"room_id": self.r1, "private_key": "k2", "public_key": "p2"})
+        self.assertIs(self.hs.get_home_snapshot(), first)
+
+        self.rooms.create({"id_building": first["buildings"][0]["id"], "floor": 2, "class_number": 201})
+        self.assertEqual(self.hs.get_home_snapshot()["buildings"][0]["totalRooms"], 2)
+        self.assertEqual(self.builds, 2)
+
+    def test_rebuilt_on_state_change_and_window_expiry_only(self):
+        self.assertEqual(self.hs.get_home_snapshot()["buildings"][0]["availableRooms"], 1)
+
+        self.rs.record_motion(self.sensor)
+        self.assertEqual(self.hs.get_home_snapshot()["buildings"][0]["availableRooms"], 0)
+
+        self.now += timedelta(seconds=60)
+        self.rs.record_motion(self.sensor)  # already busy: no transition
+        self.hs.get_home_snapshot()
+        self.assertEqual(self.builds, 2)
+
+        self.now += timedelta(seconds=901)
+        self.assertEqual(self.hs.get_home_snapshot()["buildings"][0]["availableRooms"], 1)
+        self.assertEqual(self.builds, 3)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file